@@ -0,0 +1,28 @@
+"""packed snapshots
+
+Revision ID: 2f9d7e4c1b58
+Revises: 6c1e8b3f9a20
+Create Date: 2026-10-18 18:21:09.774126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f9d7e4c1b58'
+down_revision: Union[str, Sequence[str], None] = '6c1e8b3f9a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('snapshot_config', sa.Column('packed', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('snapshot_config', 'packed')
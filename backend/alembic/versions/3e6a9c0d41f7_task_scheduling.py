@@ -0,0 +1,42 @@
+"""task scheduling
+
+Revision ID: 3e6a9c0d41f7
+Revises: b7d2e4a61c95
+Create Date: 2026-10-18 13:40:12.093518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e6a9c0d41f7'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e4a61c95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_job', sa.Column('priority', sa.String(), server_default='normal', nullable=False))
+    op.add_column('video_job', sa.Column('tenant', sa.String(), nullable=True))
+    op.add_column('video_asset', sa.Column('duration_sec', sa.Float(), nullable=True))
+    op.add_column('task', sa.Column('priority', sa.String(), server_default='normal', nullable=False))
+    op.add_column('task', sa.Column('tenant', sa.String(), server_default='default', nullable=False))
+    op.add_column('task', sa.Column('cost', sa.Float(), server_default='0', nullable=False))
+    op.add_column('task', sa.Column('sched_key', sa.Float(), server_default='0', nullable=False))
+    op.create_index('ix_task_sched', 'task', ['status', 'sched_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_task_sched', table_name='task')
+    op.drop_column('task', 'sched_key')
+    op.drop_column('task', 'cost')
+    op.drop_column('task', 'tenant')
+    op.drop_column('task', 'priority')
+    op.drop_column('video_asset', 'duration_sec')
+    op.drop_column('video_job', 'tenant')
+    op.drop_column('video_job', 'priority')
@@ -0,0 +1,30 @@
+"""scene description reuse
+
+Revision ID: 4b7e2c91d0a3
+Revises: ca206296f848
+Create Date: 2026-10-18 10:12:41.102934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2c91d0a3'
+down_revision: Union[str, Sequence[str], None] = 'ca206296f848'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scene', sa.Column('description_reused', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.add_column('scene', sa.Column('reused_from_scene_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scene', 'reused_from_scene_id')
+    op.drop_column('scene', 'description_reused')
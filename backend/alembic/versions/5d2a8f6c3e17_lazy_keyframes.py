@@ -0,0 +1,28 @@
+"""lazy keyframes
+
+Revision ID: 5d2a8f6c3e17
+Revises: b4e7c2a9d315
+Create Date: 2026-10-18 22:05:13.482901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a8f6c3e17'
+down_revision: Union[str, Sequence[str], None] = 'b4e7c2a9d315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('snapshot_config', sa.Column('lazy', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('snapshot_config', 'lazy')
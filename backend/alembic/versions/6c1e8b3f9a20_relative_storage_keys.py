@@ -0,0 +1,42 @@
+"""relative storage keys
+
+Revision ID: 6c1e8b3f9a20
+Revises: d5c8a1f3e672
+Create Date: 2026-10-18 17:06:41.518392
+
+"""
+import os
+from pathlib import Path
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c1e8b3f9a20'
+down_revision: Union[str, Sequence[str], None] = 'd5c8a1f3e672'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# absolute paths like /srv/app/backend/storage/jobs/<id>/... become jobs/<id>/...
+TABLES = ('snapshot', 'video_asset')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.execute(sa.text(
+            f"UPDATE {table} SET uri = regexp_replace(uri, '^.*/(jobs/[^/]+/)', '\\1') "
+            "WHERE uri LIKE '/%/jobs/%'"
+        ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    root = os.getenv("STORAGE_ROOT") or str(Path(__file__).resolve().parents[2] / "storage")
+    for table in TABLES:
+        op.execute(
+            sa.text(f"UPDATE {table} SET uri = :root || '/' || uri WHERE uri LIKE 'jobs/%'")
+            .bindparams(root=root.rstrip("/"))
+        )
@@ -0,0 +1,38 @@
+"""job artifacts
+
+Revision ID: 7a3d9e5b2c41
+Revises: 2f9d7e4c1b58
+Create Date: 2026-10-18 19:47:32.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3d9e5b2c41'
+down_revision: Union[str, Sequence[str], None] = '2f9d7e4c1b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_artifact',
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('bytes', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('last_accessed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('evicted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['video_job.job_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('job_id', 'kind')
+    )
+    op.create_index('ix_job_artifact_lru', 'job_artifact', ['last_accessed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_job_artifact_lru', table_name='job_artifact')
+    op.drop_table('job_artifact')
@@ -0,0 +1,48 @@
+"""denormalized counts
+
+Revision ID: 8f41c2d7a9e3
+Revises: 3e6a9c0d41f7
+Create Date: 2026-10-18 14:05:37.661204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f41c2d7a9e3'
+down_revision: Union[str, Sequence[str], None] = '3e6a9c0d41f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_job', sa.Column('snapshot_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('video_job', sa.Column('scene_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('scene', sa.Column('snapshot_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_video_job_created', 'video_job', ['created_at', 'job_id'], unique=False)
+
+    # backfill existing rows
+    op.execute(
+        "UPDATE video_job SET snapshot_count = "
+        "(SELECT count(*) FROM snapshot WHERE snapshot.job_id = video_job.job_id)"
+    )
+    op.execute(
+        "UPDATE video_job SET scene_count = "
+        "(SELECT count(*) FROM scene WHERE scene.job_id = video_job.job_id)"
+    )
+    op.execute(
+        "UPDATE scene SET snapshot_count = "
+        "(SELECT count(*) FROM scene_snapshot WHERE scene_snapshot.scene_id = scene.scene_id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_job_created', table_name='video_job')
+    op.drop_column('scene', 'snapshot_count')
+    op.drop_column('video_job', 'scene_count')
+    op.drop_column('video_job', 'snapshot_count')
@@ -0,0 +1,39 @@
+"""narrative window cache
+
+Revision ID: 9c3f5a17e2b8
+Revises: 4b7e2c91d0a3
+Create Date: 2026-10-18 11:03:27.551208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3f5a17e2b8'
+down_revision: Union[str, Sequence[str], None] = '4b7e2c91d0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('narrative_window',
+    sa.Column('window_id', sa.String(), nullable=False),
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('lines_hash', sa.String(length=64), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['video_job.job_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('window_id'),
+    sa.UniqueConstraint('job_id', 'lines_hash', name='uq_narrative_window_job_hash')
+    )
+    op.create_index(op.f('ix_narrative_window_job_id'), 'narrative_window', ['job_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_narrative_window_job_id'), table_name='narrative_window')
+    op.drop_table('narrative_window')
@@ -0,0 +1,34 @@
+"""progressive extraction
+
+Revision ID: b4e7c2a9d315
+Revises: 7a3d9e5b2c41
+Create Date: 2026-10-18 21:12:40.316827
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e7c2a9d315'
+down_revision: Union[str, Sequence[str], None] = '7a3d9e5b2c41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('snapshot', sa.Column('level', sa.SmallInteger(), server_default='0', nullable=False))
+    op.add_column('snapshot_config', sa.Column('preview_fps', sa.Float(), nullable=True))
+    op.add_column('video_job', sa.Column('snapshot_level', sa.Integer(), nullable=True))
+    # earlier extractions were single-pass: their one level is complete once they are done
+    op.execute("UPDATE video_job SET snapshot_level = 0 WHERE snapshot_count > 0 AND status <> 'processing'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('video_job', 'snapshot_level')
+    op.drop_column('snapshot_config', 'preview_fps')
+    op.drop_column('snapshot', 'level')
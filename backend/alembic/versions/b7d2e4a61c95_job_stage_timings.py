@@ -0,0 +1,29 @@
+"""job stage timings
+
+Revision ID: b7d2e4a61c95
+Revises: 5a0f3e9d7b14
+Create Date: 2026-10-18 13:02:41.527390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4a61c95'
+down_revision: Union[str, Sequence[str], None] = '5a0f3e9d7b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_job', sa.Column('stage_timings', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('video_job', 'stage_timings')
@@ -0,0 +1,28 @@
+"""narrative updated_at
+
+Revision ID: c8e1f4a7d920
+Revises: 5d2a8f6c3e17
+Create Date: 2026-10-18 23:41:27.205113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f4a7d920'
+down_revision: Union[str, Sequence[str], None] = '5d2a8f6c3e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('narrative', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('narrative', 'updated_at')
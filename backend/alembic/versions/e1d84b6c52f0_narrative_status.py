@@ -0,0 +1,30 @@
+"""narrative status
+
+Revision ID: e1d84b6c52f0
+Revises: 9c3f5a17e2b8
+Create Date: 2026-10-18 11:48:09.316720
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1d84b6c52f0'
+down_revision: Union[str, Sequence[str], None] = '9c3f5a17e2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('narrative', sa.Column('status', sa.String(), server_default='generated', nullable=False))
+    op.add_column('narrative', sa.Column('error', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('narrative', 'error')
+    op.drop_column('narrative', 'status')
@@ -0,0 +1,29 @@
+"""video job updated_at
+
+Revision ID: f2b9d6e3a418
+Revises: c8e1f4a7d920
+Create Date: 2026-10-18 23:58:42.617390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b9d6e3a418'
+down_revision: Union[str, Sequence[str], None] = 'c8e1f4a7d920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_job', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE video_job SET updated_at = now()")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('video_job', 'updated_at')
@@ -1,22 +1,78 @@
+from datetime import datetime
+from functools import partial
 from pathlib import Path
 
+import hashlib
 import uuid
-import shutil
+
+import anyio
 from fastapi import File, Form, UploadFile
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response
+from starlette.requests import ClientDisconnect
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.persistence.db import get_db, SessionLocal
+from app.api.responses import FastJSONResponse
+from app.persistence.db import get_async_db, get_db, SessionLocal
 from app.persistence.tables import Snapshot, SnapshotConfig, VideoAsset, VideoJob
-from app.pipeline.extract import extract_preprocess_persist_snapshots
+from app.pipeline.derive import derive_snapshots
+from app.pipeline.extract import PREVIEW_FPS, density_levels, extract_preprocess_persist_snapshots, frames_dir
+from app.pipeline.lazy import plan_lazy_job
+from app.pipeline.orchestrator import run_full_pipeline
+from app.pipeline.queue import enqueue, queue_enabled, submit
+from app.pipeline.regenerate import ensure_snapshots, restore_snapshots
+from app.pipeline.stream_extract import StreamingExtraction, stream_decodable
+from app.pipeline.scheduling import DEFAULT_PRIORITY, PRIORITY_OFFSET_SEC, probe_duration_sec
+from app.api.static import IMMUTABLE_CACHE, REVALIDATE_CACHE
+from app.services.storage import artifacts, get_storage, job_key
+from app.services.storage import pack as framepack
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
-STORAGE_ROOT = Path(__file__).resolve().parents[3] / "storage"
+PIPELINES = ("full",)
+
+DEFAULT_JOBS_LIMIT = 50
+MAX_JOBS_LIMIT = 200
+DEFAULT_SNAPSHOT_LIMIT = 500
+MAX_SNAPSHOT_LIMIT = 5000
+
+# pipeline stages are reading or writing the job's snapshots
+BUSY_STATUSES = ("processing", "describing", "narrating")
+
+# what ffmpeg, OpenCV and PIL all read and write
+IMAGE_FORMATS = ("jpg", "jpeg", "png", "webp", "bmp")
 
 
 def _run_extract_job(job_id: str) -> None:
+    _run_snapshot_job(job_id, _extract_or_plan)
+
+
+def _extract_or_plan(job_id: str, db: Session) -> None:
+    # lazy jobs only get their scene boundaries; keyframes are seeked on first use
+    if db.query(SnapshotConfig.lazy).filter_by(job_id=job_id).scalar():
+        plan_lazy_job(job_id, db)
+    else:
+        extract_preprocess_persist_snapshots(job_id, db)
+
+
+def _fallback_extract(job_id: str) -> None:
+    """Disk extraction after a failed streamed one: a durable task when there is a queue."""
+    if not queue_enabled():
+        _run_extract_job(job_id)
+        return
+    db = SessionLocal()
+    try:
+        enqueue(db, "extract", job_id)
+    finally:
+        db.close()
+
+
+def _run_derive_job(job_id: str) -> None:
+    _run_snapshot_job(job_id, derive_snapshots)
+
+
+def _run_snapshot_job(job_id: str, stage) -> None:
     db = SessionLocal()
     try:
         job = db.query(VideoJob).filter_by(job_id=job_id).first()
@@ -26,12 +82,14 @@ def _run_extract_job(job_id: str) -> None:
         job.status = "processing"
         db.commit()
 
-        extract_preprocess_persist_snapshots(job_id, db, STORAGE_ROOT)
+        stage(job_id, db)
 
         job.status = "completed"
         db.commit()
 
     except Exception as e:
+        # the stage may have left a failed flush or a half-built set of rows behind
+        db.rollback()
         job = db.query(VideoJob).filter_by(job_id=job_id).first()
         if job:
             job.status = "failed"
@@ -44,21 +102,51 @@ def _run_extract_job(job_id: str) -> None:
     finally:
         db.close()
 
+def _run_pipeline_job(job_id: str) -> None:
+    run_full_pipeline(job_id)
+
+
+def _check_pipeline(pipeline: str | None) -> None:
+    if pipeline is not None and pipeline not in PIPELINES:
+        raise HTTPException(status_code=400, detail=f"pipeline must be one of {PIPELINES}")
+
+
+def _parse_jobs_cursor(cursor: str) -> tuple[datetime, str]:
+    created, sep, jid = cursor.partition(",")
+    try:
+        if not sep or not jid:
+            raise ValueError
+        return datetime.fromisoformat(created), jid
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("")
-def list_jobs(db: Session = Depends(get_db)):
-    rows = (
-        db.query(
-            VideoJob.job_id,
-            VideoJob.status,
-            VideoJob.created_at,
-            func.count(Snapshot.snapshot_id).label("snapshot_count"),
-        )
-        .outerjoin(Snapshot, Snapshot.job_id == VideoJob.job_id)
-        .group_by(VideoJob.job_id)
-        .order_by(VideoJob.created_at.desc())
-        .all()
+async def list_jobs(
+    limit: int = Query(DEFAULT_JOBS_LIMIT, ge=1, le=MAX_JOBS_LIMIT),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Newest first, keyset-paginated on (created_at, job_id): pass next_cursor
+    back as ?cursor=. Counts come from the job row, so a page costs O(limit).
+    """
+    q = select(
+        VideoJob.job_id,
+        VideoJob.status,
+        VideoJob.created_at,
+        VideoJob.snapshot_count,
+        VideoJob.scene_count,
     )
+    if cursor:
+        created, jid = _parse_jobs_cursor(cursor)
+        q = q.where(tuple_(VideoJob.created_at, VideoJob.job_id) < tuple_(created, jid))
+
+    rows = (await db.execute(q.order_by(VideoJob.created_at.desc(), VideoJob.job_id.desc()).limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
+    last = rows[-1] if rows else None
     return {
         "jobs": [
             {
@@ -66,26 +154,22 @@ def list_jobs(db: Session = Depends(get_db)):
                 "status": r.status,
                 "created_at": r.created_at.isoformat() if r.created_at else None,
                 "snapshot_count": int(r.snapshot_count or 0),
+                "scene_count": int(r.scene_count or 0),
             }
             for r in rows
-        ]
+        ],
+        "next_cursor": f"{last.created_at.isoformat()},{last.job_id}" if has_more else None,
     }
 
 
 @router.get("/{job_id}")
-def get_job(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.scalar(select(VideoJob).filter_by(job_id=job_id))
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    asset = db.query(VideoAsset).filter_by(job_id=job_id).first()
-    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).first()
-
-    snapshot_count = (
-        db.query(func.count(Snapshot.snapshot_id))
-        .filter(Snapshot.job_id == job_id)
-        .scalar()
-    )
+    asset = await db.scalar(select(VideoAsset).filter_by(job_id=job_id))
+    cfg = await db.scalar(select(SnapshotConfig).filter_by(job_id=job_id))
 
     return {
         "job_id": job.job_id,
@@ -93,7 +177,14 @@ def get_job(job_id: str, db: Session = Depends(get_db)):
         "error": getattr(job, "error", None),
         "created_at": job.created_at.isoformat() if job.created_at else None,
         "video_uri": asset.uri if asset else None,
-        "snapshot_count": int(snapshot_count or 0),
+        "video_url": _video_url(asset) if asset else None,
+        "snapshot_count": int(job.snapshot_count or 0),
+        "snapshot_level": job.snapshot_level,
+        "scene_count": int(job.scene_count or 0),
+        "stage_timings": job.stage_timings or {},
+        "priority": job.priority,
+        "tenant": job.tenant,
+        "duration_sec": asset.duration_sec if asset else None,
         "config": None
         if not cfg
         else {
@@ -103,41 +194,194 @@ def get_job(job_id: str, db: Session = Depends(get_db)):
             "grayscale": bool(cfg.grayscale),
             "black_white": bool(cfg.black_white),
             "image_format": cfg.image_format,
+            "packed": bool(cfg.packed),
+            "preview_fps": cfg.preview_fps,
+            "lazy": bool(cfg.lazy),
         },
     }
 
 
-@router.get("/{job_id}/snapshots")
-def list_snapshots(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(VideoJob).filter_by(job_id=job_id).first()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+def _snapshot_cursor(timestamp_sec: float, snapshot_id: str) -> str:
+    return f"{timestamp_sec!r},{snapshot_id}"
+
+
+def _parse_snapshot_cursor(cursor: str) -> tuple[float, str]:
+    ts, sep, sid = cursor.partition(",")
+    try:
+        if not sep or not sid:
+            raise ValueError
+        return float(ts), sid
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _storage_url(storage, uri: str, version: str | None = None) -> str:
+    try:
+        return storage.url(uri, version)
+    except ValueError:
+        raise HTTPException(status_code=500, detail="Snapshot stored outside storage root")
 
-    snaps = (
-        db.query(Snapshot)
-        .filter(Snapshot.job_id == job_id)
-        .order_by(Snapshot.timestamp_sec.asc())
-        .all()
-    )
 
-    out = []
-    for s in snaps:
-        p = Path(s.uri)
+def _video_version(content_sha256: str | None, video_id: str) -> str:
+    return (content_sha256 or "")[:16] or video_id
 
-        rel = p.relative_to(STORAGE_ROOT)
-        url = f"/storage/{rel.as_posix()}"
 
-        out.append(
+def _video_url(asset: VideoAsset) -> str | None:
+    try:
+        return get_storage().url(asset.uri, _video_version(asset.content_sha256, asset.video_id))
+    except ValueError:
+        # assets registered before storage moved aren't reachable
+        return None
+
+
+@router.get("/{job_id}/snapshots")
+async def list_snapshots(
+    job_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_SNAPSHOT_LIMIT, ge=1, le=MAX_SNAPSHOT_LIMIT),
+    cursor: str | None = None,
+    offset: int = Query(0, ge=0),
+    format: str = Query("rows", pattern="^(rows|columns)$"),
+    level: int | None = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Snapshots ordered by (timestamp_sec, snapshot_id). Pass next_cursor back as
+    ?cursor= for the next page (keyset, constant cost per page); offset is kept
+    for older clients and ignored when a cursor is given.
+
+    ?format=columns returns `snapshots` as one array per field instead of one
+    object per snapshot: no repeated keys, so about a quarter smaller
+    uncompressed and several times faster to render.
+
+    Pages carry an ETag derived from the job's snapshot set, so clients can
+    revalidate with If-None-Match and get a 304 until extraction changes it.
+
+    `levels` lists the sampling rate of each density level and whether it is
+    complete for the whole video; ?level=0 returns only the coarse preview
+    grid, which is complete long before full-rate extraction is.
+    """
+    job = (
+        await db.execute(
+            select(
+                VideoJob.status,
+                VideoJob.snapshot_count,
+                VideoJob.snapshot_level,
+                VideoJob.updated_at,
+                SnapshotConfig.sampling_fps,
+                SnapshotConfig.preview_fps,
+            )
+            .outerjoin(SnapshotConfig, SnapshotConfig.job_id == VideoJob.job_id)
+            .where(VideoJob.job_id == job_id)
+        )
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if await artifacts.touch_async(db, job_id):
+        # evicted under the disk quota; the URLs below must resolve again
+        await anyio.to_thread.run_sync(restore_snapshots, job_id)
+    storage = get_storage()
+    in_level = (Snapshot.job_id == job_id,) + ((Snapshot.level <= level,) if level is not None else ())
+
+    # every write to the snapshot set goes through the job's counters, which bump updated_at
+    version = (
+        f"{job_id}:{job.status}:{job.snapshot_count}:{job.snapshot_level}:{job.updated_at}:{limit}:{cursor or ''}"
+        f":{0 if cursor else offset}:{format}:{level}:{storage.url_epoch}"
+    )
+    etag = 'W/"' + hashlib.sha1(version.encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    total = job.snapshot_count
+    if level is not None:
+        total = await db.scalar(select(func.count(Snapshot.snapshot_id)).where(*in_level))
+
+    q = (
+        select(
+            Snapshot.snapshot_id,
+            Snapshot.timestamp_sec,
+            Snapshot.uri,
+            Snapshot.width,
+            Snapshot.height,
+        )
+        .where(*in_level)
+    )
+    if cursor:
+        after_ts, after_id = _parse_snapshot_cursor(cursor)
+        q = q.where(tuple_(Snapshot.timestamp_sec, Snapshot.snapshot_id) > tuple_(after_ts, after_id))
+    elif offset:
+        q = q.offset(offset)
+
+    q = q.order_by(Snapshot.timestamp_sec.asc(), Snapshot.snapshot_id.asc()).limit(limit + 1)
+    rows = (await db.execute(q)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if format == "columns":
+        out = {
+            "snapshot_id": [r.snapshot_id for r in rows],
+            "timestamp_sec": [r.timestamp_sec for r in rows],
+            "url": [_storage_url(storage, r.uri, r.snapshot_id) for r in rows],
+            "width": [r.width for r in rows],
+            "height": [r.height for r in rows],
+        }
+    else:
+        out = [
             {
-                "snapshot_id": s.snapshot_id,
-                "timestamp_sec": s.timestamp_sec,
-                "url": url,
-                "width": s.width,
-                "height": s.height,
+                "snapshot_id": r.snapshot_id,
+                "timestamp_sec": r.timestamp_sec,
+                # a new extraction means new snapshot ids, so the URL changes with the file
+                "url": _storage_url(storage, r.uri, r.snapshot_id),
+                "width": r.width,
+                "height": r.height,
             }
-        )
+            for r in rows
+        ]
 
-    return {"job_id": job_id, "count": len(out), "snapshots": out}
+    next_cursor = _snapshot_cursor(rows[-1].timestamp_sec, rows[-1].snapshot_id) if has_more else None
+    fps_levels = density_levels(job) if job.sampling_fps else []
+    complete = -1 if job.snapshot_level is None else job.snapshot_level
+    body = {
+        "job_id": job_id,
+        "count": len(rows),
+        "total": int(total or 0),
+        "next_cursor": next_cursor,
+        "format": format,
+        "level": level,
+        "levels": [{"level": i, "fps": fps, "complete": i <= complete} for i, fps in enumerate(fps_levels)],
+        "snapshots": out,
+    }
+    return FastJSONResponse(body, headers=headers)
+
+
+@router.get("/{job_id}/frames/{index}")
+def get_frame(job_id: str, index: int, request: Request, v: str | None = None, db: Session = Depends(get_db)):
+    """
+    One frame of a packed job, read by its offset/length from the mmapped
+    pack. Snapshot URLs of packed jobs point here (with ?v=<snapshot_id>).
+    """
+    ensure_snapshots(db, job_id)
+    # derived snapshots are packed under their own prefix, so ask a row where the pack is
+    uri = db.scalar(select(Snapshot.uri).where(Snapshot.job_id == job_id).limit(1))
+    packed = framepack.split_frame_uri(uri) if uri else None
+    if packed is None:
+        raise HTTPException(status_code=404, detail="Frame not found")
+    try:
+        reader = framepack.open_pack(get_storage().fetch_pack(packed[0]))
+        data = reader.frame(index)
+    except (FileNotFoundError, IndexError):
+        raise HTTPException(status_code=404, detail="Frame not found")
+
+    headers = {
+        # the pack id changes whenever the pack is rewritten
+        "ETag": f'"{reader.pack_id.hex()}-{index}"',
+        "Cache-Control": IMMUTABLE_CACHE if v else REVALIDATE_CACHE,
+    }
+    if headers["ETag"] in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(bytes(data), media_type=framepack.image_type(data)[1], headers=headers)
 
 
 @router.post("/{job_id}/extract")
@@ -146,9 +390,85 @@ def run_extract(job_id: str, background: BackgroundTasks, db: Session = Depends(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    background.add_task(_run_extract_job, job_id)
+    submit(db, background, "extract", job_id, _run_extract_job)
     return {"job_id": job_id, "status": "extraction_started"}
 
+
+@router.post("/{job_id}/snapshots/derive")
+def derive_snapshot_variant(
+    job_id: str,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    resize_width: int | None = Form(None),
+    grayscale: bool | None = Form(None),
+    black_white: bool | None = Form(None),
+    image_format: str | None = Form(None),
+):
+    """
+    Redo the job's snapshots with another resize_width / grayscale /
+    black_white / image_format (omitted fields keep their value). Frames come
+    from the job's master frame cache, so only the preprocessing runs again,
+    not ffmpeg (app/pipeline/derive.py). Snapshots are replaced as by
+    POST /extract, so scenes need rebuilding afterwards.
+    """
+    if image_format is not None and image_format not in IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"image_format must be one of {IMAGE_FORMATS}")
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).one_or_none()
+    if cfg is None:
+        raise HTTPException(status_code=404, detail="SnapshotConfig not found for job")
+
+    # claim the job in the same statement that checks it, so two derives can't both start
+    claimed = (
+        db.query(VideoJob)
+        .filter(VideoJob.job_id == job_id, VideoJob.status.notin_(BUSY_STATUSES))
+        .update({VideoJob.status: "processing"}, synchronize_session=False)
+    )
+    if not claimed:
+        status = db.scalar(select(VideoJob.status).where(VideoJob.job_id == job_id))
+        raise HTTPException(status_code=409, detail=f"Job is {status}")
+
+    changes = {
+        "resize_width": resize_width,
+        "grayscale": grayscale,
+        "black_white": black_white,
+        "image_format": image_format,
+    }
+    for field, value in changes.items():
+        if value is not None:
+            setattr(cfg, field, value)
+    db.commit()
+
+    submit(db, background, "derive", job_id, _run_derive_job)
+    return {
+        "job_id": job_id,
+        "status": "derive_started",
+        "config": {
+            "sampling_fps": float(cfg.sampling_fps),
+            "chunk_length_sec": cfg.chunk_length_sec,
+            "resize_width": cfg.resize_width,
+            "grayscale": bool(cfg.grayscale),
+            "black_white": bool(cfg.black_white),
+            "image_format": cfg.image_format,
+            "packed": bool(cfg.packed),
+            "preview_fps": cfg.preview_fps,
+            "lazy": bool(cfg.lazy),
+        },
+    }
+
+
+@router.post("/{job_id}/pipeline")
+def run_pipeline(job_id: str, background: BackgroundTasks, db: Session = Depends(get_db)):
+    """Re-run every stage (extract, scenes, describe, narrative) for an existing job."""
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    submit(db, background, "pipeline", job_id, _run_pipeline_job)
+    return {"job_id": job_id, "status": "pipeline_started"}
+
 def _save_upload(upload: UploadFile, dst: Path) -> None:
     dst.parent.mkdir(parents=True, exist_ok=True)
     with dst.open("wb") as f:
@@ -159,6 +479,99 @@ def _save_upload(upload: UploadFile, dst: Path) -> None:
             f.write(chunk)
 
 
+def _check_priority(priority: str) -> None:
+    if priority not in PRIORITY_OFFSET_SEC:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {tuple(PRIORITY_OFFSET_SEC)}")
+
+
+def _check_lazy(lazy: bool, packed: bool) -> None:
+    if lazy and packed:
+        # keyframes are added one scene at a time, in no particular order
+        raise HTTPException(status_code=400, detail="lazy jobs store loose snapshots, not packed ones")
+
+
+def _register_job(
+    db: Session,
+    background: BackgroundTasks,
+    job_id: str,
+    video_key: str,
+    *,
+    sampling_fps: float,
+    chunk_length_sec: int,
+    resize_width: int,
+    grayscale: bool,
+    black_white: bool,
+    image_format: str,
+    run_extract: bool,
+    pipeline: str | None,
+    priority: str,
+    tenant: str | None,
+    content_sha256: str | None = None,
+    probe_duration: bool = True,
+    packed: bool = False,
+    preview_fps: float | None = None,
+    lazy: bool = False,
+) -> dict:
+    """Persist job, asset and config rows for a video already stored at video_key, then start work."""
+    storage = get_storage()
+    db.add(VideoJob(job_id=job_id, status="uploaded", priority=priority, tenant=tenant))
+
+    #persist video asset row
+    video_id = str(uuid.uuid4())
+    db.add(
+        VideoAsset(
+            video_id=video_id,
+            job_id=job_id,
+            uri=video_key,
+            duration_sec=probe_duration_sec(storage.local_path(video_key)) if probe_duration else None,
+            content_sha256=content_sha256,
+        )
+    )
+
+    #persist snapshot config row
+    db.add(
+        SnapshotConfig(
+            config_id=str(uuid.uuid4()),
+            job_id=job_id,
+            sampling_fps=sampling_fps,
+            chunk_length_sec=chunk_length_sec,
+            resize_width=resize_width,
+            grayscale=grayscale,
+            black_white=black_white,
+            image_format=image_format,
+            packed=packed,
+            preview_fps=preview_fps,
+            lazy=lazy,
+        )
+    )
+
+    db.commit()
+
+    #run extraction in background (or hand it to a worker, see app/pipeline/queue.py)
+    started = run_extract or pipeline is not None
+    if pipeline == "full":
+        submit(db, background, "pipeline", job_id, _run_pipeline_job)
+    elif run_extract:
+        submit(db, background, "extract", job_id, _run_extract_job)
+
+    return {
+        "job_id": job_id,
+        "status": "processing" if started else "uploaded",
+        "pipeline": pipeline,
+        "video_url": storage.url(video_key, _video_version(content_sha256, video_id)),
+    }
+
+
+def _video_ext(filename: str | None) -> str:
+    if filename and "." in filename:
+        return filename.rsplit(".", 1)[-1].lower()
+    return "mp4"
+
+
+def _video_key(job_id: str, filename: str | None) -> str:
+    return job_key(job_id, "video", f"original.{_video_ext(filename)}")
+
+
 @router.post("")
 def create_job(
     background: BackgroundTasks,
@@ -173,61 +586,179 @@ def create_job(
     grayscale: bool = Form(False),
     black_white: bool = Form(False),
     image_format: str = Form("jpg"),
+    # one pack file + index per job instead of a file per snapshot
+    packed: bool = Form(False),
+    # keyframe preview pass before full extraction; unset = PREVIEW_FPS, 0 = off
+    preview_fps: float | None = Form(None, ge=0),
+    # decode nothing up front, only each scene's keyframes when first needed
+    lazy: bool = Form(False),
 
     run_extract: bool = Form(True),
+
+    # "full" chains extract -> scenes -> describe -> narrative (see app/pipeline/orchestrator.py)
+    pipeline: str | None = None,
+
+    # queue scheduling (TASK_QUEUE=db): priority class and fair-share tenant
+    priority: str = DEFAULT_PRIORITY,
+    x_tenant_id: str | None = Header(None),
 ):
-    job_id = str(uuid.uuid4())
+    """Single-request upload. Large files should use the resumable /uploads protocol instead."""
+    _check_pipeline(pipeline)
+    _check_priority(priority)
+    _check_lazy(lazy, packed)
 
-    #create job
-    job = VideoJob(job_id=job_id, status="uploaded")
-    db.add(job)
+    job_id = str(uuid.uuid4())
 
     #save video file into storage
-    ext = "mp4"
-    if video.filename and "." in video.filename:
-        ext = video.filename.rsplit(".", 1)[-1].lower()
-
-    video_path = STORAGE_ROOT / "jobs" / job_id / "video" / f"original.{ext}"
+    storage = get_storage()
+    video_key = _video_key(job_id, video.filename)
     try:
-        _save_upload(video, video_path)
+        _save_upload(video, storage.local_path(video_key))
+        storage.put([video_key])
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to save upload: {e}")
 
-    #persist video asset row
-    db.add(
-        VideoAsset(
-            video_id=str(uuid.uuid4()),
-            job_id=job_id,
-            uri=str(video_path),
-        )
+    return _register_job(
+        db,
+        background,
+        job_id,
+        video_key,
+        sampling_fps=sampling_fps,
+        chunk_length_sec=chunk_length_sec,
+        resize_width=resize_width,
+        grayscale=grayscale,
+        black_white=black_white,
+        image_format=image_format,
+        run_extract=run_extract,
+        pipeline=pipeline,
+        priority=priority,
+        tenant=x_tenant_id,
+        packed=packed,
+        preview_fps=PREVIEW_FPS if preview_fps is None else preview_fps,
+        lazy=lazy,
     )
 
-    #persist snapshot config row
-    db.add(
-        SnapshotConfig(
-            config_id=str(uuid.uuid4()),
-            job_id=job_id,
+def _start_streaming(db: Session, job_id: str) -> StreamingExtraction:
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).one()
+    db.query(VideoJob).filter_by(job_id=job_id).update({VideoJob.status: "processing"})
+    db.commit()
+    return StreamingExtraction(job_id, cfg, frames_dir(get_storage(), job_id, cfg), _fallback_extract)
+
+
+def _finish_upload(db: Session, job_id: str, video_key: str, failed: str | None) -> None:
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    if failed:
+        job.status = "failed"
+        job.error = failed
+    else:
+        # publish before any fallback extraction, which may run on another node
+        get_storage().put([video_key])
+    asset = db.query(VideoAsset).filter_by(job_id=job_id).first()
+    asset.duration_sec = probe_duration_sec(get_storage().local_path(video_key))
+    db.commit()
+
+
+@router.post("/stream")
+async def create_job_streaming(
+    request: Request,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+
+    filename: str = "upload.mp4",
+
+    sampling_fps: float = 1.0,
+    chunk_length_sec: int = 10,
+    resize_width: int = 512,
+    grayscale: bool = False,
+    black_white: bool = False,
+    image_format: str = "jpg",
+    packed: bool = False,
+    run_extract: bool = True,
+
+    priority: str = DEFAULT_PRIORITY,
+    x_tenant_id: str | None = Header(None),
+):
+    """
+    Raw-body upload (config as query params) that extracts while uploading:
+    for stream-decodable containers the body is teed into ffmpeg's stdin while
+    it is written to disk, so snapshots land during the upload. Other files
+    are extracted from disk once the upload completes.
+    """
+    _check_priority(priority)
+    ext = _video_ext(filename)
+
+    job_id = str(uuid.uuid4())
+    video_key = _video_key(job_id, filename)
+    video_path = get_storage().local_path(video_key)
+
+    chunks = request.stream()
+    head = b""
+    decodable = None
+    try:
+        # buffer just enough to tell whether ffmpeg can read this from a pipe
+        async for data in chunks:
+            head += data
+            decodable = stream_decodable(ext, head)
+            if decodable is not None:
+                break
+    except ClientDisconnect:
+        # nothing is on disk or in the database yet
+        raise HTTPException(status_code=400, detail="Upload interrupted")
+
+    await anyio.Path(video_path.parent).mkdir(parents=True, exist_ok=True)
+    async with await anyio.open_file(video_path, "wb") as f:
+        await f.write(head)
+
+        out = await anyio.to_thread.run_sync(partial(
+            _register_job,
+            db,
+            background,
+            job_id,
+            video_key,
             sampling_fps=sampling_fps,
             chunk_length_sec=chunk_length_sec,
             resize_width=resize_width,
             grayscale=grayscale,
             black_white=black_white,
             image_format=image_format,
-        )
-    )
-
-    db.commit()
-
-    #run extraction in background 
-    if run_extract:
-        background.add_task(_run_extract_job, job_id)
+            run_extract=False,
+            pipeline=None,
+            priority=priority,
+            tenant=x_tenant_id,
+            probe_duration=False,
+            packed=packed,
+        ))
+
+        streaming = None
+        if run_extract and decodable:
+            streaming = await anyio.to_thread.run_sync(_start_streaming, db, job_id)
+            await anyio.to_thread.run_sync(streaming.feed, head)
+
+        try:
+            async for data in chunks:
+                await f.write(data)
+                if streaming is not None:
+                    await anyio.to_thread.run_sync(streaming.feed, data)
+        except ClientDisconnect:
+            if streaming is not None:
+                streaming.abort()
+            await anyio.to_thread.run_sync(_finish_upload, db, job_id, video_key, "Upload interrupted")
+            raise HTTPException(status_code=400, detail="Upload interrupted")
+
+    await anyio.to_thread.run_sync(_finish_upload, db, job_id, video_key, None)
+
+    status = out["status"]
+    extract = partial(submit, db, background, "extract", job_id, _run_extract_job)
+    if streaming is not None:
+        status = "processing"
+        if streaming.finish():
+            await anyio.to_thread.run_sync(extract)
+    elif run_extract:
+        status = "processing"
+        await anyio.to_thread.run_sync(extract)
+
+    return {**out, "status": status, "streamed": streaming is not None}
 
-    return {
-        "job_id": job_id,
-        "status": "processing" if run_extract else "uploaded",
-        "video_url": f"/storage/jobs/{job_id}/video/{video_path.name}",
-    }
 
 @router.delete("/{job_id}")
 def delete_job(job_id: str, db: Session = Depends(get_db)):
@@ -238,7 +769,6 @@ def delete_job(job_id: str, db: Session = Depends(get_db)):
     db.delete(job)
     db.commit()
 
-    job_dir = STORAGE_ROOT / "jobs" / job_id
-    shutil.rmtree(job_dir, ignore_errors=True)
+    get_storage().delete_prefix(job_key(job_id))
 
     return {"job_id": job_id, "status": "deleted"}
\ No newline at end of file
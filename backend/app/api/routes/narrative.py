@@ -1,14 +1,51 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import anyio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.persistence.db import get_db
-from app.persistence.tables import Narrative, Scene, VideoJob
-from app.services.llm.hf_text_client import generate_narrative_from_scenes
+from app.api.sse import SSE_HEADERS, sse_event
+from app.persistence.db import SessionLocal, get_async_db, get_db
+from app.persistence.tables import Narrative, NarrativeWindow, Scene, VideoJob
+from app.pipeline.queue import submit
+from app.services.llm.hf_text_client import (
+    condense_scene_lines,
+    generate_narrative_from_scenes,
+    generate_narrative_hierarchical,
+    hierarchy_config,
+    parse_narrative_response,
+    stream_narrative_from_scenes,
+    summarize_window,
+    window_cache_key,
+)
+from app.services.singleflight import SingleFlight, advisory_lock
 
 router = APIRouter(prefix="/jobs", tags=["narrative"])
 
+# coalesces duplicate generate calls for the same job
+_narrative_flight = SingleFlight()
+
+NARRATIVE_MODES = ("auto", "flat", "hierarchical")
+
+# Narrative.status values; queued/running block a second background run
+NARRATIVE_ACTIVE = ("queued", "running")
+NARRATIVE_DONE = ("generated", "failed")
+
+# a queued/running status not updated for this long belongs to a run that died
+NARRATIVE_STALE_SEC = int(os.getenv("NARRATIVE_STALE_SEC", str(30 * 60)))
+
+STATUS_POLL_SEC = 1.0
+STATUS_STREAM_TIMEOUT_SEC = 15 * 60
+
 
 def _scene_line(s: Scene) -> str:
     start = float(s.start_sec or 0)
@@ -17,33 +54,39 @@ def _scene_line(s: Scene) -> str:
     return f"{start:.0f}-{end:.0f}s: {desc}"
 
 
+def _narrative_out(n: Narrative) -> dict:
+    return {
+        "short_summary": n.short_summary,
+        "full_story": n.full_story,
+        "structured_data": n.structured_data,
+    }
+
+
 @router.get("/{job_id}/narrative")
-def get_narrative(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+async def get_narrative(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.scalar(select(VideoJob.job_id).filter_by(job_id=job_id))
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    n = db.query(Narrative).filter_by(job_id=job_id).first()
-    if not n:
-        return {"job_id": job_id, "exists": False, "narrative": None}
+    n = await db.scalar(select(Narrative).filter_by(job_id=job_id))
+    # a queued first run has a row but no text yet
+    if not n or not n.full_story:
+        return {
+            "job_id": job_id,
+            "exists": False,
+            "status": n.status if n else None,
+            "narrative": None,
+        }
 
     return {
         "job_id": job_id,
         "exists": True,
-        "narrative": {
-            "short_summary": n.short_summary,
-            "full_story": n.full_story,
-            "structured_data": n.structured_data,
-        },
+        "status": n.status,
+        "narrative": _narrative_out(n),
     }
 
 
-@router.post("/{job_id}/narrative/generate")
-def generate_narrative(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(VideoJob).filter_by(job_id=job_id).first()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-
+def _scene_lines(db: Session, job_id: str) -> list[str]:
     scenes = (
         db.query(Scene)
         .filter(Scene.job_id == job_id)
@@ -59,15 +102,80 @@ def generate_narrative(job_id: str, db: Session = Depends(get_db)):
         and s.short_description.strip() != "(pending)"
     ]
 
-    if not usable:
+    return [_scene_line(s) for s in usable]
+
+
+def _usable_scene_lines(db: Session, job_id: str) -> list[str]:
+    lines = _scene_lines(db, job_id)
+    if not lines:
         raise HTTPException(
             status_code=400,
             detail="No scenes are ready yet. Go to the Scenes tab and add descriptions first.",
         )
 
-    lines = [_scene_line(s) for s in usable]
-    result = generate_narrative_from_scenes(lines)
+    return lines
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in NARRATIVE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(NARRATIVE_MODES)}")
 
+
+def _use_hierarchy(lines: list[str], mode: str) -> bool:
+    """auto: map-reduce only once the scenes no longer fit one window."""
+    if mode == "auto":
+        return len(lines) > hierarchy_config().window_size
+    return mode == "hierarchical"
+
+
+class _WindowCache:
+    """
+    Persistent per-job cache of window summaries for hierarchical generation.
+    summarize() is called from the map thread pool, so it only touches
+    in-memory state; save() writes new entries and drops unused ones.
+    """
+
+    def __init__(self, db: Session, job_id: str) -> None:
+        self._db = db
+        self._job_id = job_id
+        self._lock = threading.Lock()
+        self._known = {
+            w.lines_hash: w.summary
+            for w in db.query(NarrativeWindow).filter_by(job_id=job_id).all()
+        }
+        self._new: dict[str, str] = {}
+        self._used: set[str] = set()
+
+    def summarize(self, lines: list[str]) -> str:
+        key = window_cache_key(lines)
+        with self._lock:
+            self._used.add(key)
+            hit = self._known.get(key) or self._new.get(key)
+        if hit is not None:
+            return hit
+
+        summary = summarize_window(lines)
+        with self._lock:
+            self._new[key] = summary
+        return summary
+
+    def stats(self) -> dict:
+        return {"cached": len(self._used) - len(self._new), "summarized": len(self._new)}
+
+    def save(self) -> None:
+        stale = [k for k in self._known if k not in self._used]
+        if stale:
+            (
+                self._db.query(NarrativeWindow)
+                .filter(NarrativeWindow.job_id == self._job_id)
+                .filter(NarrativeWindow.lines_hash.in_(stale))
+                .delete(synchronize_session=False)
+            )
+        for key, summary in self._new.items():
+            self._db.add(NarrativeWindow(job_id=self._job_id, lines_hash=key, summary=summary))
+
+
+def _save_narrative(db: Session, job_id: str, result) -> Narrative:
     n = db.query(Narrative).filter_by(job_id=job_id).first()
     if not n:
         n = Narrative(job_id=job_id)
@@ -75,17 +183,245 @@ def generate_narrative(job_id: str, db: Session = Depends(get_db)):
     n.full_story = result.narrative
     n.short_summary = result.summary
     n.structured_data = result.structured
+    n.status = "generated"
+    n.error = None
+    n.updated_at = datetime.now(timezone.utc)
 
     db.add(n)
     db.commit()
     db.refresh(n)
+    return n
+
+
+def _generate_and_save(db: Session, job_id: str, lines: list[str], hierarchical: bool) -> tuple[Narrative, dict | None]:
+    windows = None
+    if hierarchical:
+        # only windows whose scene lines changed hit the LLM again
+        cache = _WindowCache(db, job_id)
+        result = generate_narrative_hierarchical(lines, summarize=cache.summarize)
+        cache.save()
+        windows = cache.stats()
+    else:
+        result = generate_narrative_from_scenes(lines)
+
+    return _save_narrative(db, job_id, result), windows
+
+
+def _set_narrative_status(db: Session, job_id: str, status: str, error: str | None = None) -> Narrative:
+    n = db.query(Narrative).filter_by(job_id=job_id).first()
+    if not n:
+        # placeholder row so the status is visible before the first text exists
+        n = Narrative(job_id=job_id, short_summary="", full_story="")
+        db.add(n)
+
+    n.status = status
+    n.error = error
+    n.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    return n
+
+
+def _run_narrative_job(job_id: str, mode: str = "auto") -> None:
+    db = SessionLocal()
+    try:
+        lines = _scene_lines(db, job_id)
+        if not lines:
+            _set_narrative_status(db, job_id, "failed", "No scenes are described yet.")
+            return
 
+        with advisory_lock(db, f"narrative:{job_id}"):
+            _set_narrative_status(db, job_id, "running")
+            _generate_and_save(db, job_id, lines, _use_hierarchy(lines, mode))
+
+    except Exception as e:
+        db.rollback()
+        if db.query(VideoJob).filter_by(job_id=job_id).first():
+            _set_narrative_status(db, job_id, "failed", str(e))
+
+    finally:
+        db.close()
+
+
+def queue_narrative_generation(db: Session, background: BackgroundTasks, job_id: str, mode: str = "auto") -> str:
+    """
+    Mark the job's narrative as queued and run it after the response.
+    Returns the resulting status; an already queued/running job is not queued
+    twice unless its status is older than NARRATIVE_STALE_SEC.
+    """
+    now = datetime.now(timezone.utc)
+    # check-and-set in one statement, so two requests can't both queue a run
+    claimed = db.execute(
+        update(Narrative)
+        .where(Narrative.job_id == job_id)
+        .where(or_(
+            Narrative.status.notin_(NARRATIVE_ACTIVE),
+            Narrative.updated_at.is_(None),
+            Narrative.updated_at < now - timedelta(seconds=NARRATIVE_STALE_SEC),
+        ))
+        .values(status="queued", error=None, updated_at=now)
+    ).rowcount
+    db.commit()
+
+    if not claimed:
+        n = db.query(Narrative).filter_by(job_id=job_id).first()
+        if n:
+            return n.status
+        # placeholder row so the status is visible before the first text exists
+        db.add(Narrative(job_id=job_id, short_summary="", full_story="", status="queued", updated_at=now))
+        try:
+            db.commit()
+        except IntegrityError:
+            # another request inserted it first and queued the run
+            db.rollback()
+            return db.query(Narrative).filter_by(job_id=job_id).one().status
+
+    submit(db, background, "narrative", job_id, _run_narrative_job, {"mode": mode})
+    return "queued"
+
+
+def _status_out(job_id: str, n: Narrative | None) -> dict:
     return {
         "job_id": job_id,
-        "status": "generated",
-        "narrative": {
-            "short_summary": n.short_summary,
-            "full_story": n.full_story,
-            "structured_data": n.structured_data,
-        },
-    }
\ No newline at end of file
+        "status": n.status if n else None,
+        "error": n.error if n else None,
+    }
+
+
+@router.post("/{job_id}/narrative/generate")
+def generate_narrative(
+    job_id: str,
+    background: BackgroundTasks,
+    mode: str = "auto",
+    run_in_background: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    mode: flat (one prompt with every scene), hierarchical (map-reduce over
+    windows of scenes) or auto (hierarchical once scenes exceed one window).
+    run_in_background returns immediately; follow progress via /narrative/status.
+    """
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    _check_mode(mode)
+    lines = _usable_scene_lines(db, job_id)
+
+    if run_in_background:
+        return {"job_id": job_id, "status": queue_narrative_generation(db, background, job_id, mode)}
+
+    hierarchical = _use_hierarchy(lines, mode)
+    flight_key = f"narrative:{job_id}"
+
+    def _generate() -> dict:
+        with advisory_lock(db, flight_key) as fresh:
+            n = db.query(Narrative).filter_by(job_id=job_id).first()
+            # if the other worker failed there is nothing to share, so compute ourselves
+            windows = None
+            if fresh or not n or not n.full_story:
+                n, windows = _generate_and_save(db, job_id, lines, hierarchical)
+            else:
+                db.refresh(n)
+
+        out = {"job_id": job_id, "status": "generated", "narrative": _narrative_out(n)}
+        if windows is not None:
+            out["windows"] = windows
+        return out
+
+    return _narrative_flight.do(flight_key, _generate)
+
+
+@router.post("/{job_id}/narrative/generate/stream")
+def generate_narrative_stream(job_id: str, mode: str = "auto", db: Session = Depends(get_db)):
+    """
+    SSE variant of generate: "delta" events carry the raw model output as it
+    streams, a final "done" event carries the parsed and persisted narrative.
+    In hierarchical mode the window summaries run first and only the final
+    reduce is streamed.
+    """
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    _check_mode(mode)
+    lines = _usable_scene_lines(db, job_id)
+    hierarchical = _use_hierarchy(lines, mode)
+    # same key as generate, so streaming and plain requests for a job share one run
+    flight_key = f"narrative:{job_id}"
+
+    def _events():
+        with _narrative_flight.lead(flight_key) as call, advisory_lock(db, flight_key) as fresh:
+            if call is None or not fresh:
+                n = db.query(Narrative).filter_by(job_id=job_id).first()
+                # another request generated the narrative meanwhile: replay its result
+                if n and n.full_story:
+                    db.refresh(n)
+                    out = {"job_id": job_id, "status": "generated", "narrative": _narrative_out(n)}
+                    if call is not None:
+                        call.result = out
+                    yield sse_event({"delta": n.full_story}, event="delta")
+                    yield sse_event(out, event="done")
+                    return
+
+            parts: list[str] = []
+            try:
+                final_lines, cache = lines, None
+                if hierarchical:
+                    cache = _WindowCache(db, job_id)
+                    final_lines = condense_scene_lines(lines, summarize=cache.summarize)
+                for delta in stream_narrative_from_scenes(final_lines):
+                    parts.append(delta)
+                    yield sse_event({"delta": delta}, event="delta")
+                result = parse_narrative_response("".join(parts))
+                if cache is not None:
+                    cache.save()
+                n = _save_narrative(db, job_id, result)
+            except Exception as e:
+                if call is not None:
+                    call.error = e
+                yield sse_event({"detail": str(e)}, event="error")
+                return
+
+            out = {"job_id": job_id, "status": "generated", "narrative": _narrative_out(n)}
+            if call is not None:
+                call.result = out
+            yield sse_event(out, event="done")
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/{job_id}/narrative/status")
+async def get_narrative_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.scalar(select(VideoJob.job_id).filter_by(job_id=job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return _status_out(job_id, await db.scalar(select(Narrative).filter_by(job_id=job_id)))
+
+
+@router.get("/{job_id}/narrative/status/stream")
+async def stream_narrative_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    SSE: a "status" event whenever the status changes, closing once it is
+    generated/failed (or after STATUS_STREAM_TIMEOUT_SEC).
+    """
+    job = await db.scalar(select(VideoJob.job_id).filter_by(job_id=job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def _events():
+        last = object()
+        deadline = time.monotonic() + STATUS_STREAM_TIMEOUT_SEC
+        while time.monotonic() < deadline:
+            # plain columns, not the entity, so every poll reads the current row
+            row = (await db.execute(select(Narrative.status, Narrative.error).filter_by(job_id=job_id))).first()
+            out = _status_out(job_id, row)
+            if out != last:
+                yield sse_event(out, event="status")
+                last = out
+            if out["status"] is None or out["status"] in NARRATIVE_DONE:
+                return
+            await db.rollback()  # don't hold a transaction open between polls
+            await anyio.sleep(STATUS_POLL_SEC)
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=SSE_HEADERS)
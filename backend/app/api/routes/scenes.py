@@ -1,59 +1,64 @@
 from __future__ import annotations
 import anyio
-from app.services.vlm.hf_client import describe_scene_hf
-import math
-import uuid
+from app.services.vlm.hf_client import VLMResult, describe_scene_hf, describe_scenes_hf, stream_describe_scene_hf
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.persistence.db import get_db
+from app.api.responses import FastJSONResponse
+from app.api.routes.narrative import queue_narrative_generation
+from app.api.sse import SSE_HEADERS, sse_event
+from app.persistence.db import get_async_db, get_db
+from app.pipeline.regenerate import ensure_snapshots, restore_snapshots
+from app.pipeline.fingerprint import DEFAULT_MAX_DISTANCE, find_similar, scene_fingerprint
+from app.pipeline.lazy import build_lazy_scenes, ensure_scene_keyframes
+from app.pipeline.scenes import build_fixed_scenes, pick_uniform_keyframes
+from app.services.singleflight import SingleFlight, advisory_lock
+from app.services.storage import artifacts, get_storage
 from app.persistence.tables import (
     VideoJob,
     Snapshot,
     SnapshotConfig,
     Scene,
     SceneSnapshot,
+    VideoAsset,
 )
 
 router = APIRouter(prefix="/jobs", tags=["scenes"])
 
-STORAGE_ROOT = Path(__file__).resolve().parents[3] / "storage"
-
 DEFAULT_KEYFRAMES = 8
+# keyframes is part of the decode/describe coalescing keys, so keep its range small
+MAX_KEYFRAMES = 32
 
+# coalesces duplicate describe calls (double clicks, several open tabs)
+_describe_flight = SingleFlight()
 
-def _storage_url_from_snapshot_uri(uri: str) -> str:
-    """
-    Convert absolute file path under STORAGE_ROOT to URL like:
-    /storage/jobs/<job_id>/snapshots/000001.jpg
-    """
-    p = Path(uri)
-    rel = p.relative_to(STORAGE_ROOT)
-    return f"/storage/{rel.as_posix()}"
 
+def _keyframe_paths(snaps) -> List[Path]:
+    """Local files for the keyframes (downloaded in parallel from object storage)."""
+    return get_storage().fetch_many(s.uri for s in snaps)
 
-def _pick_uniform_keyframes(snaps: List[Snapshot], k: int) -> List[Snapshot]:
-    if not snaps:
-        return []
-    if k <= 0:
-        return []
-    if len(snaps) <= k:
-        return snaps
-
-    # indices from 0..n-1 inclusive
-    n = len(snaps)
-    idxs = [round(i * (n - 1) / (k - 1)) for i in range(k)]
-    # remove duplicates while preserving order
-    seen = set()
-    out = []
-    for ix in idxs:
-        if ix not in seen:
-            out.append(snaps[ix])
-            seen.add(ix)
+
+def _snapshots_by_scene(db: Session, scene_ids: List[str]) -> Dict[str, List[Snapshot]]:
+    """One query for the ordered snapshots of many scenes."""
+    out: Dict[str, List[Snapshot]] = {sid: [] for sid in scene_ids}
+    if not scene_ids:
+        return out
+
+    rows = (
+        db.query(SceneSnapshot.scene_id, Snapshot)
+        .join(Snapshot, SceneSnapshot.snapshot_id == Snapshot.snapshot_id)
+        .filter(SceneSnapshot.scene_id.in_(scene_ids))
+        .order_by(Snapshot.timestamp_sec.asc())
+        .all()
+    )
+    for scene_id, snap in rows:
+        out[scene_id].append(snap)
     return out
 
 
@@ -61,7 +66,8 @@ def _pick_uniform_keyframes(snaps: List[Snapshot], k: int) -> List[Snapshot]:
 def build_scenes(job_id: str, db: Session = Depends(get_db)):
     """
     Baseline scene segmentation: fixed time chunks using SnapshotConfig.chunk_length_sec.
-    Rebuilds scenes for this job (idempotent).
+    Rebuilds scenes for this job (idempotent). Lazy jobs get chunks over the
+    whole video, with whatever keyframes were already decoded.
     """
     job = db.query(VideoJob).filter_by(job_id=job_id).first()
     if not job:
@@ -75,85 +81,48 @@ def build_scenes(job_id: str, db: Session = Depends(get_db)):
     if chunk <= 0:
         raise HTTPException(status_code=400, detail="chunk_length_sec must be > 0")
 
+    if cfg.lazy:
+        duration = db.query(VideoAsset.duration_sec).filter_by(job_id=job_id).scalar()
+        if not duration:
+            raise HTTPException(status_code=400, detail="Video duration unknown. Run extraction first.")
+        created = len(build_lazy_scenes(db, job_id, chunk, float(duration)))
+        return {"job_id": job_id, "status": "scenes_built", "scenes_created": created}
+
     # Make sure we actually have snapshots
     max_ts = db.query(func.max(Snapshot.timestamp_sec)).filter(Snapshot.job_id == job_id).scalar()
     if max_ts is None:
         raise HTTPException(status_code=400, detail="No snapshots found for job. Run extraction first.")
 
-    # ----- delete existing scenes for job (rebuild) -----
-    existing_scene_ids = [sid for (sid,) in db.query(Scene.scene_id).filter(Scene.job_id == job_id).all()]
-    if existing_scene_ids:
-        db.query(SceneSnapshot).filter(SceneSnapshot.scene_id.in_(existing_scene_ids)).delete(synchronize_session=False)
-        db.query(Scene).filter(Scene.job_id == job_id).delete(synchronize_session=False)
-        db.commit()
-
-    # ----- build new scenes -----
-    total_duration = float(max_ts)
-    num_scenes = int(math.floor(total_duration / chunk)) + 1
-
-    created = 0
-    for i in range(num_scenes):
-        start_sec = i * chunk
-        end_sec = (i + 1) * chunk
-
-        # snapshots within [start, end)
-        snaps = (
-            db.query(Snapshot)
-            .filter(Snapshot.job_id == job_id)
-            .filter(Snapshot.timestamp_sec >= start_sec)
-            .filter(Snapshot.timestamp_sec < end_sec)
-            .order_by(Snapshot.timestamp_sec.asc())
-            .all()
-        )
-
-        # skip empty scenes to keep UI clean
-        if not snaps:
-            continue
-
-        scene_id = str(uuid.uuid4())
-        scene = Scene(
-            scene_id=scene_id,
-            job_id=job_id,
-            start_sec=float(start_sec),
-            end_sec=float(end_sec),
-            short_description="(pending)",
-            confidence=None,
-        )
-        db.add(scene)
-
-        for s in snaps:
-            db.add(SceneSnapshot(scene_id=scene_id, snapshot_id=s.snapshot_id))
-
-        created += 1
+    # rebuild: drops existing scenes for the job first
+    created = build_fixed_scenes(db, job_id, chunk, float(max_ts))
 
-    db.commit()
     return {"job_id": job_id, "status": "scenes_built", "scenes_created": created}
 
 
 @router.get("/{job_id}/scenes")
-def list_scenes(job_id: str, db: Session = Depends(get_db)):
+async def list_scenes(job_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     List scenes with snapshot counts (for the sidebar list).
     """
-    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    job = await db.scalar(select(VideoJob.job_id).filter_by(job_id=job_id))
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
     rows = (
-        db.query(
-            Scene.scene_id,
-            Scene.start_sec,
-            Scene.end_sec,
-            Scene.short_description,
-            Scene.confidence,
-            func.count(SceneSnapshot.snapshot_id).label("snapshot_count"),
+        await db.execute(
+            select(
+                Scene.scene_id,
+                Scene.start_sec,
+                Scene.end_sec,
+                Scene.short_description,
+                Scene.confidence,
+                Scene.description_reused,
+                Scene.snapshot_count,
+            )
+            .where(Scene.job_id == job_id)
+            .order_by(Scene.start_sec.asc())
         )
-        .outerjoin(SceneSnapshot, SceneSnapshot.scene_id == Scene.scene_id)
-        .filter(Scene.job_id == job_id)
-        .group_by(Scene.scene_id)
-        .order_by(Scene.start_sec.asc())
-        .all()
-    )
+    ).all()
 
     scenes_out = []
     for r in rows:
@@ -165,29 +134,36 @@ def list_scenes(job_id: str, db: Session = Depends(get_db)):
                 "snapshot_count": int(r.snapshot_count or 0),
                 "short_description": r.short_description,
                 "confidence": r.confidence,
+                "description_reused": bool(r.description_reused),
             }
         )
 
-    return {"job_id": job_id, "count": len(scenes_out), "scenes": scenes_out}
+    return FastJSONResponse({"job_id": job_id, "count": len(scenes_out), "scenes": scenes_out})
 
 @router.get("/{job_id}/scenes/{scene_id}")
-def get_scene(job_id: str, scene_id: str, keyframes: int = DEFAULT_KEYFRAMES, db: Session = Depends(get_db)):
+async def get_scene(job_id: str, scene_id: str, keyframes: int = Query(DEFAULT_KEYFRAMES, ge=1, le=MAX_KEYFRAMES), db: AsyncSession = Depends(get_async_db)):
     """
     Scene detail + keyframes (K uniformly sampled snapshots).
     """
-    scene = db.query(Scene).filter_by(scene_id=scene_id, job_id=job_id).first()
+    scene = await db.scalar(select(Scene).filter_by(scene_id=scene_id, job_id=job_id))
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
+    if await artifacts.touch_async(db, job_id):
+        await anyio.to_thread.run_sync(restore_snapshots, job_id)
+    if await db.scalar(select(SnapshotConfig.lazy).filter_by(job_id=job_id)):
+        await anyio.to_thread.run_sync(ensure_scene_keyframes, job_id, scene_id, int(keyframes))
 
     snaps = (
-        db.query(Snapshot)
-        .join(SceneSnapshot, SceneSnapshot.snapshot_id == Snapshot.snapshot_id)
-        .filter(SceneSnapshot.scene_id == scene_id)
-        .order_by(Snapshot.timestamp_sec.asc())
-        .all()
-    )
+        await db.execute(
+            select(Snapshot.snapshot_id, Snapshot.timestamp_sec, Snapshot.uri, Snapshot.width, Snapshot.height)
+            .join(SceneSnapshot, SceneSnapshot.snapshot_id == Snapshot.snapshot_id)
+            .where(SceneSnapshot.scene_id == scene_id)
+            .order_by(Snapshot.timestamp_sec.asc())
+        )
+    ).all()
 
-    key_snaps = _pick_uniform_keyframes(snaps, int(keyframes))
+    key_snaps = pick_uniform_keyframes(snaps, int(keyframes))
+    storage = get_storage()
 
     out_keyframes = []
     for s in key_snaps:
@@ -195,13 +171,13 @@ def get_scene(job_id: str, scene_id: str, keyframes: int = DEFAULT_KEYFRAMES, db
             {
                 "snapshot_id": s.snapshot_id,
                 "timestamp_sec": float(s.timestamp_sec),
-                "url": _storage_url_from_snapshot_uri(s.uri),
+                "url": storage.url(s.uri, s.snapshot_id),
                 "width": s.width,
                 "height": s.height,
             }
         )
 
-    return {
+    return FastJSONResponse({
         "job_id": job_id,
         "scene_id": scene.scene_id,
         "start_sec": float(scene.start_sec),
@@ -210,13 +186,26 @@ def get_scene(job_id: str, scene_id: str, keyframes: int = DEFAULT_KEYFRAMES, db
         "keyframes_count": len(out_keyframes),
         "snapshots_total": len(snaps),
         "description": getattr(scene, "description", None),
-    }
+    })
 
 @router.post("/{job_id}/scenes/{scene_id}/describe")
-def describe_scene(job_id: str, scene_id: str, keyframes: int = DEFAULT_KEYFRAMES, db: Session = Depends(get_db)):
+def describe_scene(
+    job_id: str,
+    scene_id: str,
+    background: BackgroundTasks,
+    keyframes: int = Query(DEFAULT_KEYFRAMES, ge=1, le=MAX_KEYFRAMES),
+    then_narrative: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    then_narrative: once this was the last pending scene, queue background
+    narrative generation.
+    """
     scene = db.query(Scene).filter_by(scene_id=scene_id, job_id=job_id).first()
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
+    ensure_snapshots(db, job_id)
+    ensure_scene_keyframes(job_id, scene_id, int(keyframes), db)
 
     snaps = (
         db.query(Snapshot)
@@ -229,20 +218,258 @@ def describe_scene(job_id: str, scene_id: str, keyframes: int = DEFAULT_KEYFRAME
     if not snaps:
         raise HTTPException(status_code=400, detail="Scene has no snapshots")
 
-    key_snaps = _pick_uniform_keyframes(snaps, int(keyframes))
-    key_paths = [Path(s.uri) for s in key_snaps]
+    key_snaps = pick_uniform_keyframes(snaps, int(keyframes))
+    key_paths = _keyframe_paths(key_snaps)
+    flight_key = f"describe:{job_id}:{scene_id}:" + ",".join(s.snapshot_id for s in key_snaps)
+
+    def _describe() -> dict:
+        with advisory_lock(db, flight_key) as fresh:
+            if not fresh:
+                db.refresh(scene)
+
+            # if the other worker failed the scene is still pending, so compute ourselves
+            if fresh or scene.short_description == "(pending)":
+                # Call HF router VLM
+                result = anyio.run(describe_scene_hf, key_paths)
+
+                scene.short_description = result.text
+                scene.confidence = result.confidence
+                scene.description_reused = False
+                scene.reused_from_scene_id = None
+                db.commit()
+
+            db.refresh(scene)
+
+        return {
+            "job_id": job_id,
+            "scene_id": scene_id,
+            "short_description": scene.short_description,
+            "confidence": scene.confidence,
+            "description_reused": bool(scene.description_reused),
+        }
+
+    out = dict(_describe_flight.do(flight_key, _describe))
+    if then_narrative:
+        out["narrative_status"] = _chain_narrative(db, background, job_id)
+    return out
 
-    # Call HF router VLM
-    result = anyio.run(describe_scene_hf, key_paths)
+@router.post("/{job_id}/scenes/{scene_id}/describe/stream")
+def describe_scene_stream(job_id: str, scene_id: str, keyframes: int = Query(DEFAULT_KEYFRAMES, ge=1, le=MAX_KEYFRAMES), db: Session = Depends(get_db)):
+    """
+    SSE variant of describe: "delta" events carry text as the VLM produces it,
+    a final "done" event carries the persisted description ("error" on failure).
+    """
+    scene = db.query(Scene).filter_by(scene_id=scene_id, job_id=job_id).first()
+    if not scene:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    ensure_snapshots(db, job_id)
+    ensure_scene_keyframes(job_id, scene_id, int(keyframes), db)
 
-    scene.short_description = result.text
-    scene.confidence = result.confidence
-    db.commit()
-    db.refresh(scene)
+    snaps = _snapshots_by_scene(db, [scene_id])[scene_id]
+    if not snaps:
+        raise HTTPException(status_code=400, detail="Scene has no snapshots")
 
-    return {
-        "job_id": job_id,
-        "scene_id": scene_id,
-        "short_description": scene.short_description,
-        "confidence": scene.confidence,
-    }
\ No newline at end of file
+    key_snaps = pick_uniform_keyframes(snaps, int(keyframes))
+    key_paths = _keyframe_paths(key_snaps)
+    # same key as describe, so streaming and plain requests for a scene share one VLM call
+    flight_key = f"describe:{job_id}:{scene_id}:" + ",".join(s.snapshot_id for s in key_snaps)
+
+    def _out() -> dict:
+        return {
+            "job_id": job_id,
+            "scene_id": scene_id,
+            "short_description": scene.short_description,
+            "confidence": scene.confidence,
+            "description_reused": bool(scene.description_reused),
+        }
+
+    def _events():
+        with _describe_flight.lead(flight_key) as call, advisory_lock(db, flight_key) as fresh:
+            if call is None or not fresh:
+                db.refresh(scene)
+                # another request described the scene meanwhile: replay its result
+                if scene.short_description != "(pending)":
+                    if call is not None:
+                        call.result = _out()
+                    yield sse_event({"delta": scene.short_description}, event="delta")
+                    yield sse_event(_out(), event="done")
+                    return
+
+            parts: List[str] = []
+            try:
+                for delta in stream_describe_scene_hf(key_paths):
+                    parts.append(delta)
+                    yield sse_event({"delta": delta}, event="delta")
+            except Exception as e:
+                if call is not None:
+                    call.error = e
+                yield sse_event({"detail": str(e)}, event="error")
+                return
+
+            scene.short_description = "".join(parts).strip() or "(no description)"
+            scene.confidence = None
+            scene.description_reused = False
+            scene.reused_from_scene_id = None
+            db.commit()
+
+            if call is not None:
+                call.result = _out()
+            yield sse_event(_out(), event="done")
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def _chain_narrative(db: Session, background: BackgroundTasks, job_id: str) -> str | None:
+    """Queue narrative generation if every scene of the job is described."""
+    pending = (
+        db.query(func.count(Scene.scene_id))
+        .filter(Scene.job_id == job_id)
+        .filter(Scene.short_description == "(pending)")
+        .scalar()
+    )
+    if pending:
+        return None
+    return queue_narrative_generation(db, background, job_id)
+
+
+def _plan_reuse(
+    scenes: List[Scene],
+    targets: List[Scene],
+    keyframes_by_scene: Dict[str, List[Path]],
+    max_distance: float,
+) -> tuple[List[Scene], List[tuple[Scene, Scene]]]:
+    """
+    Split targets into visually novel scenes (need the VLM) and
+    (scene, source) pairs whose keyframes nearly match an already described
+    scene, or a novel scene earlier in this run.
+    """
+    target_ids = {sc.scene_id for sc in targets}
+    by_id = {sc.scene_id: sc for sc in scenes}
+    fingerprints = {sid: scene_fingerprint(paths) for sid, paths in keyframes_by_scene.items()}
+
+    references = {
+        sc.scene_id: fingerprints[sc.scene_id]
+        for sc in scenes
+        if sc.scene_id not in target_ids
+        and sc.scene_id in fingerprints
+        and (sc.short_description or "").strip() not in ("", "(pending)")
+    }
+
+    novel: List[Scene] = []
+    reused: List[tuple[Scene, Scene]] = []
+    for sc in targets:
+        src_id = find_similar(fingerprints[sc.scene_id], references, max_distance)
+        if src_id is None:
+            novel.append(sc)
+            references[sc.scene_id] = fingerprints[sc.scene_id]
+        else:
+            reused.append((sc, by_id[src_id]))
+
+    return novel, reused
+
+
+@router.post("/{job_id}/scenes/describe")
+def describe_all_scenes(
+    job_id: str,
+    background: BackgroundTasks,
+    keyframes: int = Query(DEFAULT_KEYFRAMES, ge=1, le=MAX_KEYFRAMES),
+    batch_size: int | None = None,
+    only_pending: bool = True,
+    reuse_similar: bool = True,
+    reuse_max_distance: float = DEFAULT_MAX_DISTANCE,
+    then_narrative: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Describe every (pending) scene of a job.
+    batch_size > 1 packs that many scenes into one VLM request;
+    defaults to HF_VLM_BATCH_SIZE.
+    With reuse_similar, scenes whose keyframe fingerprints match an already
+    described scene copy its description and only novel scenes hit the VLM.
+    then_narrative queues background narrative generation once no scene is pending.
+    """
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    ensure_snapshots(db, job_id)
+    lazy = bool(db.query(SnapshotConfig.lazy).filter_by(job_id=job_id).scalar())
+
+    # only calls asking for the same work share a result
+    flight_key = (
+        f"describe-all:{job_id}:{int(keyframes)}:{batch_size}:{only_pending}:"
+        f"{reuse_similar}:{reuse_max_distance}"
+    )
+
+    def _describe_all() -> dict:
+        # selected under the lock, so a waiting duplicate finds nothing left pending
+        with advisory_lock(db, flight_key):
+            scenes = (
+                db.query(Scene)
+                .filter(Scene.job_id == job_id)
+                .order_by(Scene.start_sec.asc())
+                .all()
+            )
+            wanted = [sc for sc in scenes if not only_pending or sc.short_description == "(pending)"]
+            if lazy:
+                for sc in wanted:
+                    ensure_scene_keyframes(job_id, sc.scene_id, int(keyframes), db)
+
+            # described scenes' keyframes only matter as reuse sources
+            loaded = scenes if reuse_similar else wanted
+            snaps_by_scene = _snapshots_by_scene(db, [sc.scene_id for sc in loaded])
+            keyframes_by_scene = {
+                sid: _keyframe_paths(pick_uniform_keyframes(snaps, int(keyframes)))
+                for sid, snaps in snaps_by_scene.items()
+                if snaps
+            }
+            targets = [sc for sc in wanted if sc.scene_id in keyframes_by_scene]
+
+            novel, reused = targets, []
+            if reuse_similar:
+                novel, reused = _plan_reuse(scenes, targets, keyframes_by_scene, reuse_max_distance)
+
+            failed: Dict[str, str] = {}
+
+            def _apply(start: int, results: List[VLMResult]) -> None:
+                for sc, result in zip(novel[start:], results):
+                    if result.error is not None:
+                        failed[sc.scene_id] = result.error
+                        continue
+                    sc.short_description = result.text
+                    sc.confidence = result.confidence
+                    sc.description_reused = False
+                    sc.reused_from_scene_id = None
+                # a later failure must not discard scenes already described
+                db.commit()
+
+            if novel:
+                # re-applying batches on_batch already saw changes nothing
+                _apply(0, anyio.run(
+                    describe_scenes_hf,
+                    [keyframes_by_scene[sc.scene_id] for sc in novel],
+                    batch_size,
+                    _apply,
+                ))
+
+            # after the VLM pass, so sources described in this run are filled in
+            reused = [(sc, src) for sc, src in reused if src.scene_id not in failed]
+            for sc, src in reused:
+                sc.short_description = src.short_description
+                sc.confidence = src.confidence
+                sc.description_reused = True
+                sc.reused_from_scene_id = src.reused_from_scene_id or src.scene_id
+
+            db.commit()
+
+        return {
+            "job_id": job_id,
+            "status": "scenes_described",
+            "scenes_described": len(novel) - len(failed),
+            "scenes_reused": len(reused),
+            "scenes_failed": [{"scene_id": sid, "detail": detail} for sid, detail in failed.items()],
+        }
+
+    out = dict(_describe_flight.do(flight_key, _describe_all))
+    if then_narrative:
+        out["narrative_status"] = _chain_narrative(db, background, job_id)
+    return out
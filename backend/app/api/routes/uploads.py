@@ -0,0 +1,368 @@
+"""
+Resumable chunked uploads, modelled on tus (https://tus.io):
+
+    POST   /uploads                   Upload-Length header -> 201, Location: /uploads/{id}
+    HEAD   /uploads/{id}              -> Upload-Offset / Upload-Length, to resume after a drop
+    PATCH  /uploads/{id}              Upload-Offset header + raw bytes -> 204, new Upload-Offset
+    POST   /uploads/{id}/finalize     snapshot config form fields -> the job, like POST /jobs
+    DELETE /uploads/{id}
+
+A PATCH may carry `Upload-Checksum: sha256 <base64 digest>` for its body; on
+mismatch the chunk is discarded (460) and the offset is unchanged. Without a
+checksum, bytes received before a dropped connection are kept, so the client
+resumes from HEAD's offset. The whole file's sha256 is computed incrementally
+as chunks arrive (or, once a chunk lands on a process without the running
+hash, read back at finalize) and stored on the video asset.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Tuple
+
+import anyio
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+
+from app.api.routes import jobs as jobs_routes
+from app.persistence.db import get_async_db, get_db
+from app.persistence.tables import UploadSession, VideoJob
+from app.pipeline.extract import PREVIEW_FPS
+from app.pipeline.scheduling import DEFAULT_PRIORITY
+from app.services.storage import get_storage, job_key
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+TUS_HEADERS = {"Tus-Resumable": "1.0.0"}
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024**3)))
+HASH_READ_BYTES = 1024 * 1024
+
+# per-upload running sha256 of bytes [0, offset). When missing (process restart,
+# or the previous chunk landed on another API process) it isn't rebuilt per
+# chunk: finalize hashes the complete file once instead
+_hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+_hashers_lock = threading.Lock()
+
+# one PATCH at a time per upload within this process; across processes the
+# conditional offset update below rejects the loser
+_patch_locks: Dict[str, asyncio.Lock] = {}
+
+# both caches are dropped for uploads without a PATCH for this long (abandoned,
+# or moved to another process); the upload's hash is then left to finalize
+UPLOAD_IDLE_SEC = int(os.getenv("UPLOAD_IDLE_SEC", "3600"))
+_last_patch: Dict[str, float] = {}
+_next_eviction = 0.0
+
+
+def _part_path(upload_id: str) -> Path:
+    # always on local disk (object stores can't append); with S3 storage this is the cache dir
+    return get_storage().local_root / "uploads" / f"{upload_id}.part"
+
+
+def _offset_headers(offset: int, length: int) -> dict:
+    return {
+        **TUS_HEADERS,
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(length),
+        "Cache-Control": "no-store",
+    }
+
+
+def _hash_prefix(path: Path, n: int) -> "hashlib._Hash":
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        remaining = n
+        while remaining > 0:
+            data = f.read(min(HASH_READ_BYTES, remaining))
+            if not data:
+                break
+            h.update(data)
+            remaining -= len(data)
+    return h
+
+
+def _content_hasher(upload_id: str, offset: int) -> "hashlib._Hash | None":
+    """
+    Copy of the running hash at offset (the caller stores it back once the
+    chunk is accepted), or None when this process doesn't have it.
+    """
+    if offset == 0:
+        return hashlib.sha256()
+    with _hashers_lock:
+        cached = _hashers.get(upload_id)
+    if cached and cached[0] == offset:
+        return cached[1].copy()
+    return None
+
+
+def _store_hasher(upload_id: str, offset: int, h: "hashlib._Hash | None") -> None:
+    with _hashers_lock:
+        if h is None:
+            _hashers.pop(upload_id, None)
+        else:
+            _hashers[upload_id] = (offset, h)
+
+
+def _drop_hasher(upload_id: str) -> None:
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+        _last_patch.pop(upload_id, None)
+    _patch_locks.pop(upload_id, None)
+
+
+def _evict_idle(now: float) -> None:
+    """Forget cached hashers and locks of idle uploads; runs at most once a minute."""
+    global _next_eviction
+    if now < _next_eviction:
+        return
+    _next_eviction = now + 60
+
+    with _hashers_lock:
+        idle = [uid for uid, at in _last_patch.items() if at < now - UPLOAD_IDLE_SEC]
+    for upload_id in idle:
+        lock = _patch_locks.get(upload_id)
+        if lock is None or not lock.locked():
+            _drop_hasher(upload_id)
+
+
+def _parse_checksum(value: str | None):
+    """`<algorithm> <base64 digest>` -> (hash object, expected digest) or (None, None)."""
+    if not value:
+        return None, None
+    algo, _, b64 = value.strip().partition(" ")
+    algo = algo.lower()
+    if algo not in hashlib.algorithms_guaranteed or not b64:
+        raise HTTPException(status_code=400, detail="Unsupported Upload-Checksum")
+    try:
+        expected = base64.b64decode(b64, validate=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Upload-Checksum")
+    return hashlib.new(algo), expected
+
+
+@router.post("", status_code=201)
+async def create_upload(
+    upload_length: int = Header(...),
+    upload_filename: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if upload_length <= 0 or upload_length > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload-Length must be in 1..{MAX_UPLOAD_BYTES}")
+
+    upload_id = str(uuid.uuid4())
+    part = _part_path(upload_id)
+    await anyio.Path(part.parent).mkdir(parents=True, exist_ok=True)
+    await anyio.Path(part).touch()
+
+    up = UploadSession(upload_id=upload_id, filename=upload_filename, length=upload_length, offset=0)
+    db.add(up)
+    await db.commit()
+
+    return JSONResponse(
+        {"upload_id": upload_id, "offset": 0, "length": upload_length},
+        status_code=201,
+        headers={**TUS_HEADERS, "Location": f"/uploads/{upload_id}"},
+    )
+
+
+async def _open_upload(db: AsyncSession, upload_id: str) -> UploadSession:
+    up = await db.scalar(select(UploadSession).filter_by(upload_id=upload_id))
+    if not up:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return up
+
+
+@router.head("/{upload_id}")
+async def upload_offset(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    up = await _open_upload(db, upload_id)
+    return Response(status_code=200, headers=_offset_headers(up.offset, up.length))
+
+
+@router.patch("/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    upload_checksum: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    chunk_hash, expected = _parse_checksum(upload_checksum)
+    now = time.monotonic()
+    _evict_idle(now)
+    with _hashers_lock:
+        _last_patch[upload_id] = now
+    lock = _patch_locks.setdefault(upload_id, asyncio.Lock())
+
+    async with lock:
+        up = await _open_upload(db, upload_id)
+        if up.status != "open":
+            raise HTTPException(status_code=409, detail="Upload already finalized")
+        if upload_offset != up.offset:
+            return JSONResponse(
+                {"detail": "Upload-Offset does not match", "offset": up.offset},
+                status_code=409,
+                headers=_offset_headers(up.offset, up.length),
+            )
+
+        start = up.offset
+        part = _part_path(upload_id)
+        content_hash = _content_hasher(upload_id, start)
+
+        written = 0
+        disconnected = False
+        async with await anyio.open_file(part, "r+b") as f:
+            await f.seek(start)
+            try:
+                async for data in request.stream():
+                    if start + written + len(data) > up.length:
+                        await f.truncate(start)
+                        raise HTTPException(status_code=413, detail="Chunk goes past Upload-Length")
+                    await f.write(data)
+                    if content_hash is not None:
+                        content_hash.update(data)
+                    if chunk_hash is not None:
+                        chunk_hash.update(data)
+                    written += len(data)
+            except ClientDisconnect:
+                disconnected = True
+
+            # a partial or corrupt chunk with a checksum is dropped entirely
+            if chunk_hash is not None and (disconnected or chunk_hash.digest() != expected):
+                await f.truncate(start)
+                if disconnected:
+                    return Response(status_code=400)
+                return JSONResponse(
+                    {"detail": "Upload-Checksum mismatch", "offset": start},
+                    status_code=460,
+                    headers=_offset_headers(start, up.length),
+                )
+            await f.truncate(start + written)
+
+        new_offset = start + written
+        res = await db.execute(
+            update(UploadSession)
+            .where(UploadSession.upload_id == upload_id, UploadSession.offset == start)
+            .values(offset=new_offset, updated_at=datetime.now(timezone.utc))
+        )
+        if res.rowcount != 1:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Upload was modified concurrently")
+        await db.commit()
+
+        _store_hasher(upload_id, new_offset, content_hash)
+
+    return Response(status_code=204, headers=_offset_headers(new_offset, up.length))
+
+
+@router.post("/{upload_id}/finalize")
+def finalize_upload(
+    upload_id: str,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+
+    #ui config fields, same as POST /jobs
+    sampling_fps: float = Form(1.0),
+    chunk_length_sec: int = Form(10),
+    resize_width: int = Form(512),
+    grayscale: bool = Form(False),
+    black_white: bool = Form(False),
+    image_format: str = Form("jpg"),
+    packed: bool = Form(False),
+    preview_fps: float | None = Form(None, ge=0),
+    lazy: bool = Form(False),
+
+    run_extract: bool = Form(True),
+
+    pipeline: str | None = None,
+    priority: str = DEFAULT_PRIORITY,
+    x_tenant_id: str | None = Header(None),
+):
+    """Create the job from a complete upload; the file is moved, not copied."""
+    jobs_routes._check_pipeline(pipeline)
+    jobs_routes._check_priority(priority)
+    jobs_routes._check_lazy(lazy, packed)
+
+    up = db.query(UploadSession).filter_by(upload_id=upload_id).with_for_update().first()
+    if not up:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if up.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload already finalized as job {up.job_id}")
+    if up.offset != up.length:
+        raise HTTPException(status_code=409, detail=f"Upload incomplete: {up.offset} of {up.length} bytes")
+
+    part = _part_path(upload_id)
+    content_hash = _content_hasher(upload_id, up.offset)
+    if content_hash is None:
+        content_hash = _hash_prefix(part, up.offset)
+    digest = content_hash.hexdigest()
+
+    job_id = str(uuid.uuid4())
+    storage = get_storage()
+    video_key = jobs_routes._video_key(job_id, up.filename)
+    video_path = storage.local_path(video_key)
+    video_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(part, video_path)
+
+    up.status = "finalized"
+    up.job_id = job_id
+    up.content_sha256 = digest
+    up.updated_at = datetime.now(timezone.utc)
+
+    try:
+        storage.put([video_key])
+        # commits the job rows together with the finalized upload
+        out = jobs_routes._register_job(
+            db,
+            background,
+            job_id,
+            video_key,
+            sampling_fps=sampling_fps,
+            chunk_length_sec=chunk_length_sec,
+            resize_width=resize_width,
+            grayscale=grayscale,
+            black_white=black_white,
+            image_format=image_format,
+            run_extract=run_extract,
+            pipeline=pipeline,
+            priority=priority,
+            tenant=x_tenant_id,
+            content_sha256=digest,
+            packed=packed,
+            preview_fps=PREVIEW_FPS if preview_fps is None else preview_fps,
+            lazy=lazy,
+        )
+    except BaseException:
+        db.rollback()
+        if db.query(VideoJob.job_id).filter_by(job_id=job_id).first() is None:
+            # nothing committed: the upload stays open with its bytes, so finalize can be retried
+            os.replace(video_path, part)
+            storage.delete_prefix(job_key(job_id))
+        raise
+
+    _drop_hasher(upload_id)
+    return {**out, "upload_id": upload_id, "content_sha256": digest}
+
+
+@router.delete("/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    up = await _open_upload(db, upload_id)
+    if up.status != "open":
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+
+    await db.execute(delete(UploadSession).where(UploadSession.upload_id == upload_id))
+    await db.commit()
+
+    _drop_hasher(upload_id)
+    await anyio.Path(_part_path(upload_id)).unlink(missing_ok=True)
+    return Response(status_code=204, headers=TUS_HEADERS)
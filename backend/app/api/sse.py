@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# disable proxy buffering (nginx) so tokens reach the client as they arrive
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data: Any, event: str | None = None) -> str:
+    """One Server-Sent Events frame with a JSON payload."""
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
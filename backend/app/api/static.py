@@ -0,0 +1,74 @@
+"""
+/storage serving tuned for browser caching.
+
+Files under /storage are rewritten in place only by re-extraction, which also
+creates new Snapshot rows. The API therefore hands out versioned URLs
+(`?v=<snapshot_id>` for snapshots, `?v=<content hash or video_id>` for the
+original video). A versioned request is cached as immutable for a year; an
+unversioned one is revalidated with a strong ETag. Range / If-Range handling
+(seeking in the original video) comes from Starlette's FileResponse. Servers
+that implement the ASGI pathsend extension get a sendfile fast path too.
+
+A missing file can be handed to on_missing(path), which may recreate it
+(evicted derived files, see app/pipeline/regenerate.py) before a 404.
+"""
+from __future__ import annotations
+
+import os
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+
+import anyio
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.services.storage import versioned_url  # noqa: F401 - re-exported
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    # inode + size + mtime_ns changes on every rewrite, unlike Starlette's mtime(s)-size md5
+    return f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+class CachedStaticFiles(StaticFiles):
+    def __init__(self, *args, on_missing: Optional[Callable[[str], bool]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_missing = on_missing
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            # on_missing blocks (it may regenerate files), so it runs in the threadpool
+            if e.status_code != 404 or self.on_missing is None:
+                raise
+            if not await anyio.to_thread.run_sync(self.on_missing, path):
+                raise
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+        headers = {
+            "etag": strong_etag(stat_result),
+            "cache-control": IMMUTABLE_CACHE if query.get("v") else REVALIDATE_CACHE,
+            "accept-ranges": "bytes",
+        }
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,173 @@
+"""
+Storage janitor: keeps job files under a disk quota and drops jobs nobody
+looks at any more.
+
+    cd backend && PYTHONPATH=. python -m app.janitor --interval 300
+
+Each sweep
+  1. scans every job's local files into job_artifact (bytes per kind),
+  2. deletes whole jobs not accessed for JOB_RETENTION_DAYS, as DELETE /jobs/{id} would,
+  3. while usage is over STORAGE_QUOTA_BYTES, evicts derived files of the least
+     recently used jobs (thumbs, frames, master frames, then snapshots), down to
+     QUOTA_LOW_WATER of the quota. Evicted snapshots come back on the next
+     access, see app/services/storage/artifacts.py.
+
+Jobs with pipeline work in flight and files accessed within
+ARTIFACT_MIN_IDLE_SEC (at least ARTIFACT_TOUCH_INTERVAL_SEC) are left alone. Both limits default to 0 (off).
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.persistence.db import SessionLocal
+from app.persistence.tables import JobArtifact, VideoJob
+from app.services.storage import Storage, artifacts, get_storage, job_key
+
+logger = logging.getLogger("app.janitor")
+
+STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", "0"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "0"))
+ARTIFACT_MIN_IDLE_SEC = float(os.getenv("ARTIFACT_MIN_IDLE_SEC", "3600"))
+QUOTA_LOW_WATER = 0.9  # evict a little below the quota so every sweep doesn't evict again
+
+# the pipeline is reading or writing these jobs' files
+ACTIVE_STATUSES = ("processing", "describing", "narrating")
+
+
+@dataclass
+class SweepResult:
+    used_bytes: int = 0
+    deleted_jobs: List[str] = field(default_factory=list)
+    evicted: List[Tuple[str, str, int]] = field(default_factory=list)  # (job_id, kind, bytes)
+
+
+def _delete_job(db: Session, storage: Storage, job_id: str) -> None:
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    if job is None:
+        return
+    db.delete(job)
+    db.commit()
+    storage.delete_prefix(job_key(job_id))
+
+
+def sweep(
+    db: Session,
+    storage: Optional[Storage] = None,
+    quota_bytes: int = STORAGE_QUOTA_BYTES,
+    retention_days: float = JOB_RETENTION_DAYS,
+    min_idle_sec: float = ARTIFACT_MIN_IDLE_SEC,
+    now: Optional[datetime] = None,
+) -> SweepResult:
+    storage = storage or get_storage()
+    now = now or datetime.now(timezone.utc)
+    # touch() writes last_accessed_at at most every TOUCH_INTERVAL_SEC, so a
+    # shorter idle window could evict files that are being read right now
+    min_idle_sec = max(min_idle_sec, artifacts.TOUCH_INTERVAL_SEC)
+    result = SweepResult()
+
+    jobs = db.execute(select(VideoJob.job_id, VideoJob.status, VideoJob.created_at)).all()
+    for j in jobs:
+        artifacts.record_usage(db, j.job_id, artifacts.scan(storage, j.job_id), j.created_at or now)
+    db.commit()
+    active = {j.job_id for j in jobs if j.status in ACTIVE_STATUSES}
+
+    if retention_days > 0:
+        last_access = func.coalesce(func.max(JobArtifact.last_accessed_at), VideoJob.created_at)
+        expired = db.scalars(
+            select(VideoJob.job_id)
+            .outerjoin(JobArtifact, JobArtifact.job_id == VideoJob.job_id)
+            .group_by(VideoJob.job_id, VideoJob.created_at)
+            .having(last_access < now - timedelta(days=retention_days))
+        ).all()
+        for job_id in expired:
+            if job_id in active:
+                continue
+            _delete_job(db, storage, job_id)
+            result.deleted_jobs.append(job_id)
+
+    result.used_bytes = int(db.scalar(select(func.coalesce(func.sum(JobArtifact.bytes), 0))))
+    if quota_bytes <= 0 or result.used_bytes <= quota_bytes:
+        return result
+
+    # a bucket-backed cache can drop the video too; fetch() downloads it again
+    kinds = artifacts.EVICTABLE + ((artifacts.VIDEO,) if storage.local_is_cache else ())
+    rank = case({k: i for i, k in enumerate(kinds)}, value=JobArtifact.kind)
+    idle_before = now - timedelta(seconds=min_idle_sec)
+    candidates = db.execute(
+        select(JobArtifact.job_id, JobArtifact.kind)
+        .where(
+            JobArtifact.kind.in_(kinds),
+            JobArtifact.bytes > 0,
+            JobArtifact.evicted_at.is_(None),
+            JobArtifact.last_accessed_at < idle_before,
+        )
+        .order_by(JobArtifact.last_accessed_at.asc(), JobArtifact.job_id, rank)
+    ).all()
+
+    target = int(quota_bytes * QUOTA_LOW_WATER)
+    for c in candidates:
+        if result.used_bytes <= target:
+            break
+        if c.job_id in active:
+            continue
+        freed = artifacts.evict(db, storage, c.job_id, c.kind, idle_before)
+        if freed:
+            result.used_bytes -= freed
+            result.evicted.append((c.job_id, c.kind, freed))
+
+    if result.used_bytes > quota_bytes:
+        logger.warning(
+            "storage still over quota after eviction: %d > %d bytes (videos, recently used or in-flight jobs)",
+            result.used_bytes, quota_bytes,
+        )
+    return result
+
+
+def run_once() -> SweepResult:
+    db = SessionLocal()
+    try:
+        result = sweep(db)
+    finally:
+        db.close()
+    logger.info(
+        "sweep: %d bytes in use, %d jobs deleted, %d artifacts evicted (%d bytes)",
+        result.used_bytes, len(result.deleted_jobs), len(result.evicted), sum(e[2] for e in result.evicted),
+    )
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="video2story storage quota and retention")
+    parser.add_argument("--interval", type=float, default=300.0, help="seconds between sweeps")
+    parser.add_argument("--once", action="store_true", help="run a single sweep and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.once:
+        run_once()
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    while not stop.is_set():
+        try:
+            run_once()
+        except Exception:
+            logger.exception("sweep failed")
+        stop.wait(args.interval)
+
+
+if __name__ == "__main__":
+    main()
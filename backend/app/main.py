@@ -1,19 +1,26 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
+from app.api.responses import CompressionMiddleware, FastJSONResponse
+from app.api.static import CachedStaticFiles
 from app.api.routes.jobs import router as jobs_router
 from app.api.routes.scenes import router as scenes_router
 from app.api.routes.narrative import router as narrative_router
-from app.persistence.db import init_db
+from app.api.routes.uploads import router as uploads_router
+from app.persistence.db import dispose_async_engine, init_db, pool_metrics
+from app.pipeline.regenerate import restore_missing_file
+from app.services.storage import LocalStorage, get_storage
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app):
     init_db()
     yield
+    await dispose_async_engine()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# large listings compress ~10x; small bodies, images, video and SSE are left alone
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,10 +31,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # resumable uploads report progress in these
+    expose_headers=["Location", "Upload-Offset", "Upload-Length", "Tus-Resumable"],
 )
-STORAGE_ROOT = Path(__file__).resolve().parents[1] / "storage"
-app.mount("/storage", StaticFiles(directory=str(STORAGE_ROOT)), name="storage")
+# versioned URLs are served immutable, see app/api/static.py; object stores hand out their own URLs
+storage = get_storage()
+if isinstance(storage, LocalStorage):
+    # evicted snapshots are regenerated on a miss, see app/services/storage/artifacts.py
+    app.mount(
+        "/storage",
+        CachedStaticFiles(directory=str(storage.root), on_missing=restore_missing_file),
+        name="storage",
+    )
 
 app.include_router(jobs_router)
 app.include_router(scenes_router)
 app.include_router(narrative_router)
+app.include_router(uploads_router)
+
+
+@app.get("/metrics/db-pool")
+def db_pool_metrics():
+    """Checked-out / idle / overflow connections for the sync and async engines."""
+    return pool_metrics()
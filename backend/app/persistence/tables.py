@@ -5,6 +5,8 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Integer,
+    BigInteger,
+    SmallInteger,
     Float,
     Boolean,
     Text,
@@ -12,7 +14,7 @@ from sqlalchemy import (
     Index,
     text,
 )
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy import Column, DateTime, String
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -28,6 +30,24 @@ class VideoJob(Base):
     status = Column(String, nullable=False, default="created")
     error = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # {stage: {started_at, finished_at, seconds}} written by the pipeline orchestrator
+    stage_timings = Column(JSONB, nullable=True)
+
+    # scheduling inputs for queued work, see app/pipeline/scheduling.py
+    priority = Column(String, nullable=False, default="normal", server_default="normal")
+    tenant = Column(String, nullable=True)
+
+    # denormalized counts, maintained by extraction / scene build in the same transaction
+    snapshot_count = Column(Integer, nullable=False, default=0, server_default="0")
+    scene_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # highest Snapshot.level complete for the whole video, null while none is (see app/pipeline/extract.py)
+    snapshot_level = Column(Integer, nullable=True)
+    # bumped by every UPDATE of the row, counters included; versions the snapshot list's ETag
+    updated_at = Column(DateTime(timezone=True), nullable=True, onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_video_job_created", "created_at", "job_id"),
+    )
 
     # 1:1
     asset = relationship(
@@ -64,6 +84,12 @@ class VideoJob(Base):
         cascade="all, delete-orphan",
     )
 
+    narrative_windows = relationship(
+        "NarrativeWindow",
+        back_populates="job",
+        cascade="all, delete-orphan",
+    )
+
 
 class VideoAsset(Base):
     __tablename__ = "video_asset"
@@ -77,6 +103,8 @@ class VideoAsset(Base):
         index=True,
     )
     uri = Column(String, nullable=False)
+    duration_sec = Column(Float, nullable=True)
+    content_sha256 = Column(String(64), nullable=True)
 
     job = relationship("VideoJob", back_populates="asset")
 
@@ -99,6 +127,12 @@ class SnapshotConfig(Base):
     grayscale = Column(Boolean, nullable=False, default=False)
     black_white = Column(Boolean, nullable=False, default=False)
     image_format = Column(String, nullable=False, default="jpg")
+    # frames appended to one pack file + index instead of a file each (app/services/storage/pack.py)
+    packed = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    # rate of the keyframe preview pass run before full extraction; null or 0 = single pass
+    preview_fps = Column(Float, nullable=True)
+    # nothing decoded at ingest; scene keyframes are seeked on first use (app/pipeline/lazy.py)
+    lazy = Column(Boolean, nullable=False, default=False, server_default=text("false"))
 
     created_at = Column(DateTime, nullable=False, server_default=text("now()"))
 
@@ -120,6 +154,8 @@ class Snapshot(Base):
     uri = Column(String, nullable=False)
     width = Column(Integer, nullable=True)
     height = Column(Integer, nullable=True)
+    # 0 = on the preview grid, 1 = filled in by the full-rate pass
+    level = Column(SmallInteger, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, nullable=False, server_default=text("now()"))
 
@@ -154,6 +190,13 @@ class Scene(Base):
     short_description = Column(Text, nullable=False)
     confidence = Column(Float, nullable=True)
 
+    # description copied from a visually near-identical scene instead of a VLM call
+    description_reused = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    reused_from_scene_id = Column(String, nullable=True)
+
+    # number of linked snapshots, set when the scene is built
+    snapshot_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     created_at = Column(DateTime, nullable=False, server_default=text("now()"))
 
     job = relationship("VideoJob", back_populates="scenes")
@@ -207,6 +250,128 @@ class Narrative(Base):
 
     structured_data = Column(JSONB, nullable=True)
 
+    # queued -> running -> generated | failed (background generation)
+    status = Column(String, nullable=False, default="generated", server_default="generated")
+    error = Column(Text, nullable=True)
+    # last status change; a queued/running status that stays put this long is stale
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime, nullable=False, server_default=text("now()"))
+
+    job = relationship("VideoJob", back_populates="narrative", uselist=False)
+
+
+class NarrativeWindow(Base):
+    """
+    Cached partial summary of one window of scene lines (hierarchical narrative).
+    Keyed by a hash of the window's lines, so unchanged windows are reused on regenerate.
+    """
+    __tablename__ = "narrative_window"
+
+    window_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id = Column(
+        String,
+        ForeignKey("video_job.job_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    lines_hash = Column(String(64), nullable=False)
+    summary = Column(Text, nullable=False)
+
     created_at = Column(DateTime, nullable=False, server_default=text("now()"))
 
-    job = relationship("VideoJob", back_populates="narrative", uselist=False)
\ No newline at end of file
+    job = relationship("VideoJob", back_populates="narrative_windows")
+
+    __table_args__ = (
+        UniqueConstraint("job_id", "lines_hash", name="uq_narrative_window_job_hash"),
+    )
+
+
+class Task(Base):
+    """
+    Durable work queue row (extract, narrative, ...) claimed by worker
+    processes with SELECT ... FOR UPDATE SKIP LOCKED, see app/pipeline/queue.py.
+    """
+    __tablename__ = "task"
+
+    task_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id = Column(
+        String,
+        ForeignKey("video_job.job_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=True)
+
+    # queued -> running -> done | failed; running rows with an expired lease are reclaimable
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    worker_id = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    # SJF with aging + fair share, see app/pipeline/scheduling.py
+    priority = Column(String, nullable=False, default="normal", server_default="normal")
+    tenant = Column(String, nullable=False, default="default", server_default="default")
+    cost = Column(Float, nullable=False, default=0.0, server_default="0")
+    sched_key = Column(Float, nullable=False, default=0.0, server_default="0")
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_task_claim", "status", "run_after"),
+        Index("ix_task_sched", "status", "sched_key"),
+    )
+
+
+class UploadSession(Base):
+    """
+    Resumable upload in progress (create -> PATCH chunks at offsets -> finalize),
+    see app/api/routes/uploads.py. The job is only created on finalize.
+    """
+    __tablename__ = "upload_session"
+
+    upload_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    filename = Column(String, nullable=True)
+    length = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, nullable=False, default=0)
+
+    # open -> finalized
+    status = Column(String, nullable=False, default="open")
+    job_id = Column(String, nullable=True)
+    content_sha256 = Column(String(64), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class JobArtifact(Base):
+    """
+    Disk usage and last access of one kind of a job's files (video, snapshots,
+    thumbs, frames), maintained by app/janitor.py. Derived kinds can be evicted
+    under STORAGE_QUOTA_BYTES and are regenerated on the next access, see
+    app/services/storage/artifacts.py.
+    """
+    __tablename__ = "job_artifact"
+
+    job_id = Column(
+        String,
+        ForeignKey("video_job.job_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    kind = Column(String, primary_key=True)
+
+    bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    last_accessed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # set while the files are gone; cleared when they are regenerated
+    evicted_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_job_artifact_lru", "last_accessed_at"),
+    )
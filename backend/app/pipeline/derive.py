@@ -0,0 +1,190 @@
+"""
+Snapshots for a changed resize_width / grayscale / black_white / image_format,
+derived from the job's master frame cache (app/pipeline/master.py): per frame
+one JPEG decode (usually at reduced scale), preprocess_image() and one encode,
+spread over DERIVE_WORKERS threads (OpenCV releases the GIL). ffmpeg and the
+video are not involved.
+
+The new snapshots are written under fresh keys (snapshots/derived-<id>/) and
+swapped in with one transaction; the old files are deleted only after that,
+so readers see the old set or the new one, and a failed derive leaves the old
+one intact.
+
+sampling_fps can't change this way, the master holds the frames sampled at the
+current rate. Jobs without a complete master cache (extracted before it
+existed, MASTER_FRAMES=0, or evicted), or asking for a width above the master's
+MASTER_MAX_WIDTH cap, are re-extracted from the video instead, which fills the
+cache for next time. Lazy jobs just drop their keyframes; they are seeked
+again, with the new config, when their scenes are next used.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import posixpath
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import cv2
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.persistence.tables import Scene, Snapshot, SnapshotConfig
+from app.pipeline.extract import (
+    DEFAULT_RESIZE_WIDTH,
+    _set_snapshot_count,
+    _set_snapshot_level,
+    extract_preprocess_persist_snapshots,
+    preprocess_image,
+    preview_every,
+    snapshot_level,
+)
+from app.pipeline.lazy import drop_keyframes
+from app.pipeline.master import MASTER_MAX_WIDTH, decode_master, master_key
+from app.services.storage import Storage, artifacts, get_storage, job_key
+from app.services.storage.pack import (
+    INDEX_SUFFIX,
+    MATERIALIZED_SUFFIX,
+    PACK_NAME,
+    FramePackWriter,
+    frame_uri,
+    open_pack,
+    split_frame_uri,
+)
+
+logger = logging.getLogger(__name__)
+
+DERIVE_WORKERS = int(os.getenv("DERIVE_WORKERS", str(min(8, os.cpu_count() or 1))))
+DERIVE_BATCH = 64  # frames in flight; bounds the encoded bytes held at once
+DERIVED_DIR_PREFIX = "derived-"
+
+
+def _open_master(storage: Storage, job_id: str, expected: int):
+    try:
+        reader = open_pack(storage.fetch_pack(master_key(job_id)))
+    except (FileNotFoundError, ValueError):
+        return None
+    return reader if expected and reader.count == expected else None
+
+
+def _drop_replaced(storage: Storage, job_id: str, uris: Iterable[str], keep: str) -> None:
+    """Delete the files of snapshot rows that were just swapped out, and what was derived from them."""
+    base = job_key(job_id, "snapshots")
+    files: set[str] = set()
+    dirs: set[str] = set()
+    for uri in uris:
+        packed = split_frame_uri(uri)
+        try:
+            key = packed[0] if packed else storage.key(uri)
+        except ValueError:
+            continue  # legacy path outside the store
+        parent = posixpath.dirname(key)
+        if not key.startswith(base + "/"):
+            continue
+        if parent != base:
+            dirs.add(parent)  # an earlier derived set: drop it whole
+        elif packed:
+            files.update((key, key + INDEX_SUFFIX))
+            dirs.add(key + MATERIALIZED_SUFFIX)
+        else:
+            files.add(key)
+            dirs.add(f"{base}/{artifacts.THUMBS_DIRNAME}")
+    dirs.discard(keep)
+    storage.delete(files)
+    for prefix in dirs:
+        storage.delete_prefix(prefix)
+
+
+def derive_snapshots(job_id: str, db: Session, storage: Optional[Storage] = None) -> int:
+    """
+    Replace the job's snapshots with ones preprocessed by its current config.
+    Returns the number of snapshots. Like re-extraction, this drops scene links.
+    """
+    storage = storage or get_storage()
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).one()
+    if cfg.lazy:
+        drop_keyframes(job_id, db, storage)
+        db.commit()
+        return 0
+    old = db.execute(
+        select(Snapshot.timestamp_sec, Snapshot.uri).where(Snapshot.job_id == job_id).order_by(Snapshot.timestamp_sec.asc())
+    ).all()
+    timestamps = [r.timestamp_sec for r in old]
+
+    master = _open_master(storage, job_id, len(timestamps))
+    if master is None:
+        logger.info("no complete master frames for %s, extracting from the video", job_id)
+        return len(extract_preprocess_persist_snapshots(job_id, db, storage).files)
+
+    first = decode_master(master.frame(0), 0, None)
+    if first is None:
+        raise RuntimeError(f"master frames of {job_id} are unreadable")
+    width = first.shape[1]
+    target_w = cfg.resize_width or DEFAULT_RESIZE_WIDTH
+    if MASTER_MAX_WIDTH and width >= MASTER_MAX_WIDTH and target_w > width:
+        # the master was scaled down to its cap; only the video has the detail
+        logger.info("master frames of %s are %dpx wide, extracting %dpx from the video", job_id, width, target_w)
+        return len(extract_preprocess_persist_snapshots(job_id, db, storage).files)
+    gray = bool(cfg.grayscale or cfg.black_white)
+    ext = f".{cfg.image_format}"
+    every = preview_every(cfg)
+
+    def _derive(i: int):
+        img = decode_master(master.frame(i), width, target_w, gray)
+        if img is None:
+            raise RuntimeError(f"master frame {i} of {job_id} is unreadable")
+        img = preprocess_image(img, cfg)
+        ok, buf = cv2.imencode(ext, img)
+        if not ok:
+            raise RuntimeError(f"could not encode snapshot as {cfg.image_format}")
+        return buf.tobytes(), img.shape[1], img.shape[0]
+
+    # fresh keys, so the current snapshots stay readable until the swap below
+    set_key = job_key(job_id, "snapshots", f"{DERIVED_DIR_PREFIX}{uuid.uuid4().hex[:12]}")
+    set_dir = storage.local_path(set_key)
+    set_dir.mkdir(parents=True, exist_ok=True)
+    pack_key = f"{set_key}/{PACK_NAME}"
+
+    rows: list[Snapshot] = []
+    keys: list[str] = []
+    try:
+        pack = FramePackWriter(storage.local_path(pack_key)) if cfg.packed else None
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, DERIVE_WORKERS), thread_name_prefix="derive") as pool:
+                for start in range(0, len(timestamps), DERIVE_BATCH):
+                    batch = range(start, min(start + DERIVE_BATCH, len(timestamps)))
+                    for i, (data, w, h) in zip(batch, pool.map(_derive, batch)):
+                        if pack is not None:
+                            key = frame_uri(pack_key, pack.append(data))
+                        else:
+                            path = set_dir / f"{i + 1:06d}{ext}"
+                            path.write_bytes(data)
+                            key = storage.key(str(path))
+                            keys.append(key)
+                        rows.append(Snapshot(
+                            job_id=job_id, timestamp_sec=timestamps[i], uri=key, width=w, height=h,
+                            level=snapshot_level(i, every),
+                        ))
+        finally:
+            if pack is not None:
+                pack.close()
+
+        if pack is not None:
+            keys = [pack_key, pack_key + INDEX_SUFFIX]
+        storage.put(keys)
+
+        db.query(Snapshot).filter(Snapshot.job_id == job_id).delete(synchronize_session=False)
+        db.query(Scene).filter(Scene.job_id == job_id).update({Scene.snapshot_count: 0}, synchronize_session=False)
+        db.add_all(rows)
+        _set_snapshot_count(db, job_id, len(rows))
+        _set_snapshot_level(db, job_id, 1 if every else 0)
+        artifacts.mark_restored(db, job_id)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        storage.delete_prefix(set_key)
+        raise
+
+    _drop_replaced(storage, job_id, [r.uri for r in old], keep=set_key)
+    return len(rows)
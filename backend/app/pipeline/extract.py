@@ -1,25 +1,76 @@
 from __future__ import annotations
 
+import contextlib
+import logging
+import math
+import os
 import re
 import subprocess
+import time
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Iterator, Optional
 
 import cv2
 import numpy as np
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
-from app.persistence.tables import Snapshot, SnapshotConfig, VideoAsset
+from app.persistence.tables import Scene, Snapshot, SnapshotConfig, VideoAsset, VideoJob
+from app.services.storage import Storage, artifacts, get_storage, job_key
+from app.pipeline.master import MASTER_FRAMES, MasterFrameWriter, master_key
+from app.services.storage.pack import INDEX_SUFFIX, PACK_NAME, FramePackWriter, frame_uri
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg output for packed jobs; each frame is moved into the pack and deleted
+PACK_INCOMING_DIRNAME = ".incoming"
+# loose preview frames, dropped once the full-rate pass has replaced them
+PREVIEW_DIRNAME = "preview"
 
 DEFAULT_RESIZE_WIDTH = 512  # fallback if UI does not provide one
+PROGRESS_COMMIT_EVERY = 16  # frames per commit + on_progress call in progressive mode
+PREVIEW_FPS = float(os.getenv("PREVIEW_FPS", "0.1"))  # default preview rate for new jobs, 0 = single pass
+
 
 @dataclass(frozen=True)
 class ExtractResult:
+    # frame files as ffmpeg wrote them; for packed jobs they were moved into the pack
     files: list[Path]
     fps: float
     snapshots_dir: Path
 
 
+@dataclass(frozen=True)
+class PreviewPass:
+    every: int  # full-rate frames per preview frame
+    count: int  # preview rows written, at full-rate indices 0, every, 2 * every, ...
+
+
+def preview_every(cfg: SnapshotConfig) -> int:
+    """
+    The preview grid is every n-th timestamp of the full-rate pass, n chosen so
+    it samples at most cfg.preview_fps. 0 when the job extracts in a single pass.
+    """
+    fps = float(cfg.sampling_fps)
+    preview_fps = float(cfg.preview_fps or 0)
+    if preview_fps <= 0 or fps <= preview_fps:
+        return 0
+    return math.ceil(fps / preview_fps - 1e-9)
+
+
+def density_levels(cfg: SnapshotConfig) -> list[float]:
+    """Sampling rate of each Snapshot.level, coarsest first."""
+    every = preview_every(cfg)
+    fps = float(cfg.sampling_fps)
+    return [fps / every, fps] if every else [fps]
+
+
+def snapshot_level(i: int, every: int) -> int:
+    """Level of the i-th full-rate frame."""
+    return 0 if not every or i % every == 0 else 1
+
+
 def _run_ffmpeg_extract(video_path: Path, out_pattern: Path, sampling_fps: float) -> None:
     cmd = [
         "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
@@ -31,6 +82,88 @@ def _run_ffmpeg_extract(video_path: Path, out_pattern: Path, sampling_fps: float
         raise RuntimeError("Invalid or corrupted video file")
 
 
+def _run_ffmpeg_preview(video_path: Path, out_pattern: Path, preview_fps: float) -> None:
+    # only keyframes are decoded, each grid timestamp gets the nearest one
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-skip_frame", "nokey", "-i", str(video_path), "-vf", f"fps={preview_fps}", str(out_pattern),
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError("Invalid or corrupted video file")
+
+
+def _iter_ffmpeg_frames(video_path: Path, out_pattern: Path, sampling_fps: float) -> Iterator[Path]:
+    """
+    Run ffmpeg and yield each numbered frame as soon as it is complete,
+    i.e. once the next frame exists or ffmpeg has exited.
+    """
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-i", str(video_path), "-vf", f"fps={sampling_fps}", str(out_pattern),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    yield from iter_process_frames(proc, out_pattern)
+
+
+def iter_process_frames(proc: subprocess.Popen, out_pattern: Path) -> Iterator[Path]:
+    """Yield frames of a running ffmpeg writing out_pattern; kills it if the consumer stops early."""
+    pattern = str(out_pattern)
+    idx = 1
+    try:
+        while True:
+            exited = proc.poll() is not None
+            cur = Path(pattern % idx)
+            if cur.exists() and (exited or Path(pattern % (idx + 1)).exists()):
+                yield cur
+                idx += 1
+                continue
+            if exited:
+                break
+            time.sleep(0.05)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    if proc.returncode != 0:
+        raise RuntimeError("Invalid or corrupted video file")
+
+
+def frames_dir(storage: Storage, job_id: str, cfg: SnapshotConfig) -> Path:
+    """Where ffmpeg writes numbered frames for this job."""
+    snapshots_dir = storage.local_path(job_key(job_id, "snapshots"))
+    return snapshots_dir / PACK_INCOMING_DIRNAME if cfg.packed else snapshots_dir
+
+
+def _master_writer(storage: Storage, job_id: str):
+    """Writer for the job's master frame cache, or a no-op context when MASTER_FRAMES is off."""
+    if not MASTER_FRAMES:
+        return contextlib.nullcontext()
+    return MasterFrameWriter(storage.local_path(master_key(job_id)))
+
+
+def _master_keys(master: Optional[MasterFrameWriter], job_id: str) -> list[str]:
+    if master is None:
+        return []
+    master.flush()
+    return [master_key(job_id), master_key(job_id) + INDEX_SUFFIX]
+
+
+def _set_snapshot_count(db: Session, job_id: str, n: int) -> None:
+    # committed together with the rows it counts
+    db.query(VideoJob).filter(VideoJob.job_id == job_id).update(
+        {VideoJob.snapshot_count: n}, synchronize_session=False
+    )
+
+
+def _set_snapshot_level(db: Session, job_id: str, level: Optional[int]) -> None:
+    db.query(VideoJob).filter(VideoJob.job_id == job_id).update(
+        {VideoJob.snapshot_level: level}, synchronize_session=False
+    )
+
+
 def _sorted_frame_files(snapshots_dir: Path, image_format: str) -> list[Path]:
     files = list(snapshots_dir.glob(f"*.{image_format}"))
     
@@ -41,11 +174,22 @@ def _sorted_frame_files(snapshots_dir: Path, image_format: str) -> list[Path]:
     return sorted(files, key=extract_number)
 
 
-def _process_frame(path: Path, cfg: SnapshotConfig):
+def _process_frame(path: Path, cfg: SnapshotConfig, master: Optional[MasterFrameWriter] = None):
     img = cv2.imread(str(path))
     if img is None:
         return None, None
 
+    if master is not None:
+        # the decoded frame before any preprocessing, for later re-derivation
+        master.append(img)
+
+    img = preprocess_image(img, cfg)
+    cv2.imwrite(str(path), img)
+    return img.shape[1], img.shape[0]
+
+
+def preprocess_image(img: np.ndarray, cfg: SnapshotConfig) -> np.ndarray:
+    """grayscale / black_white dithering / resize_width, in memory."""
     if cfg.grayscale:
         if len(img.shape) == 3:
             img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -62,8 +206,7 @@ def _process_frame(path: Path, cfg: SnapshotConfig):
         new_h = max(1, int(h * ratio))
         img = cv2.resize(img, (target_w, new_h))
 
-    cv2.imwrite(str(path), img)
-    return img.shape[1], img.shape[0]
+    return img
 
 def bayer_dither_4x4(img: np.ndarray) -> np.ndarray:
     bayer_4x4 = np.array([
@@ -91,19 +234,53 @@ def bayer_dither_4x4(img: np.ndarray) -> np.ndarray:
 def extract_preprocess_persist_snapshots(
     job_id: str,
     db: Session,
-    storage_root: Path,
+    storage: Optional[Storage] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
 ) -> ExtractResult:
+    """
+    Decode at sampling_fps, preprocess and persist Snapshot rows.
+    With on_progress, frames are persisted while ffmpeg runs and
+    on_progress(latest_timestamp_sec) is called after each commit.
+    Frames are written under storage's local root and put() before the
+    rows referencing them are committed.
+
+    With cfg.preview_fps, a keyframes-only pass first commits a coarse
+    timeline (level 0, VideoJob.snapshot_level = 0) within seconds; the
+    full-rate pass then replaces those frames with exact ones and fills in the
+    timestamps between them (level 1) while it runs.
+    """
+    storage = storage or get_storage()
     cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).one()
     asset = db.query(VideoAsset).filter_by(job_id=job_id).one()
 
-    video_path = Path(asset.uri)
+    video_path = storage.fetch(asset.uri)
     if not video_path.exists():
         raise FileNotFoundError(f"Video not found at: {video_path}")
 
-    snapshots_dir = storage_root / "jobs" / job_id / "snapshots"
-    snapshots_dir.mkdir(parents=True, exist_ok=True)
+    snapshots_dir = storage.local_path(job_key(job_id, "snapshots"))
+    out_dir = frames_dir(storage, job_id, cfg)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # re-runs (worker retries, re-extract) replace earlier results; scene links go with them
+    db.query(Snapshot).filter(Snapshot.job_id == job_id).delete(synchronize_session=False)
+    db.query(Scene).filter(Scene.job_id == job_id).update({Scene.snapshot_count: 0}, synchronize_session=False)
+    _set_snapshot_count(db, job_id, 0)
+    _set_snapshot_level(db, job_id, None)
+    artifacts.mark_restored(db, job_id)
+
+    out_pattern = out_dir / f"%06d.{cfg.image_format}"
+
+    every = preview_every(cfg)
+    if every:
+        # an interrupted earlier run may have left preview frames behind
+        storage.delete_prefix(job_key(job_id, "snapshots", PREVIEW_DIRNAME))
+    preview = _extract_preview(job_id, db, cfg, video_path, storage, every) if every else None
+
+    # packed jobs always stream frames into the pack, never globbing a directory
+    if on_progress is not None or cfg.packed or preview is not None:
+        files = _extract_progressive(job_id, db, cfg, video_path, out_pattern, on_progress, storage, preview)
+        return ExtractResult(files, float(cfg.sampling_fps), snapshots_dir)
 
-    out_pattern = snapshots_dir / f"%06d.{cfg.image_format}"
     _run_ffmpeg_extract(video_path, out_pattern, float(cfg.sampling_fps))
 
     files = _sorted_frame_files(snapshots_dir, cfg.image_format)
@@ -111,17 +288,204 @@ def extract_preprocess_persist_snapshots(
     if not files:
         raise RuntimeError("Frame extraction failed: invalid or corrupted video")
     
-    for i, f in enumerate(files):
-        width, height = _process_frame(f, cfg)
-        timestamp_sec = i / float(cfg.sampling_fps)
+    keys = []
+    with _master_writer(storage, job_id) as master:
+        for i, f in enumerate(files):
+            width, height = _process_frame(f, cfg, master)
+            timestamp_sec = i / float(cfg.sampling_fps)
+
+            key = storage.key(str(f))
+            keys.append(key)
+            db.add(Snapshot(
+                job_id=job_id,
+                timestamp_sec=timestamp_sec,
+                uri=key,
+                width=width,
+                height=height,
+            ))
+        keys += _master_keys(master, job_id)
 
+    storage.put(keys)
+    _set_snapshot_count(db, job_id, len(files))
+    _set_snapshot_level(db, job_id, 0)
+    db.commit()
+    return ExtractResult(files, float(cfg.sampling_fps), snapshots_dir)
+
+
+def _extract_preview(
+    job_id: str,
+    db: Session,
+    cfg: SnapshotConfig,
+    video_path: Path,
+    storage: Storage,
+    every: int,
+) -> PreviewPass:
+    """
+    Commit level-0 rows from keyframes only, at the timestamps the full-rate
+    pass will write for indices 0, every, 2 * every, ... Best effort: if it
+    fails, the full-rate pass simply starts from an empty timeline.
+    """
+    fps = float(cfg.sampling_fps)
+    out_dir = storage.local_path(job_key(job_id, "snapshots", PREVIEW_DIRNAME))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        _run_ffmpeg_preview(video_path, out_dir / f"%06d.{cfg.image_format}", fps / every)
+    except RuntimeError:
+        logger.warning("preview pass of %s failed, extracting at full rate only", job_id)
+        return PreviewPass(every, 0)
+
+    files = _sorted_frame_files(out_dir, cfg.image_format)
+    keys = []
+    for k, f in enumerate(files):
+        width, height = _process_frame(f, cfg)
+        key = storage.key(str(f))
+        keys.append(key)
         db.add(Snapshot(
             job_id=job_id,
-            timestamp_sec=timestamp_sec,
-            uri=str(f),
+            timestamp_sec=(k * every) / fps,
+            uri=key,
             width=width,
             height=height,
+            level=0,
         ))
-    
+
+    storage.put(keys)
+    _set_snapshot_count(db, job_id, len(files))
+    if files:
+        _set_snapshot_level(db, job_id, 0)
+    db.commit()
+    return PreviewPass(every, len(files))
+
+
+def _extract_progressive(
+    job_id: str,
+    db: Session,
+    cfg: SnapshotConfig,
+    video_path: Path,
+    out_pattern: Path,
+    on_progress: Optional[Callable[[float], None]],
+    storage: Storage,
+    preview: Optional[PreviewPass] = None,
+) -> list[Path]:
+    frames = _iter_ffmpeg_frames(video_path, out_pattern, float(cfg.sampling_fps))
+    return persist_frames(job_id, db, cfg, frames, on_progress, storage, preview)
+
+
+def persist_frames(
+    job_id: str,
+    db: Session,
+    cfg: SnapshotConfig,
+    frames: Iterator[Path],
+    on_progress: Optional[Callable[[float], None]] = None,
+    storage: Optional[Storage] = None,
+    preview: Optional[PreviewPass] = None,
+) -> list[Path]:
+    """
+    Process and persist frames while ffmpeg is still decoding, committing every
+    PROGRESS_COMMIT_EVERY frames and reporting the latest persisted timestamp,
+    so later stages can start on the beginning of the video. Each batch is
+    put() to storage (in parallel for object stores) before its commit.
+
+    With cfg.packed, each processed frame is appended to the job's frame pack
+    and its file deleted; rows point at `<pack key>#<index>`. The pack is
+    put() once, after the last frame.
+
+    After a preview pass, each frame on the preview grid replaces the preview
+    row at its timestamp (a new row, so a new snapshot id and URL), and the
+    preview rows and files still left at the end are dropped.
+    """
+    storage = storage or get_storage()
+    with _master_writer(storage, job_id) as master:
+        if not cfg.packed:
+            return _persist_frames(job_id, db, cfg, frames, on_progress, storage, None, master, preview)
+
+        with FramePackWriter(storage.local_path(job_key(job_id, "snapshots", PACK_NAME))) as pack:
+            files = _persist_frames(job_id, db, cfg, frames, on_progress, storage, pack, master, preview)
+    with contextlib.suppress(OSError):
+        files[0].parent.rmdir()  # the emptied ffmpeg output dir
+    return files
+
+
+def _persist_frames(
+    job_id: str,
+    db: Session,
+    cfg: SnapshotConfig,
+    frames: Iterator[Path],
+    on_progress: Optional[Callable[[float], None]],
+    storage: Storage,
+    pack: Optional[FramePackWriter],
+    master: Optional[MasterFrameWriter] = None,
+    preview: Optional[PreviewPass] = None,
+) -> list[Path]:
+    files: list[Path] = []
+    pending: list[str] = []
+    pack_key = storage.key(str(pack.path)) if pack is not None else None
+    every = preview.every if preview is not None else 0
+    previewed = preview.count if preview is not None else 0
+    replaced = 0
+    timestamp_sec = 0.0
+    for i, f in enumerate(frames):
+        width, height = _process_frame(f, cfg, master)
+        timestamp_sec = i / float(cfg.sampling_fps)
+        level = snapshot_level(i, every)
+
+        if pack is not None:
+            key = frame_uri(pack_key, pack.append(f.read_bytes()))
+            f.unlink()
+        else:
+            key = storage.key(str(f))
+            pending.append(key)
+        files.append(f)
+
+        swapped = 0
+        if level == 0 and every and i // every < previewed:
+            # repoint the preview row in place: scenes built meanwhile stay linked to it
+            swapped = db.execute(
+                update(Snapshot)
+                .where(Snapshot.job_id == job_id, Snapshot.timestamp_sec == timestamp_sec)
+                .values(uri=key, width=width, height=height, level=level)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            replaced += swapped
+        if not swapped:
+            db.add(Snapshot(
+                job_id=job_id,
+                timestamp_sec=timestamp_sec,
+                uri=key,
+                width=width,
+                height=height,
+                level=level,
+            ))
+
+        if len(files) % PROGRESS_COMMIT_EVERY == 0:
+            if pack is not None:
+                # readers in this process (the describe pool) see the frames from here on
+                pack.flush()
+            storage.put(pending)
+            pending = []
+            _set_snapshot_count(db, job_id, len(files) + previewed - replaced)
+            db.commit()
+            if on_progress:
+                on_progress(timestamp_sec)
+
+    if not files:
+        raise RuntimeError("Frame extraction failed: invalid or corrupted video")
+
+    if pack is not None:
+        pack.flush()
+        pending = [pack_key, pack_key + INDEX_SUFFIX]
+    storage.put(pending + _master_keys(master, job_id))
+    preview_prefix = job_key(job_id, "snapshots", PREVIEW_DIRNAME)
+    if previewed:
+        # grid points past the last decoded frame
+        db.query(Snapshot).filter(
+            Snapshot.job_id == job_id, Snapshot.uri.startswith(preview_prefix + "/")
+        ).delete(synchronize_session=False)
+    _set_snapshot_count(db, job_id, len(files))
+    _set_snapshot_level(db, job_id, 1 if every else 0)
     db.commit()
-    return ExtractResult(files, float(cfg.sampling_fps), snapshots_dir)
\ No newline at end of file
+    if preview is not None:
+        storage.delete_prefix(preview_prefix)
+    if on_progress:
+        on_progress(timestamp_sec)
+    return files
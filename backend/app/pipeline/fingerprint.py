@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional
+
+import cv2
+import numpy as np
+
+# mean per-keyframe Hamming distance (out of 64 bits) below which two scenes count as the same shot
+DEFAULT_MAX_DISTANCE = 6.0
+
+
+def dhash(path: Path) -> Optional[int]:
+    """
+    64-bit difference hash: 9x8 grayscale thumbnail, one bit per
+    horizontally adjacent pixel pair. Robust to re-encoding and small shifts.
+    """
+    # decode at 1/8 resolution, we only need a tiny thumbnail
+    img = cv2.imread(str(path), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if img is None:
+        return None
+
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def scene_fingerprint(keyframe_paths: List[Path]) -> List[int]:
+    return [h for h in (dhash(p) for p in keyframe_paths) if h is not None]
+
+
+def fingerprint_distance(a: List[int], b: List[int]) -> float:
+    """
+    Symmetric mean nearest-neighbour Hamming distance between two keyframe sets.
+    Order-insensitive, so cut-backs that start at a different moment still match.
+    """
+    if not a or not b:
+        return float("inf")
+
+    def _directed(x: List[int], y: List[int]) -> float:
+        return sum(min((h ^ g).bit_count() for g in y) for h in x) / len(x)
+
+    return max(_directed(a, b), _directed(b, a))
+
+
+def find_similar(
+    fingerprint: List[int],
+    candidates: Dict[Hashable, List[int]],
+    max_distance: float = DEFAULT_MAX_DISTANCE,
+) -> Optional[Hashable]:
+    """Key of the closest candidate within max_distance, or None."""
+    best_key, best = None, float("inf")
+    for key, other in candidates.items():
+        d = fingerprint_distance(fingerprint, other)
+        if d < best:
+            best_key, best = key, d
+    return best_key if best <= max_distance else None
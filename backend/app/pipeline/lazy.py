@@ -0,0 +1,213 @@
+"""
+Lazy jobs (SnapshotConfig.lazy): ingest stores only the probed duration and
+fixed chunk_length_sec scene boundaries, nothing is decoded. The first time a
+scene's keyframes are needed (scene detail, describe, the full pipeline),
+exactly those timestamps are decoded, each with an ffmpeg input seek, and kept
+as Snapshot rows linked to the scene like extracted ones.
+
+Keyframe timestamps lie on the sampling_fps grid and their files are numbered
+as full extraction would number them, so a job's rows and keys are the same
+whichever way a frame was decoded. Evicted keyframes are seeked again
+(app/pipeline/regenerate.py).
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.persistence.db import SessionLocal
+from app.persistence.tables import Scene, SceneSnapshot, Snapshot, SnapshotConfig, VideoAsset, VideoJob
+from app.pipeline.extract import _process_frame, _set_snapshot_count, _set_snapshot_level
+from app.pipeline.scenes import build_scene, clear_scenes, pick_uniform_keyframes
+from app.pipeline.scheduling import probe_duration_sec
+from app.services.singleflight import SingleFlight, advisory_lock
+from app.services.storage import Storage, artifacts, get_storage, job_key
+
+logger = logging.getLogger(__name__)
+
+LAZY_SEEK_WORKERS = int(os.getenv("LAZY_SEEK_WORKERS", "4"))  # concurrent ffmpeg seeks per scene
+
+_keyframe_flights = SingleFlight()
+
+
+def _seek_frame(video_path: Path, timestamp_sec: float, out_path: Path) -> bool:
+    """Decode the frame shown at timestamp_sec into out_path; False past the last frame."""
+    # -ss before -i seeks the demuxer to the preceding keyframe and decodes only from there
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{timestamp_sec:.6f}", "-i", str(video_path),
+        "-frames:v", "1", "-update", "1", str(out_path),
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError:
+        raise RuntimeError("Invalid or corrupted video file")
+    return out_path.exists()
+
+
+def keyframe_indices(start_sec: float, end_sec: float, fps: float, duration_sec: float, k: int) -> List[int]:
+    """Full-rate frame indices of k keyframes spread over [start, end), as extraction numbers them."""
+    first = math.ceil(start_sec * fps - 1e-9)
+    stop = math.ceil(min(end_sec, duration_sec) * fps - 1e-9)
+    return pick_uniform_keyframes(list(range(first, stop)), k)
+
+
+def drop_keyframes(job_id: str, db: Session, storage: Optional[Storage] = None) -> None:
+    """Delete every snapshot of the job and its files; scenes stay, unlinked. Caller commits."""
+    storage = storage or get_storage()
+    storage.delete_prefix(job_key(job_id, "snapshots"))
+    db.query(Snapshot).filter(Snapshot.job_id == job_id).delete(synchronize_session=False)
+    db.query(Scene).filter(Scene.job_id == job_id).update({Scene.snapshot_count: 0}, synchronize_session=False)
+    _set_snapshot_count(db, job_id, 0)
+    _set_snapshot_level(db, job_id, None)
+    artifacts.mark_restored(db, job_id)
+
+
+def build_lazy_scenes(db: Session, job_id: str, chunk: int, duration_sec: float) -> List[str]:
+    """
+    Rebuild the job's scenes as chunk-second windows over the whole video,
+    linking whatever keyframes already exist. Returns the scene ids.
+    """
+    clear_scenes(db, job_id)
+
+    scene_ids = []
+    for i in range(max(1, math.ceil(duration_sec / chunk))):
+        scene = build_scene(db, job_id, i * chunk, (i + 1) * chunk, allow_empty=True)
+        scene_ids.append(scene.scene_id)
+
+    db.commit()
+    return scene_ids
+
+
+def plan_lazy_job(job_id: str, db: Session, storage: Optional[Storage] = None) -> List[str]:
+    """Ingest for a lazy job: probe the duration and lay out empty scenes. Returns the scene ids."""
+    storage = storage or get_storage()
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).one()
+    asset = db.query(VideoAsset).filter_by(job_id=job_id).one()
+
+    chunk = int(cfg.chunk_length_sec or 0)
+    if chunk <= 0:
+        raise RuntimeError("chunk_length_sec must be > 0")
+    if not asset.duration_sec:
+        asset.duration_sec = probe_duration_sec(storage.fetch(asset.uri))
+    if not asset.duration_sec:
+        raise RuntimeError("Could not read the video duration")
+
+    drop_keyframes(job_id, db, storage)
+    return build_lazy_scenes(db, job_id, chunk, float(asset.duration_sec))
+
+
+def _ensure(job_id: str, scene_id: str, keyframes: int, db: Session, storage: Storage) -> int:
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).first()
+    scene = db.query(Scene).filter_by(scene_id=scene_id, job_id=job_id).first()
+    if cfg is None or not cfg.lazy or scene is None:
+        return 0
+    asset = db.query(VideoAsset).filter_by(job_id=job_id).one()
+
+    fps = float(cfg.sampling_fps)
+    duration = float(asset.duration_sec or scene.end_sec)
+    wanted = {i / fps: i for i in keyframe_indices(scene.start_sec, scene.end_sec, fps, duration, keyframes)}
+
+    # scenes don't overlap, so a lock per scene keeps two seeks of one timestamp apart
+    with advisory_lock(db, f"keyframes:{scene_id}"):
+        have = set(db.scalars(
+            select(Snapshot.timestamp_sec).where(Snapshot.job_id == job_id, Snapshot.timestamp_sec.in_(list(wanted)))
+        ))
+        missing = [(ts, i) for ts, i in wanted.items() if ts not in have]
+        if not missing:
+            return 0
+
+        video_path = storage.fetch(asset.uri)
+        if not video_path.exists():
+            raise FileNotFoundError(f"Video not found at: {video_path}")
+        out_dir = storage.local_path(job_key(job_id, "snapshots"))
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        def _decode(item):
+            ts, i = item
+            path = out_dir / f"{i + 1:06d}.{cfg.image_format}"
+            if not _seek_frame(video_path, ts, path):
+                logger.info("no frame at %.3fs of %s", ts, job_id)
+                return None
+            width, height = _process_frame(path, cfg)
+            return (ts, path, width, height) if width is not None else None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(LAZY_SEEK_WORKERS, len(missing))), thread_name_prefix="seek") as pool:
+            decoded = [d for d in pool.map(_decode, missing) if d is not None]
+
+        keys = []
+        for ts, path, width, height in decoded:
+            key = storage.key(str(path))
+            keys.append(key)
+            snapshot_id = str(uuid.uuid4())
+            db.add(Snapshot(snapshot_id=snapshot_id, job_id=job_id, timestamp_sec=ts, uri=key, width=width, height=height))
+            db.add(SceneSnapshot(scene_id=scene_id, snapshot_id=snapshot_id))
+
+        storage.put(keys)
+        db.query(Scene).filter(Scene.scene_id == scene_id).update(
+            {Scene.snapshot_count: Scene.snapshot_count + len(decoded)}, synchronize_session=False
+        )
+        db.query(VideoJob).filter(VideoJob.job_id == job_id).update(
+            {VideoJob.snapshot_count: VideoJob.snapshot_count + len(decoded)}, synchronize_session=False
+        )
+        db.commit()
+        return len(decoded)
+
+
+def ensure_scene_keyframes(
+    job_id: str,
+    scene_id: str,
+    keyframes: int,
+    db: Optional[Session] = None,
+    storage: Optional[Storage] = None,
+) -> int:
+    """
+    For a lazy job, decode the scene's keyframes that aren't snapshots yet and
+    link them to it; a no-op for other jobs. Returns the number decoded.
+    Concurrent callers for one scene share a single decode.
+    """
+    storage = storage or get_storage()
+    key = (scene_id, int(keyframes))
+    if db is not None:
+        return _keyframe_flights.do(key, partial(_ensure, job_id, scene_id, keyframes, db, storage))
+
+    db = SessionLocal()
+    try:
+        return _keyframe_flights.do(key, partial(_ensure, job_id, scene_id, keyframes, db, storage))
+    finally:
+        db.close()
+
+
+def reseek_snapshots(job_id: str, db: Session, storage: Optional[Storage] = None) -> int:
+    """Write an evicted lazy job's snapshot files again under their keys; returns how many."""
+    storage = storage or get_storage()
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).one()
+    asset = db.query(VideoAsset).filter_by(job_id=job_id).one()
+    rows = db.execute(select(Snapshot.timestamp_sec, Snapshot.uri).where(Snapshot.job_id == job_id)).all()
+
+    video_path = storage.fetch(asset.uri)
+    if not video_path.exists():
+        raise FileNotFoundError(f"Video not found at: {video_path}")
+
+    def _decode(row) -> str:
+        path = storage.local_path(row.uri)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not _seek_frame(video_path, row.timestamp_sec, path):
+            raise RuntimeError(f"no frame at {row.timestamp_sec:.3f}s of {job_id}")
+        _process_frame(path, cfg)
+        return row.uri
+
+    with ThreadPoolExecutor(max_workers=max(1, LAZY_SEEK_WORKERS), thread_name_prefix="seek") as pool:
+        keys = list(pool.map(_decode, rows))
+    storage.put(keys)
+    return len(keys)
@@ -0,0 +1,85 @@
+"""
+Master frame cache: each sampled frame as ffmpeg decoded it, before any
+preprocessing, capped at MASTER_MAX_WIDTH and stored as high-quality JPEG in
+a frame pack at jobs/<job_id>/master/frames.pack. Extraction fills it as a
+side effect, and app/pipeline/derive.py turns it into snapshots for another
+resize/grayscale/dithering config without decoding the video again.
+
+JPEG is cheap to decode, and much cheaper still at 1/2, 1/4 or 1/8 scale:
+libjpeg skips most of the IDCT work, so decode_master() picks the largest
+reduction that still covers the target width.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.services.storage import job_key
+from app.services.storage.pack import PACK_NAME, FramePackWriter
+
+MASTER_DIRNAME = "master"
+MASTER_FRAMES = os.getenv("MASTER_FRAMES", "1") != "0"
+MASTER_MAX_WIDTH = int(os.getenv("MASTER_MAX_WIDTH", "1280"))  # 0 keeps the source width
+MASTER_JPEG_QUALITY = int(os.getenv("MASTER_JPEG_QUALITY", "95"))
+
+# (scale denominator, colour flag, grayscale flag), largest reduction first
+_REDUCED_DECODE = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+
+def master_key(job_id: str) -> str:
+    return job_key(job_id, MASTER_DIRNAME, PACK_NAME)
+
+
+class MasterFrameWriter:
+    """Appends decoded frames (BGR arrays) to a job's master pack, replacing the previous one."""
+
+    def __init__(self, pack_path: Path):
+        self._pack = FramePackWriter(pack_path)
+        self.path = self._pack.path
+
+    @property
+    def count(self) -> int:
+        return self._pack.count
+
+    def append(self, img: np.ndarray) -> int:
+        h, w = img.shape[:2]
+        if MASTER_MAX_WIDTH and w > MASTER_MAX_WIDTH:
+            img = cv2.resize(img, (MASTER_MAX_WIDTH, max(1, int(h * MASTER_MAX_WIDTH / w))), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, MASTER_JPEG_QUALITY])
+        if not ok:
+            raise RuntimeError("could not encode master frame")
+        return self._pack.append(buf.tobytes())
+
+    def flush(self) -> None:
+        self._pack.flush()
+
+    def close(self) -> None:
+        self._pack.close()
+
+    def __enter__(self) -> "MasterFrameWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def decode_master(data, width: int, target_width: Optional[int], grayscale: bool = False) -> Optional[np.ndarray]:
+    """
+    Decode one master frame (width wide) at the smallest scale that is still
+    at least target_width wide; grayscale decodes luma only.
+    """
+    flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    if target_width:
+        for factor, color_flag, gray_flag in _REDUCED_DECODE:
+            if width // factor >= target_width:
+                flag = gray_flag if grayscale else color_flag
+                break
+    return cv2.imdecode(np.frombuffer(data, np.uint8), flag)
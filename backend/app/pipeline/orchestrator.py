@@ -0,0 +1,199 @@
+"""
+Full pipeline for one job: extract -> scenes -> describe -> narrative, without
+a human clicking through each hop.
+
+Scenes are built and described while extraction is still running: as soon as
+a frame past a chunk's end is persisted, that chunk's scene is complete and is
+handed to the describe pool. Lazy jobs skip extraction: every scene goes to
+the pool at once and decodes its own keyframes there. Each stage has a
+process-wide concurrency limit so a burst of uploads cannot saturate ffmpeg
+or the HF router.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import anyio
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.api.routes.narrative import _run_narrative_job
+from app.persistence.db import SessionLocal
+from app.persistence.tables import Narrative, Scene, SceneSnapshot, Snapshot, SnapshotConfig, VideoJob
+from app.pipeline.extract import extract_preprocess_persist_snapshots
+from app.pipeline.lazy import ensure_scene_keyframes, plan_lazy_job
+from app.pipeline.scenes import build_scene, clear_scenes, pick_uniform_keyframes
+from app.services.storage import Storage, get_storage
+from app.services.vlm.hf_client import describe_scene_hf
+
+PIPELINE_KEYFRAMES = 8
+
+EXTRACT_CONCURRENCY = int(os.getenv("PIPELINE_EXTRACT_CONCURRENCY", "2"))
+DESCRIBE_CONCURRENCY = int(os.getenv("PIPELINE_DESCRIBE_CONCURRENCY", "4"))
+NARRATIVE_CONCURRENCY = int(os.getenv("PIPELINE_NARRATIVE_CONCURRENCY", "2"))
+
+_extract_slots = threading.BoundedSemaphore(EXTRACT_CONCURRENCY)
+_describe_slots = threading.BoundedSemaphore(DESCRIBE_CONCURRENCY)
+_narrative_slots = threading.BoundedSemaphore(NARRATIVE_CONCURRENCY)
+
+
+def _mark(db: Session, job: VideoJob, stage: str, event: str) -> None:
+    """Record started_at / finished_at (and seconds, once finished) for a stage."""
+    now = datetime.now(timezone.utc)
+    timings = dict(job.stage_timings or {})
+    entry = dict(timings.get(stage) or {})
+    entry[event] = now.isoformat()
+    if event == "finished_at" and "started_at" in entry:
+        started = datetime.fromisoformat(entry["started_at"])
+        entry["seconds"] = round((now - started).total_seconds(), 3)
+
+    # reassign so the JSON column is flagged dirty
+    timings[stage] = entry
+    job.stage_timings = timings
+    db.commit()
+
+
+def _describe_scene_job(scene_id: str, keyframes: int = PIPELINE_KEYFRAMES) -> None:
+    """Describe one scene in its own session. Raises on failure; the scene stays pending."""
+    with _describe_slots:
+        db = SessionLocal()
+        try:
+            scene = db.query(Scene).filter_by(scene_id=scene_id).first()
+            if not scene:
+                return
+            ensure_scene_keyframes(scene.job_id, scene_id, keyframes, db)
+
+            snaps = (
+                db.query(Snapshot)
+                .join(SceneSnapshot, SceneSnapshot.snapshot_id == Snapshot.snapshot_id)
+                .filter(SceneSnapshot.scene_id == scene_id)
+                .order_by(Snapshot.timestamp_sec.asc())
+                .all()
+            )
+            key_paths = get_storage().fetch_many(s.uri for s in pick_uniform_keyframes(snaps, keyframes))
+            if not key_paths:
+                return
+
+            result = anyio.run(describe_scene_hf, key_paths)
+
+            scene.short_description = result.text
+            scene.confidence = result.confidence
+            scene.description_reused = False
+            scene.reused_from_scene_id = None
+            db.commit()
+        finally:
+            db.close()
+
+
+def run_full_pipeline(job_id: str, storage: Optional[Storage] = None) -> None:
+    """
+    Run every stage for job_id. Status moves processing -> describing ->
+    narrating -> completed, or failed with job.error set. Per-stage timings
+    land in job.stage_timings.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(VideoJob).filter_by(job_id=job_id).first()
+        if not job:
+            return
+
+        cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).first()
+        chunk = int(cfg.chunk_length_sec or 0) if cfg else 0
+        if chunk <= 0:
+            raise RuntimeError("chunk_length_sec must be > 0")
+
+        job.status = "processing"
+        job.error = None
+        job.stage_timings = {}
+        db.commit()
+        _mark(db, job, "pipeline", "started_at")
+
+        clear_scenes(db, job_id)
+
+        futures: List[Future] = []
+        next_start = 0
+
+        with ThreadPoolExecutor(max_workers=DESCRIBE_CONCURRENCY, thread_name_prefix="describe") as pool:
+
+            def _emit_scene(start: int) -> None:
+                scene = build_scene(db, job_id, start, start + chunk)
+                db.commit()
+                if scene is None:
+                    return
+                if not futures:
+                    _mark(db, job, "describe", "started_at")
+                futures.append(pool.submit(_describe_scene_job, scene.scene_id))
+
+            def _on_progress(last_ts: float) -> None:
+                # a chunk is complete once a frame at or past its end is persisted
+                nonlocal next_start
+                while next_start + chunk <= last_ts:
+                    _emit_scene(next_start)
+                    next_start += chunk
+
+            if cfg.lazy:
+                _mark(db, job, "extract", "started_at")
+                scene_ids = plan_lazy_job(job_id, db, storage)
+                _mark(db, job, "extract", "finished_at")
+                if scene_ids:
+                    _mark(db, job, "describe", "started_at")
+                futures += [pool.submit(_describe_scene_job, sid) for sid in scene_ids]
+            else:
+                with _extract_slots:
+                    _mark(db, job, "extract", "started_at")
+                    extract_preprocess_persist_snapshots(job_id, db, storage, on_progress=_on_progress)
+                    _mark(db, job, "extract", "finished_at")
+
+                # the tail: chunks that never saw a later frame
+                max_ts = db.query(func.max(Snapshot.timestamp_sec)).filter(Snapshot.job_id == job_id).scalar()
+                while max_ts is not None and next_start <= max_ts:
+                    _emit_scene(next_start)
+                    next_start += chunk
+
+            job.status = "describing"
+            db.commit()
+
+            errors = []
+            for f in futures:
+                try:
+                    f.result()
+                except Exception as e:
+                    errors.append(e)
+
+        if futures:
+            _mark(db, job, "describe", "finished_at")
+        if errors:
+            raise RuntimeError(f"{len(errors)} of {len(futures)} scene(s) failed to describe: {errors[0]}")
+
+        job.status = "narrating"
+        db.commit()
+
+        with _narrative_slots:
+            _mark(db, job, "narrative", "started_at")
+            _run_narrative_job(job_id)
+            db.expire_all()
+            _mark(db, job, "narrative", "finished_at")
+
+        n = db.query(Narrative).filter_by(job_id=job_id).first()
+        if not n or n.status == "failed":
+            raise RuntimeError((n.error if n else None) or "narrative generation failed")
+
+        job.status = "completed"
+        db.commit()
+        _mark(db, job, "pipeline", "finished_at")
+
+    except Exception as e:
+        db.rollback()
+        job = db.query(VideoJob).filter_by(job_id=job_id).first()
+        if job:
+            job.status = "failed"
+            job.error = str(e)
+            db.commit()
+            _mark(db, job, "pipeline", "finished_at")
+
+    finally:
+        db.close()
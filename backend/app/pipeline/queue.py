@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi import BackgroundTasks
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.persistence.tables import Task
+from app.pipeline.scheduling import FAIR_SHARE_SEC, estimate_cost, job_scheduling, schedule_key
+
+DEFAULT_LEASE_SEC = 120
+RETRY_BASE_SEC = 10
+
+
+def queue_enabled() -> bool:
+    """TASK_QUEUE=db hands work to worker processes; anything else runs it in the API process."""
+    return os.getenv("TASK_QUEUE", "inline").lower() == "db"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    job_id: str,
+    payload: Optional[Dict[str, Any]] = None,
+    max_attempts: int = 3,
+) -> Task:
+    priority, tenant = job_scheduling(db, job_id)
+    cost = estimate_cost(db, kind, job_id)
+    task = Task(
+        job_id=job_id,
+        kind=kind,
+        payload=payload or {},
+        max_attempts=max_attempts,
+        priority=priority,
+        tenant=tenant,
+        cost=cost,
+        sched_key=schedule_key(_now(), cost, priority),
+    )
+    db.add(task)
+    db.commit()
+    return task
+
+
+def submit(
+    db: Session,
+    background: BackgroundTasks,
+    kind: str,
+    job_id: str,
+    inline: Callable[..., None],
+    payload: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Run a pipeline stage: as a durable task when TASK_QUEUE=db, otherwise
+    as a FastAPI background task calling inline(job_id, **payload).
+    """
+    if queue_enabled():
+        enqueue(db, kind, job_id, payload)
+    else:
+        background.add_task(inline, job_id, **(payload or {}))
+
+
+def claim(
+    db: Session,
+    worker_id: str,
+    kinds: Optional[Iterable[str]] = None,
+    lease_sec: int = DEFAULT_LEASE_SEC,
+) -> Optional[Task]:
+    """
+    Claim the best runnable task: queued and due, or running with an
+    expired lease (its worker died). A dead worker's task that already used
+    all its attempts is marked failed instead. SKIP LOCKED lets many workers
+    poll the same table without blocking on each other.
+
+    Best = lowest sched_key (priority + shortest-job-first with aging),
+    pushed back FAIR_SHARE_SEC per task its tenant already has running.
+    """
+    now = _now()
+    expired = and_(Task.status == "running", Task.lease_expires_at < now)
+    (
+        db.query(Task)
+        .filter(expired, Task.attempts >= Task.max_attempts)
+        .update(
+            {
+                Task.status: "failed",
+                Task.lease_expires_at: None,
+                Task.finished_at: now,
+                Task.last_error: func.coalesce(Task.last_error, "lease expired on the last attempt"),
+            },
+            synchronize_session=False,
+        )
+    )
+
+    running = (
+        db.query(Task.tenant.label("tenant"), func.count(Task.task_id).label("n"))
+        .filter(Task.status == "running", Task.lease_expires_at >= now)
+        .group_by(Task.tenant)
+        .subquery()
+    )
+    q = db.query(Task).outerjoin(running, running.c.tenant == Task.tenant).filter(
+        or_(
+            and_(Task.status == "queued", Task.run_after <= now),
+            and_(expired, Task.attempts < Task.max_attempts),
+        )
+    )
+    if kinds:
+        q = q.filter(Task.kind.in_(list(kinds)))
+
+    task = (
+        q.order_by(
+            (Task.sched_key + func.coalesce(running.c.n, 0) * FAIR_SHARE_SEC).asc(),
+            Task.created_at.asc(),
+        )
+        .limit(1)
+        .with_for_update(of=Task, skip_locked=True)
+        .first()
+    )
+    if not task:
+        db.commit()  # end the read transaction
+        return None
+
+    task.status = "running"
+    task.attempts += 1
+    task.worker_id = worker_id
+    task.lease_expires_at = now + timedelta(seconds=lease_sec)
+    db.commit()
+    return task
+
+
+def heartbeat(db: Session, task_id: str, worker_id: str, lease_sec: int = DEFAULT_LEASE_SEC) -> bool:
+    """Extend the lease; False if the task was reclaimed by someone else."""
+    updated = (
+        db.query(Task)
+        .filter(Task.task_id == task_id, Task.worker_id == worker_id, Task.status == "running")
+        .update({Task.lease_expires_at: _now() + timedelta(seconds=lease_sec)}, synchronize_session=False)
+    )
+    db.commit()
+    return bool(updated)
+
+
+def _settle(db: Session, task: Task, values: Dict[Any, Any]) -> bool:
+    """Apply values only while task is still running under this worker's lease; False if it was reclaimed."""
+    updated = (
+        db.query(Task)
+        .filter(Task.task_id == task.task_id, Task.worker_id == task.worker_id, Task.status == "running")
+        .update(values)
+    )
+    db.commit()
+    return bool(updated)
+
+
+def complete(db: Session, task: Task) -> bool:
+    return _settle(db, task, {Task.status: "done", Task.lease_expires_at: None, Task.finished_at: _now()})
+
+
+def fail(db: Session, task: Task, error: str) -> bool:
+    """Requeue with exponential backoff, or give up after max_attempts."""
+    values: Dict[Any, Any] = {Task.last_error: error, Task.lease_expires_at: None}
+    if task.attempts < task.max_attempts:
+        values[Task.status] = "queued"
+        values[Task.run_after] = _now() + timedelta(seconds=RETRY_BASE_SEC * 2 ** (task.attempts - 1))
+    else:
+        values[Task.status] = "failed"
+        values[Task.finished_at] = _now()
+    return _settle(db, task, values)
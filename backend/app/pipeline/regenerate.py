@@ -0,0 +1,184 @@
+"""
+Recreate a job's evicted snapshot files from its video (see
+app/services/storage/artifacts.py), leaving the Snapshot rows, their ids and
+scene links as they are.
+
+Extraction is deterministic for a given video and config, so decoding again
+yields the same frames under the same keys. If it doesn't (ffmpeg upgraded,
+a different frame count), the job is re-extracted instead, which replaces the
+rows. Lazy jobs seek each row's timestamp again instead.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import posixpath
+import threading
+import time
+from functools import partial
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.persistence.db import SessionLocal
+from app.persistence.tables import Snapshot, SnapshotConfig, VideoAsset
+from app.pipeline.extract import (
+    _iter_ffmpeg_frames,
+    _process_frame,
+    extract_preprocess_persist_snapshots,
+    frames_dir,
+)
+from app.pipeline.lazy import reseek_snapshots
+from app.services.singleflight import SingleFlight, advisory_lock
+from app.services.storage import Storage, artifacts, get_storage, job_key
+from app.services.storage.pack import INDEX_SUFFIX, PACK_NAME, FramePackWriter, frame_uri, split_frame_uri
+
+logger = logging.getLogger(__name__)
+
+_restores = SingleFlight()
+
+# /storage misses of jobs found not evicted (deleted jobs, stale URLs) skip the DB this long
+MISSING_RECHECK_SEC = float(os.getenv("MISSING_FILE_RECHECK_SEC", "30"))
+_MISSING_MAX = 4096
+
+_not_evicted: Dict[str, float] = {}
+_not_evicted_lock = threading.Lock()
+
+
+class RegenerationMismatch(RuntimeError):
+    """Decoding again did not reproduce the keys the rows point at."""
+
+
+def regenerate_snapshots(job_id: str, db: Session, storage: Optional[Storage] = None) -> int:
+    """Write the job's snapshot files (or pack) again; returns the number of frames."""
+    storage = storage or get_storage()
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).one()
+    if cfg.lazy:
+        return reseek_snapshots(job_id, db, storage)
+    asset = db.query(VideoAsset).filter_by(job_id=job_id).one()
+    uris = db.scalars(
+        select(Snapshot.uri)
+        .where(Snapshot.job_id == job_id)
+        .order_by(Snapshot.timestamp_sec.asc(), Snapshot.snapshot_id.asc())
+    ).all()
+
+    video_path = storage.fetch(asset.uri)
+    if not video_path.exists():
+        raise FileNotFoundError(f"Video not found at: {video_path}")
+
+    # derived sets live under their own prefix (app/pipeline/derive.py); write back where the rows point
+    packed = split_frame_uri(uris[0]) if uris else None
+    pack_key = packed[0] if packed else job_key(job_id, "snapshots", PACK_NAME)
+    if cfg.packed or not uris:
+        out_dir = frames_dir(storage, job_id, cfg)
+    else:
+        out_dir = storage.local_path(posixpath.dirname(storage.key(uris[0])))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    frames = _iter_ffmpeg_frames(video_path, out_dir / f"%06d.{cfg.image_format}", float(cfg.sampling_fps))
+
+    pack = FramePackWriter(storage.local_path(pack_key)) if cfg.packed else None
+    keys: list[str] = []
+    try:
+        for i, f in enumerate(frames):
+            _process_frame(f, cfg)
+            if pack is not None:
+                key = frame_uri(pack_key, pack.append(f.read_bytes()))
+                f.unlink()
+            else:
+                key = storage.key(str(f))
+            if i >= len(uris) or key != uris[i]:
+                raise RegenerationMismatch(f"frame {i} of {job_id} does not match its snapshot row")
+            keys.append(key)
+    finally:
+        frames.close()  # stops ffmpeg on a mismatch
+        if pack is not None:
+            pack.close()
+
+    if len(keys) != len(uris):
+        raise RegenerationMismatch(f"{len(keys)} frames decoded for {len(uris)} snapshots of {job_id}")
+    if pack is not None:
+        with contextlib.suppress(OSError):
+            out_dir.rmdir()  # the emptied ffmpeg output dir
+        keys = [pack_key, pack_key + INDEX_SUFFIX]
+    storage.put(keys)
+    return len(uris)
+
+
+def _restore(job_id: str, db: Session) -> bool:
+    with advisory_lock(db, f"restore:{job_id}"):
+        # another process may have restored them while we waited for the lock
+        if not artifacts.is_evicted(db, job_id):
+            return False
+        try:
+            regenerate_snapshots(job_id, db)
+        except RegenerationMismatch as e:
+            logger.warning("%s, re-extracting", e)
+            db.rollback()
+            extract_preprocess_persist_snapshots(job_id, db)
+        artifacts.mark_restored(db, job_id)
+        db.commit()
+        logger.info("restored evicted snapshots of %s", job_id)
+        return True
+
+
+def restore_snapshots(job_id: str, db: Optional[Session] = None) -> bool:
+    """
+    Regenerate the job's snapshots if they were evicted; blocks until they are
+    back. Concurrent callers for one job share a single regeneration.
+    """
+    if db is not None:
+        return _restores.do(job_id, partial(_restore, job_id, db))
+
+    db = SessionLocal()
+    try:
+        return _restores.do(job_id, partial(_restore, job_id, db))
+    finally:
+        db.close()
+
+
+def ensure_snapshots(db: Session, job_id: str) -> None:
+    """Record an access to the job's snapshots, regenerating them first if they were evicted."""
+    if artifacts.touch(db, job_id):
+        restore_snapshots(job_id, db)
+
+
+def _recently_not_evicted(job_id: str) -> bool:
+    with _not_evicted_lock:
+        checked = _not_evicted.get(job_id)
+    return checked is not None and time.monotonic() - checked < MISSING_RECHECK_SEC
+
+
+def _remember_not_evicted(job_id: str) -> None:
+    with _not_evicted_lock:
+        if len(_not_evicted) >= _MISSING_MAX:
+            _not_evicted.clear()
+        _not_evicted[job_id] = time.monotonic()
+
+
+def restore_missing_file(path: str) -> bool:
+    """
+    /storage fallback for a file that isn't on disk: if it is an evicted
+    snapshot, regenerate the job's snapshots. True once the file exists.
+    Only the job_artifact flag is read unless the job really is evicted.
+    """
+    parts = path.split("/")
+    if len(parts) < 3 or parts[0] != "jobs":
+        return False
+    if artifacts.classify("/".join(parts[2:])) != artifacts.SNAPSHOTS:
+        return False
+    job_id = parts[1]
+    if _recently_not_evicted(job_id):
+        return False
+
+    db = SessionLocal()
+    try:
+        # no row for unknown jobs, so they read as not evicted too
+        if not artifacts.is_evicted(db, job_id):
+            _remember_not_evicted(job_id)
+            return False
+        restore_snapshots(job_id, db)
+    finally:
+        db.close()
+    return get_storage().local_path(path).exists()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import math
+import uuid
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.persistence.tables import Scene, SceneSnapshot, Snapshot, VideoJob
+
+
+def pick_uniform_keyframes(snaps: List[Snapshot], k: int) -> List[Snapshot]:
+    if not snaps:
+        return []
+    if k <= 0:
+        return []
+    if len(snaps) <= k:
+        return snaps
+
+    # indices from 0..n-1 inclusive
+    n = len(snaps)
+    idxs = [round(i * (n - 1) / (k - 1)) for i in range(k)]
+    # remove duplicates while preserving order
+    seen = set()
+    out = []
+    for ix in idxs:
+        if ix not in seen:
+            out.append(snaps[ix])
+            seen.add(ix)
+    return out
+
+
+def clear_scenes(db: Session, job_id: str) -> None:
+    existing_scene_ids = [sid for (sid,) in db.query(Scene.scene_id).filter(Scene.job_id == job_id).all()]
+    if existing_scene_ids:
+        db.query(SceneSnapshot).filter(SceneSnapshot.scene_id.in_(existing_scene_ids)).delete(synchronize_session=False)
+        db.query(Scene).filter(Scene.job_id == job_id).delete(synchronize_session=False)
+    db.query(VideoJob).filter(VideoJob.job_id == job_id).update({VideoJob.scene_count: 0}, synchronize_session=False)
+    db.commit()
+
+
+def build_scene(
+    db: Session, job_id: str, start_sec: float, end_sec: float, allow_empty: bool = False
+) -> Optional[Scene]:
+    """
+    Pending scene over the snapshots within [start, end), linked to them.
+    Returns None (and adds nothing) for an empty range, unless allow_empty
+    (lazy jobs link their keyframes later). Caller commits.
+    """
+    snaps = (
+        db.query(Snapshot)
+        .filter(Snapshot.job_id == job_id)
+        .filter(Snapshot.timestamp_sec >= start_sec)
+        .filter(Snapshot.timestamp_sec < end_sec)
+        .order_by(Snapshot.timestamp_sec.asc())
+        .all()
+    )
+
+    # skip empty scenes to keep UI clean
+    if not snaps and not allow_empty:
+        return None
+
+    scene_id = str(uuid.uuid4())
+    scene = Scene(
+        scene_id=scene_id,
+        job_id=job_id,
+        start_sec=float(start_sec),
+        end_sec=float(end_sec),
+        short_description="(pending)",
+        confidence=None,
+        snapshot_count=len(snaps),
+    )
+    db.add(scene)
+    db.query(VideoJob).filter(VideoJob.job_id == job_id).update(
+        {VideoJob.scene_count: VideoJob.scene_count + 1}, synchronize_session=False
+    )
+
+    for s in snaps:
+        db.add(SceneSnapshot(scene_id=scene_id, snapshot_id=s.snapshot_id))
+
+    return scene
+
+
+def build_fixed_scenes(db: Session, job_id: str, chunk: int, max_ts: float) -> int:
+    """Rebuild the job's scenes as fixed chunk-second windows up to max_ts. Returns scenes created."""
+    clear_scenes(db, job_id)
+
+    num_scenes = int(math.floor(float(max_ts) / chunk)) + 1
+
+    created = 0
+    for i in range(num_scenes):
+        if build_scene(db, job_id, i * chunk, (i + 1) * chunk):
+            created += 1
+
+    db.commit()
+    return created
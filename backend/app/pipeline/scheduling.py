@@ -0,0 +1,106 @@
+"""
+Cost model and ordering for queued pipeline work (TASK_QUEUE=db).
+
+Each task gets a static sched_key when it is enqueued:
+
+    sched_key = enqueue_epoch + cost / AGING_RATE + PRIORITY_OFFSET_SEC[priority]
+
+Ordering by sched_key ascending is shortest-job-first with linear aging:
+"cost minus AGING_RATE * seconds waited" ranks tasks the same way, since
+"now" is common to all of them. A 3-hour upload yields to later short clips
+but not forever. claim() adds FAIR_SHARE_SEC per task the tenant already
+has running, so one tenant's burst can't monopolise the workers.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.persistence.tables import Scene, SnapshotConfig, VideoAsset, VideoJob
+
+# lower offset runs sooner; aging still lets "batch" work through eventually
+PRIORITY_OFFSET_SEC = {
+    "interactive": 0.0,
+    "normal": 300.0,
+    "batch": 3600.0,
+}
+DEFAULT_PRIORITY = "normal"
+DEFAULT_TENANT = "default"
+
+# cost units are sampled frames; one VLM scene call weighs about as much as SCENE_COST frames
+SCENE_COST = 20.0
+DERIVE_FRAME_COST = 0.1  # re-preprocessing a cached master frame vs decoding it
+NARRATIVE_SCENE_COST = 2.0
+# lazy jobs decode per scene: one input seek per keyframe, each from the preceding keyframe
+LAZY_SEEK_COST = 2.0
+LAZY_KEYFRAMES_PER_SCENE = 8  # app/pipeline/orchestrator.py PIPELINE_KEYFRAMES
+UNKNOWN_DURATION_SEC = 600.0
+
+AGING_RATE = float(os.getenv("SCHED_AGING_RATE", "10"))  # cost units forgiven per second waited
+FAIR_SHARE_SEC = float(os.getenv("SCHED_FAIR_SHARE_SEC", "300"))  # per running task of the same tenant
+
+
+def probe_duration_sec(video_path: Path) -> Optional[float]:
+    """Container duration via ffprobe, None if it can't be read."""
+    cmd = [
+        "ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", str(video_path),
+    ]
+    try:
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=10).stdout
+        return float(out.strip())
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def estimate_cost(db: Session, kind: str, job_id: str) -> float:
+    """
+    extract: duration x sampling_fps frames; derive is a fraction of that;
+    pipeline adds one SCENE_COST per expected scene; narrative scales with
+    the job's scene count. Lazy jobs decode nothing up front, only a few
+    seeks per scene in the pipeline.
+    """
+    if kind == "narrative":
+        scenes = db.query(func.count(Scene.scene_id)).filter(Scene.job_id == job_id).scalar() or 0
+        return NARRATIVE_SCENE_COST * max(1, int(scenes))
+
+    asset = db.query(VideoAsset).filter_by(job_id=job_id).first()
+    cfg = db.query(SnapshotConfig).filter_by(job_id=job_id).first()
+
+    duration = asset.duration_sec if asset and asset.duration_sec else UNKNOWN_DURATION_SEC
+    fps = float(cfg.sampling_fps) if cfg and cfg.sampling_fps else 1.0
+    cost = duration * fps
+    chunk = int(cfg.chunk_length_sec or 0) if cfg else 0
+    scenes = duration / chunk if chunk > 0 else 1
+
+    if cfg and cfg.lazy:
+        if kind == "pipeline":
+            return scenes * (SCENE_COST + LAZY_SEEK_COST * LAZY_KEYFRAMES_PER_SCENE)
+        return 0.0
+
+    if kind == "derive":
+        return cost * DERIVE_FRAME_COST
+
+    if kind == "pipeline":
+        cost += SCENE_COST * scenes
+
+    return cost
+
+
+def schedule_key(enqueued_at: datetime, cost: float, priority: str) -> float:
+    offset = PRIORITY_OFFSET_SEC.get(priority, PRIORITY_OFFSET_SEC[DEFAULT_PRIORITY])
+    return enqueued_at.timestamp() + cost / AGING_RATE + offset
+
+
+def job_scheduling(db: Session, job_id: str) -> tuple[str, str]:
+    """(priority, tenant) the job was submitted with."""
+    job = db.query(VideoJob).filter_by(job_id=job_id).first()
+    priority = (job.priority if job else None) or DEFAULT_PRIORITY
+    tenant = (job.tenant if job else None) or DEFAULT_TENANT
+    return priority, tenant
@@ -0,0 +1,153 @@
+"""
+Extract while uploading: the request body is teed into ffmpeg's stdin while it
+is written to disk, so snapshots appear during the upload.
+
+Only containers ffmpeg can decode front-to-back from a pipe qualify: Matroska,
+WebM, MPEG-TS, FLV, and MP4/MOV whose index (moov) or first fragment (moof)
+comes before the media data. Anything else is saved first and extracted from
+disk as before.
+"""
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.persistence.db import SessionLocal
+from app.persistence.tables import SnapshotConfig, VideoJob
+from app.pipeline.extract import iter_process_frames, persist_frames
+
+logger = logging.getLogger(__name__)
+
+STREAMABLE_EXTS = {"mkv", "webm", "ts", "m2ts", "mts", "flv"}
+MP4_EXTS = {"mp4", "m4v", "mov"}
+
+# give up on finding moov/moof/mdat in the leading boxes after this many bytes
+HEAD_PROBE_MAX = 4 * 1024 * 1024
+
+
+def stream_decodable(ext: str, head: bytes) -> Optional[bool]:
+    """
+    Whether a file with this extension and leading bytes can be decoded from a
+    pipe. None means "need more bytes" (only for MP4-family files).
+    """
+    ext = ext.lower()
+    if ext in STREAMABLE_EXTS:
+        return True
+    if ext not in MP4_EXTS:
+        return False
+
+    # walk top-level ISO BMFF boxes: size(4) type(4) [largesize(8)]
+    pos = 0
+    while pos + 8 <= len(head):
+        size = int.from_bytes(head[pos:pos + 4], "big")
+        box = head[pos + 4:pos + 8]
+        if box in (b"moov", b"moof"):
+            return True
+        if box == b"mdat":
+            return False
+        if size == 1:
+            if pos + 16 > len(head):
+                return None
+            size = int.from_bytes(head[pos + 8:pos + 16], "big")
+        if size < 8:
+            # 0 = box runs to end of file, anything else is malformed
+            return False
+        pos += size
+
+    return None if len(head) < HEAD_PROBE_MAX else False
+
+
+class StreamingExtraction:
+    """
+    ffmpeg reading frames from stdin plus a thread persisting them as they
+    appear. feed() the upload bytes, then finish(). If decoding fails, exactly
+    one side runs the disk fallback: the thread, when the upload had already
+    completed, otherwise the caller (finish() returns True).
+    """
+
+    def __init__(self, job_id: str, cfg: SnapshotConfig, snapshots_dir: Path, fallback: Callable[[str], None]):
+        self.job_id = job_id
+        self.sampling_fps = float(cfg.sampling_fps)
+        self.out_pattern = snapshots_dir / f"%06d.{cfg.image_format}"
+        self.fallback = fallback
+
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._done = False
+        self._upload_complete = False
+        self._feeding = True
+
+        snapshots_dir.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0", "-vf", f"fps={self.sampling_fps}", str(self.out_pattern),
+        ]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._thread = threading.Thread(target=self._run, name=f"stream-extract-{job_id}", daemon=True)
+        self._thread.start()
+
+    def feed(self, data: bytes) -> bool:
+        """Write upload bytes to ffmpeg. False once ffmpeg stopped reading (the upload carries on)."""
+        if not self._feeding:
+            return False
+        try:
+            self.proc.stdin.write(data)
+            return True
+        except (BrokenPipeError, ValueError, OSError):
+            self._feeding = False
+            return False
+
+    def finish(self) -> bool:
+        """Close ffmpeg's stdin after the last byte. True if the caller must run the disk fallback."""
+        self._close_stdin()
+        with self._lock:
+            self._upload_complete = True
+            return self._done and self.error is not None
+
+    def abort(self) -> None:
+        """The upload itself failed: stop ffmpeg, don't fall back."""
+        self._close_stdin()
+        if self.proc.poll() is None:
+            self.proc.kill()
+
+    def _close_stdin(self) -> None:
+        self._feeding = False
+        try:
+            self.proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def _run(self) -> None:
+        db = SessionLocal()
+        try:
+            cfg = db.query(SnapshotConfig).filter_by(job_id=self.job_id).one()
+            persist_frames(self.job_id, db, cfg, iter_process_frames(self.proc, self.out_pattern))
+        except Exception as e:
+            db.rollback()
+            self.error = e
+        finally:
+            db.close()
+
+        with self._lock:
+            self._done = True
+            fallback = self.error is not None and self._upload_complete
+
+        if self.error is None:
+            self._set_status("completed")
+        elif fallback:
+            logger.warning("streamed extraction of %s failed (%s), extracting from disk", self.job_id, self.error)
+            self.fallback(self.job_id)
+
+    def _set_status(self, status: str) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(VideoJob).filter_by(job_id=self.job_id).first()
+            # the upload may have been aborted and the job failed meanwhile
+            if job and job.status == "processing":
+                job.status = status
+                db.commit()
+        finally:
+            db.close()
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterator, List
 
 from openai import OpenAI
 
@@ -15,26 +18,42 @@ class NarrativeResult:
     structured: Dict[str, Any]
 
 
-def generate_narrative_from_scenes(scene_lines: List[str]) -> NarrativeResult:
+@dataclass(frozen=True)
+class HierarchyConfig:
     """
-    Build a coherent job-level narrative from scene descriptions (text-only).
-
-    Env required:
-      HF_TOKEN
-      HF_LLM_MODEL  e.g. "meta-llama/Llama-3.1-8B-Instruct:groq"
+    Map-reduce narrative settings.
+    window_size: scene lines per map call; fan_in: max partial summaries per
+    reduce call; max_concurrency: parallel LLM calls per level.
     """
+    window_size: int = 40
+    fan_in: int = 8
+    max_concurrency: int = 4
+
+
+def hierarchy_config() -> HierarchyConfig:
+    """HierarchyConfig from HF_LLM_WINDOW_SIZE / HF_LLM_FAN_IN / HF_LLM_MAX_CONCURRENCY."""
+    d = HierarchyConfig()
+    return HierarchyConfig(
+        window_size=max(2, int(os.environ.get("HF_LLM_WINDOW_SIZE") or d.window_size)),
+        fan_in=max(2, int(os.environ.get("HF_LLM_FAN_IN") or d.fan_in)),
+        max_concurrency=max(1, int(os.environ.get("HF_LLM_MAX_CONCURRENCY") or d.max_concurrency)),
+    )
+
+
+def _llm_env() -> tuple[str, str]:
     token = os.environ.get("HF_TOKEN")
     model = os.environ.get("HF_LLM_MODEL")
     if not token:
         raise RuntimeError("HF_TOKEN env var is missing")
     if not model:
         raise RuntimeError("HF_LLM_MODEL env var is missing")
+    return token, model
 
-    client = OpenAI(base_url="https://router.huggingface.co/v1", api_key=token)
 
+def _narrative_prompt(scene_lines: List[str]) -> str:
     scenes_text = "\n".join(f"- {line}" for line in scene_lines)
 
-    prompt = f"""
+    return f"""
 You are given ordered scene notes from a video. Write a coherent narrative and a summary.
 
 Rules:
@@ -60,13 +79,9 @@ Scene notes (ordered):
 {scenes_text}
 """.strip()
 
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=0.2,  # slightly >0 helps coherence, still controlled
-        messages=[{"role": "user", "content": prompt}],
-    )
 
-    raw = (resp.choices[0].message.content or "").strip()
+def parse_narrative_response(raw: str) -> NarrativeResult:
+    raw = (raw or "").strip()
 
     #attempting strict JSON parse; if model adds extra text, salvage the JSON block.
     data = None
@@ -100,4 +115,136 @@ Scene notes (ordered):
     summary = (summary or "").strip()
     structured = data.get("structured") or {}
 
-    return NarrativeResult(narrative=narrative, summary=summary, structured=structured)
\ No newline at end of file
+    return NarrativeResult(narrative=narrative, summary=summary, structured=structured)
+
+
+def generate_narrative_from_scenes(scene_lines: List[str]) -> NarrativeResult:
+    """
+    Build a coherent job-level narrative from scene descriptions (text-only).
+
+    Env required:
+      HF_TOKEN
+      HF_LLM_MODEL  e.g. "meta-llama/Llama-3.1-8B-Instruct:groq"
+    """
+    token, model = _llm_env()
+    client = OpenAI(base_url="https://router.huggingface.co/v1", api_key=token)
+
+    resp = client.chat.completions.create(
+        model=model,
+        temperature=0.2,  # slightly >0 helps coherence, still controlled
+        messages=[{"role": "user", "content": _narrative_prompt(scene_lines)}],
+    )
+
+    return parse_narrative_response(resp.choices[0].message.content or "")
+
+
+def stream_narrative_from_scenes(scene_lines: List[str]) -> Iterator[str]:
+    """
+    Streaming variant: yields raw text deltas of the JSON answer.
+    Feed the concatenated text to parse_narrative_response once it ends.
+    """
+    token, model = _llm_env()
+    client = OpenAI(base_url="https://router.huggingface.co/v1", api_key=token)
+
+    stream = client.chat.completions.create(
+        model=model,
+        temperature=0.2,
+        messages=[{"role": "user", "content": _narrative_prompt(scene_lines)}],
+        stream=True,
+    )
+
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+_SPAN_RE = re.compile(r"^\s*(\d+)-(\d+)s:")
+
+
+def _span_label(lines: List[str]) -> str:
+    """"<start>-<end>s" covering lines formatted like "12-20s: ..."."""
+    first = _SPAN_RE.match(lines[0]) if lines else None
+    last = _SPAN_RE.match(lines[-1]) if lines else None
+    if first and last:
+        return f"{first.group(1)}-{last.group(2)}s"
+    return "?-?s"
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def window_cache_key(lines: List[str]) -> str:
+    """Stable key for a window's summary: the model plus the exact lines."""
+    h = hashlib.sha256(os.environ.get("HF_LLM_MODEL", "").encode("utf-8"))
+    for line in lines:
+        h.update(b"\n")
+        h.update(line.encode("utf-8"))
+    return h.hexdigest()
+
+
+def summarize_window(lines: List[str]) -> str:
+    """Map step: condense consecutive scene notes (or partial summaries) into one paragraph."""
+    token, model = _llm_env()
+    client = OpenAI(base_url="https://router.huggingface.co/v1", api_key=token)
+
+    notes = "\n".join(f"- {line}" for line in lines)
+    prompt = f"""
+You are given consecutive notes from one part of a video, in order.
+Condense them into one short chronological paragraph (3-6 sentences).
+
+Rules:
+- Use ONLY the provided notes. Do not invent new events.
+- Keep time references in seconds for the key moments.
+- Return plain text only, no JSON, no headings.
+
+Notes (ordered):
+{notes}
+""".strip()
+
+    resp = client.chat.completions.create(
+        model=model,
+        temperature=0.2,
+        messages=[{"role": "user", "content": prompt}],
+    )
+
+    return (resp.choices[0].message.content or "").strip()
+
+
+def condense_scene_lines(
+    scene_lines: List[str],
+    config: HierarchyConfig | None = None,
+    summarize: Callable[[List[str]], str] = summarize_window,
+) -> List[str]:
+    """
+    Map/intermediate-reduce: summarize windows of scene lines concurrently,
+    then keep summarizing groups of fan_in partials until at most fan_in
+    remain. Returns "<start>-<end>s: summary" lines for the final reduce.
+    """
+    cfg = config or hierarchy_config()
+
+    level = list(scene_lines)
+    size = cfg.window_size
+    with ThreadPoolExecutor(max_workers=cfg.max_concurrency) as pool:
+        while len(level) > cfg.fan_in:
+            groups = _chunks(level, size)
+            summaries = list(pool.map(summarize, groups))
+            level = [f"{_span_label(g)}: {text}" for g, text in zip(groups, summaries)]
+            size = cfg.fan_in
+
+    return level
+
+
+def generate_narrative_hierarchical(
+    scene_lines: List[str],
+    config: HierarchyConfig | None = None,
+    summarize: Callable[[List[str]], str] = summarize_window,
+) -> NarrativeResult:
+    """
+    Map-reduce variant of generate_narrative_from_scenes for long videos:
+    the final JSON reduce only ever sees at most fan_in partial summaries.
+    """
+    return generate_narrative_from_scenes(condense_scene_lines(scene_lines, config, summarize))
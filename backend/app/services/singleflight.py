@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterator, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+    abandoned: bool = False
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key inside one process.
+    The first caller runs fn, later callers block and share its result (or exception).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.abandoned:
+                return self.do(key, fn)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result
+
+    @contextmanager
+    def lead(self, key: Hashable) -> Iterator[_Call | None]:
+        """
+        do() for work that can't be wrapped in one function, such as a
+        streaming response. The first caller gets a call to set .result (or
+        .error) on for do() callers of the same key; later callers block until
+        it is done and get None, and re-read the committed result themselves.
+        A leader that leaves without either, e.g. a closed stream, makes do()
+        callers run fn themselves.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            yield None
+            return
+
+        try:
+            yield call
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.abandoned = call.result is None and call.error is None
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+@contextmanager
+def advisory_lock(db: Session, key: str) -> Iterator[bool]:
+    """
+    Cross-worker coalescing via a Postgres advisory lock keyed by a string.
+
+    Yields True if the lock was free (caller should compute), False if another
+    worker held it and we waited for it to finish (its result is already
+    committed and can be re-read). No-op on non-Postgres databases.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        yield True
+        return
+
+    # dedicated connection: the session may return its own to the pool on commit
+    params = {"k": key}
+    with bind.engine.connect() as conn:
+        acquired = conn.execute(
+            text("SELECT pg_try_advisory_lock(hashtextextended(:k, 0))"), params
+        ).scalar()
+        if not acquired:
+            conn.execute(text("SELECT pg_advisory_lock(hashtextextended(:k, 0))"), params)
+        try:
+            yield bool(acquired)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(hashtextextended(:k, 0))"), params)
+            conn.commit()
@@ -0,0 +1,61 @@
+"""
+Storage for job files, selected by STORAGE_BACKEND:
+
+    local  files under STORAGE_ROOT (default backend/storage), served at /storage
+    s3     S3_BUCKET (+ S3_PREFIX) on S3_ENDPOINT_URL (MinIO etc.) or AWS; a local
+           cache lives under STORAGE_CACHE_DIR (default STORAGE_ROOT)
+
+The DB holds relative keys, so API processes and workers on different machines
+resolve the same rows against the same bucket.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from app.services.storage.base import Storage, versioned_url
+from app.services.storage.local import LocalStorage
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+STORAGE_ROOT = Path(os.getenv("STORAGE_ROOT") or Path(__file__).resolve().parents[3] / "storage")
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def _from_env() -> Storage:
+    if STORAGE_BACKEND == "s3":
+        from app.services.storage.s3 import S3Storage
+
+        return S3Storage(
+            os.environ["S3_BUCKET"],
+            Path(os.getenv("STORAGE_CACHE_DIR") or STORAGE_ROOT),
+            prefix=os.getenv("S3_PREFIX", ""),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+            region=os.getenv("S3_REGION"),
+            public_base_url=os.getenv("S3_PUBLIC_BASE_URL"),
+        )
+    if STORAGE_BACKEND != "local":
+        raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}")
+    return LocalStorage(STORAGE_ROOT)
+
+
+def get_storage() -> Storage:
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = _from_env()
+        return _storage
+
+
+def set_storage(storage: Optional[Storage]) -> None:
+    """Swap the process-wide storage (tests, scripts); None re-reads the environment."""
+    global _storage
+    with _storage_lock:
+        _storage = storage
+
+
+def job_key(job_id: str, *parts: str) -> str:
+    return "/".join(("jobs", job_id, *parts))
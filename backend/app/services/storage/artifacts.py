@@ -0,0 +1,239 @@
+"""
+A job's files grouped by how they can be recovered, for quota and retention
+(app/janitor.py). Paths relative to jobs/<job_id>/:
+
+    video/original.<ext>               the upload, the source of everything else   video
+    snapshots/<n>.<fmt>, frames.pack*  extracted and preprocessed frames           snapshots
+    snapshots/frames.pack.d/           packed keyframes written back out as files  frames
+    .../thumbs/<w>/                    pre-sized VLM tiles                         thumbs
+    master/frames.pack*                unprocessed frames for re-derivation        master
+
+Bytes per (job, kind) and the job's last access live in job_artifact. Evicted
+thumbs and frames are recreated on demand by the code that reads them, and
+deriving snapshots without a master cache decodes the video instead. Evicted
+snapshots are flagged (evicted_at) and regenerated from the video on the next
+touch() that asks for them (app/pipeline/regenerate.py).
+
+With an object store the local files are only a cache of the bucket: every
+kind can be dropped, nothing is flagged, and fetch() downloads it again.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.persistence.tables import JobArtifact
+from app.services.storage import Storage, job_key
+from app.services.storage import pack as framepack
+
+VIDEO = "video"
+SNAPSHOTS = "snapshots"
+FRAMES = "frames"
+THUMBS = "thumbs"
+MASTER = "master"
+OTHER = "other"
+
+THUMBS_DIRNAME = "thumbs"  # see app/services/vlm/hf_client.py
+
+# derived kinds, cheapest to do without first
+EVICTABLE = (THUMBS, FRAMES, MASTER, SNAPSHOTS)
+# must be regenerated before use, so their eviction is flagged
+RESTORED_ON_ACCESS = (SNAPSHOTS,)
+
+# at most one last_accessed_at write per job per process in this window;
+# the janitor never evicts anything accessed more recently than ARTIFACT_MIN_IDLE_SEC
+TOUCH_INTERVAL_SEC = float(os.getenv("ARTIFACT_TOUCH_INTERVAL_SEC", "60"))
+_TOUCHED_MAX = 4096
+
+_touched: Dict[str, float] = {}
+_touched_lock = threading.Lock()
+
+
+def classify(rel_path: str) -> str:
+    """Kind of a file, given its path relative to the job's directory."""
+    parts = rel_path.split("/")
+    if parts[0] == "video":
+        return VIDEO
+    if parts[0] == "master":
+        return MASTER
+    if parts[0] != "snapshots":
+        return OTHER
+    if THUMBS_DIRNAME in parts[1:-1]:
+        return THUMBS
+    if len(parts) > 2 and parts[1] == framepack.PACK_NAME + framepack.MATERIALIZED_SUFFIX:
+        return FRAMES
+    return SNAPSHOTS
+
+
+def _job_files(storage: Storage, job_id: str) -> Iterable[tuple[str, str, int]]:
+    """(kind, absolute path, size) of every local file of the job."""
+    root = storage.local_path(job_key(job_id))
+    for dirpath, _, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                size = os.stat(path).st_size
+            except FileNotFoundError:
+                continue
+            rel = name if rel_dir == "." else f"{rel_dir}/{name}"
+            yield classify(rel), path, size
+
+
+def scan(storage: Storage, job_id: str) -> Dict[str, int]:
+    """Local bytes per kind for one job."""
+    usage: Dict[str, int] = {}
+    for kind, _, size in _job_files(storage, job_id):
+        usage[kind] = usage.get(kind, 0) + size
+    return usage
+
+
+def record_usage(db: Session, job_id: str, usage: Dict[str, int], first_access: datetime) -> None:
+    """
+    Store scanned bytes. Kinds seen for the first time share the job's last
+    access, or start at first_access (job creation) for a job seen for the first time.
+    """
+    rows = {a.kind: a for a in db.scalars(select(JobArtifact).filter_by(job_id=job_id))}
+    last_access = max((a.last_accessed_at for a in rows.values()), default=first_access)
+    for kind in set(rows) | set(usage):
+        row = rows.get(kind)
+        if row is None:
+            row = JobArtifact(job_id=job_id, kind=kind, last_accessed_at=last_access)
+            db.add(row)
+        row.bytes = usage.get(kind, 0)
+
+
+def evict(db: Session, storage: Storage, job_id: str, kind: str, idle_before: datetime) -> int:
+    """
+    Delete the job's local files of this kind unless the job was accessed since
+    idle_before (checked in the same UPDATE that flags the eviction, so a
+    concurrent touch() either wins or sees the flag). Returns bytes freed.
+    """
+    values = {"bytes": 0}
+    if kind in RESTORED_ON_ACCESS and not storage.local_is_cache:
+        values["evicted_at"] = datetime.now(timezone.utc)
+    res = db.execute(
+        update(JobArtifact)
+        .where(
+            JobArtifact.job_id == job_id,
+            JobArtifact.kind == kind,
+            JobArtifact.evicted_at.is_(None),
+            JobArtifact.last_accessed_at < idle_before,
+        )
+        .values(**values)
+    )
+    db.commit()
+    if res.rowcount != 1:
+        return 0
+
+    freed = 0
+    for file_kind, path, size in list(_job_files(storage, job_id)):
+        if file_kind != kind:
+            continue
+        try:
+            os.unlink(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    _remove_empty_dirs(storage.local_path(job_key(job_id)))
+    return freed
+
+
+def _remove_empty_dirs(root) -> None:
+    for dirpath, _, _ in sorted(os.walk(root), key=lambda w: -len(w[0])):
+        if dirpath != str(root):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+
+def mark_restored(db: Session, job_id: str, kinds: Sequence[str] = (SNAPSHOTS,)) -> None:
+    """Clear the eviction flag once the files exist again (the caller commits)."""
+    db.execute(
+        update(JobArtifact)
+        .where(JobArtifact.job_id == job_id, JobArtifact.kind.in_(kinds))
+        .values(evicted_at=None, last_accessed_at=datetime.now(timezone.utc))
+    )
+
+
+def is_evicted(db: Session, job_id: str, kind: str = SNAPSHOTS) -> bool:
+    return db.scalar(
+        select(JobArtifact.evicted_at).filter_by(job_id=job_id, kind=kind)
+    ) is not None
+
+
+def _touch_due(job_id: str) -> bool:
+    now = time.monotonic()
+    with _touched_lock:
+        last = _touched.get(job_id)
+        return last is None or now - last >= TOUCH_INTERVAL_SEC
+
+
+def _touched_now(job_id: str) -> None:
+    now = time.monotonic()
+    with _touched_lock:
+        if len(_touched) >= _TOUCHED_MAX:
+            for k in [k for k, t in _touched.items() if now - t >= TOUCH_INTERVAL_SEC]:
+                del _touched[k]
+        _touched[job_id] = now
+
+
+def _touch_stmt(job_id: str):
+    return (
+        update(JobArtifact)
+        .where(JobArtifact.job_id == job_id)
+        .values(last_accessed_at=datetime.now(timezone.utc))
+    )
+
+
+def _evicted_stmt(job_id: str, kinds: Sequence[str]):
+    return select(JobArtifact.kind).where(
+        JobArtifact.job_id == job_id,
+        JobArtifact.kind.in_(kinds),
+        JobArtifact.evicted_at.is_not(None),
+    )
+
+
+def touch(db: Session, job_id: str, kinds: Sequence[str] = (SNAPSHOTS,)) -> List[str]:
+    """
+    Record an access to the job's files. Returns which of kinds are evicted and
+    must be regenerated before use; empty while the job was touched less than
+    TOUCH_INTERVAL_SEC ago by this process.
+    """
+    if not _touch_due(job_id):
+        return []
+    db.execute(_touch_stmt(job_id))
+    evicted = list(db.scalars(_evicted_stmt(job_id, kinds)))
+    db.commit()
+    if not evicted:
+        _touched_now(job_id)
+    return evicted
+
+
+async def touch_async(db: AsyncSession, job_id: str, kinds: Sequence[str] = (SNAPSHOTS,)) -> List[str]:
+    """touch() for async routes."""
+    if not _touch_due(job_id):
+        return []
+    await db.execute(_touch_stmt(job_id))
+    evicted = list(await db.scalars(_evicted_stmt(job_id, kinds)))
+    await db.commit()
+    if not evicted:
+        _touched_now(job_id)
+    return evicted
+
+
+def forget_touches(job_id: Optional[str] = None) -> None:
+    """Drop this process's touch throttle for one job, or for all."""
+    with _touched_lock:
+        if job_id is None:
+            _touched.clear()
+        else:
+            _touched.pop(job_id, None)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from app.services.storage import pack as framepack
+
+
+def versioned_url(url: str, version: Optional[str]) -> str:
+    """url with ?v=<version>; /storage serves versioned requests as immutable (app/api/static.py)."""
+    return f"{url}?v={version}" if version else url
+
+
+class Storage(ABC):
+    """
+    Job files (videos, snapshots) addressed by relative keys such as
+    `jobs/<job_id>/snapshots/000001.jpg`; the keys are what the DB stores.
+
+    ffmpeg, OpenCV and PIL need real files, so every backend has a local_root
+    mirroring the key layout: new files are written under local_path(key) and
+    published with put(); fetch() makes a key available locally.
+
+    A uri may also name one frame of a packed container (`<pack key>#<index>`,
+    see pack.py); fetch() then writes that frame out as a file and url() points
+    at the API's frame endpoint.
+    """
+
+    local_root: Path
+    # True when local files are only copies of remote objects (safe to drop, fetch() brings them back)
+    local_is_cache: bool = False
+
+    def local_path(self, key: str) -> Path:
+        return self.local_root / key
+
+    def key(self, uri: str) -> str:
+        """
+        Key for a DB uri or a path under local_root. Rows written before keys
+        were relative hold absolute paths; those under local_root map to their key.
+        """
+        if not os.path.isabs(uri):
+            return uri
+        prefix = str(self.local_root) + os.sep
+        # plain string slicing; Path.relative_to per row dominates large pages
+        if not uri.startswith(prefix):
+            raise ValueError(f"{uri} is outside the storage root")
+        rel = uri[len(prefix):]
+        return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+    def fetch(self, uri: str) -> Path:
+        """Local path with the file's contents (may not exist if the object doesn't)."""
+        packed = framepack.split_frame_uri(uri)
+        if packed is not None:
+            return self._materialize_frame(*packed)
+        if os.path.isabs(uri):
+            # legacy absolute paths outside the root are read where they are
+            try:
+                uri = self.key(uri)
+            except ValueError:
+                return Path(uri)
+        return self._fetch(uri)
+
+    def fetch_many(self, uris: Iterable[str]) -> List[Path]:
+        return [self.fetch(u) for u in uris]
+
+    def fetch_pack(self, pack_key: str) -> Path:
+        """Local path of a frame pack, with its index alongside."""
+        self._fetch(pack_key + framepack.INDEX_SUFFIX)
+        return self._fetch(pack_key)
+
+    def _materialize_frame(self, pack_key: str, index: int) -> Path:
+        # only keyframes go through here (VLM grids, fingerprints), so these stay few
+        out_dir = self.local_path(pack_key + framepack.MATERIALIZED_SUFFIX)
+        existing = next(out_dir.glob(f"{index:06d}.*"), None) if out_dir.exists() else None
+        if existing is not None:
+            return existing
+
+        data = bytes(framepack.open_pack(self.fetch_pack(pack_key)).frame(index))
+        path = out_dir / f"{index:06d}{framepack.image_type(data)[0]}"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return path
+
+    def frame_url(self, uri: str, version: str | None = None) -> str | None:
+        """API URL serving one packed frame, None for a plain key."""
+        packed = framepack.split_frame_uri(uri)
+        if packed is None:
+            return None
+        pack_key, index = packed
+        # pack keys look like jobs/<job_id>/snapshots/frames.pack
+        job_id = pack_key.split("/")[1]
+        return versioned_url(f"/jobs/{job_id}/frames/{index}", version)
+
+    @property
+    def url_epoch(self) -> str:
+        """Changes whenever previously issued URLs may stop working (cache validators include it)."""
+        return ""
+
+    @abstractmethod
+    def _fetch(self, key: str) -> Path: ...
+
+    @abstractmethod
+    def put(self, keys: Iterable[str]) -> None:
+        """Publish files already written at local_path(key)."""
+
+    @abstractmethod
+    def url(self, uri: str, version: str | None = None) -> str:
+        """URL a browser can fetch the object from; raises ValueError for uris outside the store."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def delete(self, keys: Iterable[str]) -> None:
+        """Remove these objects, locally too; missing ones are ignored."""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        """Remove every object under prefix (e.g. `jobs/<job_id>`), locally too."""
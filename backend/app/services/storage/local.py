@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import Iterable
+
+from app.services.storage.base import Storage, versioned_url
+
+
+class LocalStorage(Storage):
+    """Files on this machine's disk, served by the API's /storage mount."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.local_root = self.root
+
+    def _fetch(self, key: str) -> Path:
+        return self.local_path(key)
+
+    def put(self, keys: Iterable[str]) -> None:
+        # already in place
+        pass
+
+    def url(self, uri: str, version: str | None = None) -> str:
+        return self.frame_url(uri, version) or versioned_url(f"/storage/{self.key(uri)}", version)
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).exists()
+
+    def delete(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.local_path(key).unlink(missing_ok=True)
+
+    def delete_prefix(self, prefix: str) -> None:
+        shutil.rmtree(self.local_path(prefix), ignore_errors=True)
@@ -0,0 +1,175 @@
+"""
+Packed snapshot container: every encoded frame of a job appended to one blob,
+plus a fixed-width offset/length index, instead of thousands of loose files.
+
+    frames.pack       frame 0 bytes | frame 1 bytes | ...
+    frames.pack.idx   header (magic, pack id) | <offset u64, length u32> per frame
+
+Both files are append-only. Index records are written after their frame's
+bytes, so a reader never sees an entry whose data isn't there yet, and an
+extraction in progress can be read concurrently. Readers mmap both files;
+a frame is a slice of the pack mapping.
+
+Snapshot rows address a packed frame as `<pack key>#<frame index>`.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import shutil
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+PACK_NAME = "frames.pack"
+INDEX_SUFFIX = ".idx"
+MATERIALIZED_SUFFIX = ".d"  # keyframes extracted back into files for ffmpeg/PIL consumers
+
+MAGIC = b"V2SPACK1"
+HEADER = struct.Struct("<8s8s")  # magic, pack id
+RECORD = struct.Struct("<QI")  # offset, length
+
+READER_CACHE_SIZE = 32
+
+_IMAGE_TYPES = (
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"RIFF", ".webp", "image/webp"),
+)
+
+
+def index_path(pack_path: Path) -> Path:
+    return pack_path.with_name(pack_path.name + INDEX_SUFFIX)
+
+
+def frame_uri(pack_key: str, index: int) -> str:
+    return f"{pack_key}#{index}"
+
+
+def split_frame_uri(uri: str) -> Optional[Tuple[str, int]]:
+    """(pack key, frame index) for a packed-frame uri, None for a plain key."""
+    key, sep, frame = uri.partition("#")
+    if not sep:
+        return None
+    return key, int(frame)
+
+
+def image_type(data: bytes) -> Tuple[str, str]:
+    """(suffix, media type) sniffed from the encoded bytes."""
+    for magic, suffix, media_type in _IMAGE_TYPES:
+        if data[:len(magic)] == magic:
+            return suffix, media_type
+    return "", "application/octet-stream"
+
+
+def _create_replacing(path: Path):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    f = tmp.open("wb")
+    os.replace(tmp, path)
+    return f
+
+
+class FramePackWriter:
+    """Creates (or replaces) a pack and appends encoded frames to it."""
+
+    def __init__(self, pack_path: Path):
+        self.path = Path(pack_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # frames materialized from the previous pack are stale now
+        shutil.rmtree(self.path.with_name(self.path.name + MATERIALIZED_SUFFIX), ignore_errors=True)
+
+        self.pack_id = os.urandom(8)
+        # fresh inodes, so readers of the previous pack keep a consistent view
+        self._index = _create_replacing(index_path(self.path))
+        self._index.write(HEADER.pack(MAGIC, self.pack_id))
+        self._index.flush()
+        self._pack = _create_replacing(self.path)
+        self._offset = 0
+        self.count = 0
+
+    def append(self, data: bytes) -> int:
+        """Append one encoded frame; returns its index."""
+        self._pack.write(data)
+        # data must be visible before the record pointing at it
+        self._pack.flush()
+        self._index.write(RECORD.pack(self._offset, len(data)))
+        self._offset += len(data)
+        self.count += 1
+        return self.count - 1
+
+    def flush(self) -> None:
+        self._pack.flush()
+        self._index.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._pack.close()
+        self._index.close()
+
+    def __enter__(self) -> "FramePackWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class FramePackReader:
+    """mmap view of a pack and its index as they were when opened."""
+
+    def __init__(self, pack_path: Path):
+        self.path = Path(pack_path)
+        with index_path(self.path).open("rb") as f:
+            index = f.read()
+        magic, self.pack_id = HEADER.unpack_from(index)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a frame pack")
+        self._index = memoryview(index)[HEADER.size:]
+        self.count = len(self._index) // RECORD.size
+
+        self._file = self.path.open("rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def entry(self, i: int) -> Tuple[int, int]:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return RECORD.unpack_from(self._index, i * RECORD.size)
+
+    def frame(self, i: int) -> memoryview:
+        offset, length = self.entry(i)
+        if self._map is None or offset + length > len(self._map):
+            # index and pack from different generations (opened mid-rewrite)
+            raise IndexError(i)
+        return memoryview(self._map)[offset:offset + length]
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+_readers: OrderedDict[Path, Tuple[Tuple[int, ...], FramePackReader]] = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def open_pack(pack_path: Path) -> FramePackReader:
+    """
+    Shared reader for pack_path, reopened when the index grew (extraction still
+    appending) or the pack was rewritten. Raises FileNotFoundError if absent.
+    """
+    st = index_path(pack_path).stat()
+    version = (st.st_ino, st.st_size, st.st_mtime_ns)
+    with _readers_lock:
+        cached = _readers.get(pack_path)
+        if cached and cached[0] == version:
+            _readers.move_to_end(pack_path)
+            return cached[1]
+
+        # superseded mappings are left to the GC; frames handed out may still point into them
+        reader = FramePackReader(pack_path)
+        _readers[pack_path] = (version, reader)
+        while len(_readers) > READER_CACHE_SIZE:
+            _readers.popitem(last=False)
+        return reader
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from app.services.storage.base import Storage, versioned_url
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - only needed with STORAGE_BACKEND=s3
+    boto3 = None
+
+# files transferred at once by put()/fetch_many(); each large file is also split
+# into MULTIPART_CHUNK_BYTES parts uploaded in parallel
+TRANSFER_CONCURRENCY = int(os.getenv("S3_TRANSFER_CONCURRENCY", "8"))
+MULTIPART_CHUNK_BYTES = int(os.getenv("S3_MULTIPART_CHUNK_BYTES", str(8 * 1024 * 1024)))
+PRESIGN_TTL_SEC = int(os.getenv("S3_PRESIGN_TTL_SEC", "3600"))
+# a cached file is checked against the bucket (HEAD) at most this often
+CACHE_REVALIDATE_SEC = float(os.getenv("S3_CACHE_REVALIDATE_SEC", "30"))
+CACHE_CHECKED_MAX = 100_000
+
+DELETE_BATCH = 1000  # DeleteObjects limit
+
+
+class S3Storage(Storage):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, Ceph, ...), with a local
+    cache under cache_dir that mirrors the keys. Browsers get presigned GET
+    URLs, or plain URLs under public_base_url (a CDN or public bucket).
+
+    Another process may rewrite an object under the same key (re-extraction),
+    so a cached copy older than the object's LastModified is downloaded again.
+    """
+
+    local_is_cache = True
+
+    def __init__(
+        self,
+        bucket: str,
+        cache_dir: Path,
+        *,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        public_base_url: str | None = None,
+        client=None,
+    ):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("STORAGE_BACKEND=s3 needs boto3 installed")
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.local_root = Path(cache_dir)
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self.transfer = TransferConfig(
+            multipart_threshold=MULTIPART_CHUNK_BYTES,
+            multipart_chunksize=MULTIPART_CHUNK_BYTES,
+            max_concurrency=TRANSFER_CONCURRENCY,
+        )
+        # key -> monotonic time its cached copy was last known current
+        self._checked: Dict[str, float] = {}
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _mark_current(self, key: str) -> None:
+        if len(self._checked) >= CACHE_CHECKED_MAX:
+            self._checked.clear()
+        self._checked[key] = time.monotonic()
+
+    def _cache_current(self, key: str, path: Path) -> bool:
+        checked = self._checked.get(key)
+        if checked is not None and time.monotonic() - checked < CACHE_REVALIDATE_SEC:
+            return True
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                # deleted from the bucket: the copy must not outlive it
+                path.unlink(missing_ok=True)
+                return False
+            raise
+        # uploads stamp their copy with the object's LastModified and downloads
+        # happen after it, so a newer object is a rewrite by another process
+        if head["LastModified"].timestamp() > path.stat().st_mtime:
+            return False
+        self._mark_current(key)
+        return True
+
+    def _fetch(self, key: str) -> Path:
+        path = self.local_path(key)
+        if path.exists() and self._cache_current(key, path):
+            return path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        try:
+            self.client.download_file(self.bucket, self._object_key(key), str(tmp), Config=self.transfer)
+        except ClientError as e:
+            tmp.unlink(missing_ok=True)
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return path
+            raise
+        # concurrent fetches of the same key race harmlessly
+        os.replace(tmp, path)
+        self._mark_current(key)
+        return path
+
+    def fetch_many(self, uris: Iterable[str]) -> List[Path]:
+        uris = list(uris)
+        if len(uris) <= 1:
+            return [self.fetch(u) for u in uris]
+        with ThreadPoolExecutor(max_workers=min(TRANSFER_CONCURRENCY, len(uris))) as pool:
+            return list(pool.map(self.fetch, uris))
+
+    def _upload(self, key: str) -> None:
+        path = self.local_path(key)
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self.client.upload_file(
+            str(path),
+            self.bucket,
+            self._object_key(key),
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer,
+        )
+        # the local copy now predates its own object: stamp it with the object's
+        # LastModified so revalidation doesn't mistake our upload for a rewrite
+        head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        modified = head["LastModified"].timestamp()
+        os.utime(path, (modified, modified))
+        self._mark_current(key)
+
+    def put(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if len(keys) == 1:
+            self._upload(keys[0])
+        elif keys:
+            with ThreadPoolExecutor(max_workers=min(TRANSFER_CONCURRENCY, len(keys))) as pool:
+                # list() re-raises the first failed upload
+                list(pool.map(self._upload, keys))
+
+    def url(self, uri: str, version: str | None = None) -> str:
+        packed = self.frame_url(uri, version)
+        if packed is not None:
+            return packed
+        key = self._object_key(self.key(uri))
+        if self.public_base_url:
+            return versioned_url(f"{self.public_base_url}/{key}", version)
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=PRESIGN_TTL_SEC,
+        )
+
+    @property
+    def url_epoch(self) -> str:
+        if self.public_base_url:
+            return ""
+        # presigned URLs handed out in the previous half-TTL are still valid
+        return str(int(time.time() // max(1, PRESIGN_TTL_SEC // 2)))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        for start in range(0, len(keys), DELETE_BATCH):
+            batch = [{"Key": self._object_key(k)} for k in keys[start:start + DELETE_BATCH]]
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch, "Quiet": True})
+        for key in keys:
+            self.local_path(key).unlink(missing_ok=True)
+
+    def delete_prefix(self, prefix: str) -> None:
+        paginator = self.client.get_paginator("list_objects_v2")
+        batch: List[dict] = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix.rstrip("/")) + "/"):
+            for obj in page.get("Contents", []):
+                batch.append({"Key": obj["Key"]})
+                if len(batch) == DELETE_BATCH:
+                    self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch, "Quiet": True})
+                    batch = []
+        if batch:
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch, "Quiet": True})
+        shutil.rmtree(self.local_path(prefix), ignore_errors=True)
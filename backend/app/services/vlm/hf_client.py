@@ -1,16 +1,30 @@
 from __future__ import annotations
 
 import base64
+import json
+import logging
 import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List
 
 from openai import OpenAI
 from PIL import Image
 from dotenv import load_dotenv
 
+from app.services.vlm.payload import (
+    GridPlan,
+    PayloadBudget,
+    budget_for_model,
+    estimate_image_tokens,
+    plan_grid,
+    plan_steps,
+)
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -18,6 +32,49 @@ load_dotenv()
 class VLMResult:
     text: str
     confidence: float | None = None
+    # set instead of text when describe_scenes_hf could not describe this scene
+    error: str | None = None
+
+
+THUMBS_DIRNAME = "thumbs"
+GRID_CACHE_SIZE = 64
+
+# (paths+mtimes, cols, tile_w, quality) -> data URL of the finished grid, and
+# (paths+mtimes, base plan, max_bytes) -> (data URL, plan) of a budgeted one
+_grid_cache: OrderedDict[tuple, object] = OrderedDict()
+_grid_cache_lock = threading.Lock()
+
+
+def _thumbnail_path(p: Path, tile_w: int) -> Path:
+    """
+    Pre-sized thumbnail next to the snapshot:
+    <snapshots_dir>/thumbs/<tile_w>/<stem>.jpg
+    """
+    return p.parent / THUMBS_DIRNAME / str(tile_w) / f"{p.stem}.jpg"
+
+
+def _load_tile(p: Path, tile_w: int) -> Image.Image:
+    thumb = _thumbnail_path(p, tile_w)
+    if thumb.exists() and thumb.stat().st_mtime_ns >= p.stat().st_mtime_ns:
+        return Image.open(thumb).convert("RGB")
+
+    im = Image.open(p)
+    w, h = im.size
+    new_h = max(1, int(tile_w * (h / max(1, w))))
+
+    # JPEG: let libjpeg downscale by 1/2, 1/4 or 1/8 while decoding
+    im.draft("RGB", (tile_w, new_h))
+    im = im.convert("RGB")
+    if im.size != (tile_w, new_h):
+        im = im.resize((tile_w, new_h), Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    try:
+        thumb.parent.mkdir(parents=True, exist_ok=True)
+        im.save(thumb, format="JPEG", quality=90)
+    except OSError:
+        pass  # thumbnails are only an optimization
+
+    return im
 
 
 def build_grid_image(
@@ -25,13 +82,7 @@ def build_grid_image(
     cols: int = 4,
     tile_w: int = 384,
 ) -> Image.Image:
-    imgs: List[Image.Image] = []
-    for p in image_paths:
-        im = Image.open(p).convert("RGB")
-        w, h = im.size
-        new_h = max(1, int(tile_w * (h / max(1, w))))
-        im = im.resize((tile_w, new_h))
-        imgs.append(im)
+    imgs: List[Image.Image] = [_load_tile(Path(p), tile_w) for p in image_paths]
 
     if not imgs:
         raise ValueError("No keyframes found to build grid.")
@@ -58,45 +109,269 @@ def image_to_data_url_jpeg(im: Image.Image, quality: int = 90) -> str:
     return f"data:image/jpeg;base64,{b64}"
 
 
-async def describe_scene_hf(keyframe_paths: List[Path]) -> VLMResult:
+def _files_key(paths: List[Path]) -> tuple:
+    # mtimes are part of the key, so re-extracted snapshots invalidate it
+    return tuple((str(p), p.stat().st_mtime_ns) for p in paths)
+
+
+def _cached_grid(key: tuple):
+    with _grid_cache_lock:
+        value = _grid_cache.get(key)
+        if value is not None:
+            _grid_cache.move_to_end(key)
+        return value
+
+
+def _cache_grid(key: tuple, value) -> None:
+    with _grid_cache_lock:
+        _grid_cache[key] = value
+        while len(_grid_cache) > GRID_CACHE_SIZE:
+            _grid_cache.popitem(last=False)
+
+
+def build_grid_data_url(
+    image_paths: List[Path],
+    cols: int = 4,
+    tile_w: int = 384,
+    quality: int = 90,
+) -> str:
+    """
+    Grid + JPEG/base64 encoding, cached per keyframe set.
+    File mtimes are part of the key, so re-extracted snapshots invalidate it.
+    """
+    paths = [Path(p) for p in image_paths]
+    key = (_files_key(paths), cols, tile_w, quality)
+
+    url = _cached_grid(key)
+    if url is None:
+        url = image_to_data_url_jpeg(build_grid_image(paths, cols=cols, tile_w=tile_w), quality=quality)
+        _cache_grid(key, url)
+    return url
+
+
+def build_budgeted_grid_data_url(
+    image_paths: List[Path],
+    budget: PayloadBudget,
+) -> tuple[str, GridPlan]:
+    """
+    Grid data URL sized to the model budget: layout and tile width from the
+    image-token budget, then JPEG quality / tile width stepped down until the
+    payload fits max_bytes (the smallest attempt is used if none does).
+    Only the chosen grid is cached, so over-budget attempts evict nothing.
+    """
+    paths = [Path(p) for p in image_paths]
+    if not paths:
+        raise ValueError("No keyframes found to build grid.")
+
+    with Image.open(paths[0]) as first:
+        w, h = first.size
+    base = plan_grid(len(paths), h / max(1, w), budget)
+
+    key = (_files_key(paths), base, budget.max_bytes)
+    cached = _cached_grid(key)
+    if cached is not None:
+        return cached
+
+    url, plan = "", base
+    for plan in plan_steps(base):
+        grid = build_grid_image(paths, cols=plan.cols, tile_w=plan.tile_w)
+        url = image_to_data_url_jpeg(grid, quality=plan.quality)
+        if len(url) <= budget.max_bytes:
+            break
+
+    _cache_grid(key, (url, plan))
+    return url, plan
+
+
+def _vlm_env() -> tuple[str, str]:
     token = os.environ.get("HF_TOKEN")
     model = os.environ.get("HF_VLM_MODEL")
     if not token:
         raise RuntimeError("HF_TOKEN env var is missing")
     if not model:
         raise RuntimeError("HF_VLM_MODEL env var is missing")
+    return token, model
+
+
+def _scene_grid_url(keyframe_paths: List[Path], model: str) -> str:
+    # grid from up to 8 keyframes, sized to the model's image budget
+    budget = budget_for_model(model)
+    img_url, plan = build_budgeted_grid_data_url(keyframe_paths[:8], budget)
+    logger.info(
+        "vlm payload: model=%s bytes=%d est_tokens=%d grid=%dx%d tile_w=%d quality=%d",
+        model,
+        len(img_url),
+        estimate_image_tokens(*plan.grid_size(), budget.patch_px),
+        plan.cols,
+        plan.rows,
+        plan.tile_w,
+        plan.quality,
+    )
+    return img_url
 
-    # build 2x4 grid from up to 8 keyframes
-    grid = build_grid_image(keyframe_paths[:8], cols=4, tile_w=384)
-    img_url = image_to_data_url_jpeg(grid)
+
+SCENE_PROMPT = (
+"""Describe only what is visually observable across these ordered keyframes. "
+"Do not invent events or objects. "
+"Write 3-4 sentences describing actions and changes over time."""
+)
+
+
+def _scene_messages(img_url: str) -> list:
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": SCENE_PROMPT},
+                {"type": "image_url", "image_url": {"url": img_url}},
+            ],
+        }
+    ]
+
+
+async def describe_scene_hf(keyframe_paths: List[Path]) -> VLMResult:
+    token, model = _vlm_env()
+    img_url = _scene_grid_url(keyframe_paths, model)
 
     client = OpenAI(
         base_url="https://router.huggingface.co/v1",
         api_key=token,
     )
 
-    prompt = (
-    """Describe only what is visually observable across these ordered keyframes. "
-    "Do not invent events or objects. "
-    "Write 3-4 sentences describing actions and changes over time."""
-    )
-
     resp = client.chat.completions.create(
         model=model,
         temperature=0.0,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": img_url}},
-                ],
-            }
-        ],
+        messages=_scene_messages(img_url),
     )
 
     text = (resp.choices[0].message.content or "").strip()
     if not text:
         text = "(no description)"
 
-    return VLMResult(text=text, confidence=None)
\ No newline at end of file
+    return VLMResult(text=text, confidence=None)
+
+
+def stream_describe_scene_hf(keyframe_paths: List[Path]) -> Iterator[str]:
+    """Same request as describe_scene_hf with stream=True; yields text deltas."""
+    token, model = _vlm_env()
+    img_url = _scene_grid_url(keyframe_paths, model)
+
+    client = OpenAI(base_url="https://router.huggingface.co/v1", api_key=token)
+    stream = client.chat.completions.create(
+        model=model,
+        temperature=0.0,
+        messages=_scene_messages(img_url),
+        stream=True,
+    )
+
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+def default_batch_size() -> int:
+    """HF_VLM_BATCH_SIZE, 1 (= one request per scene) when unset."""
+    return max(1, int(os.environ.get("HF_VLM_BATCH_SIZE") or 1))
+
+
+def _parse_batch_response(raw: str, n: int) -> List[VLMResult]:
+    """
+    Expects {"scenes": [{"scene": 1, "description": "..."}, ...]}.
+    Raises ValueError unless every scene 1..n got a non-empty description.
+    """
+    start = raw.find("{")
+    end = raw.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError(f"VLM did not return JSON. Got: {raw[:400]}")
+
+    data = json.loads(raw[start : end + 1])
+    by_index = {}
+    for item in data.get("scenes") or []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            ix = int(item.get("scene"))
+        except (TypeError, ValueError):
+            continue
+        text = str(item.get("description") or "").strip()
+        if text:
+            by_index[ix] = text
+
+    missing = [i for i in range(1, n + 1) if i not in by_index]
+    if missing:
+        raise ValueError(f"VLM batch response is missing scenes {missing}")
+
+    return [VLMResult(text=by_index[i], confidence=None) for i in range(1, n + 1)]
+
+
+async def _describe_batch_hf(batch: List[List[Path]], token: str, model: str) -> List[VLMResult]:
+    content: list = [
+        {
+            "type": "text",
+            "text": (
+                f"You are given {len(batch)} video scenes. Each scene is one image: "
+                "a grid of its ordered keyframes (left to right, top to bottom). "
+                "For every scene, describe only what is visually observable. "
+                "Do not invent events or objects, and do not mix up scenes. "
+                "Write 3-4 sentences per scene describing actions and changes over time.\n\n"
+                "Return STRICT JSON only:\n"
+                '{"scenes": [{"scene": 1, "description": "..."}, ...]}'
+            ),
+        }
+    ]
+    for i, paths in enumerate(batch, start=1):
+        content.append({"type": "text", "text": f"Scene {i}:"})
+        content.append({"type": "image_url", "image_url": {"url": _scene_grid_url(paths, model)}})
+
+    client = OpenAI(base_url="https://router.huggingface.co/v1", api_key=token)
+    resp = client.chat.completions.create(
+        model=model,
+        temperature=0.0,
+        messages=[{"role": "user", "content": content}],
+    )
+
+    return _parse_batch_response(resp.choices[0].message.content or "", len(batch))
+
+
+async def _describe_scene_or_error(paths: List[Path]) -> VLMResult:
+    try:
+        return await describe_scene_hf(paths)
+    except Exception as e:
+        logger.warning("vlm describe of one scene failed", exc_info=True)
+        return VLMResult(text="", error=str(e))
+
+
+async def describe_scenes_hf(
+    scenes_keyframes: List[List[Path]],
+    batch_size: int | None = None,
+    on_batch: Callable[[int, List[VLMResult]], None] | None = None,
+) -> List[VLMResult]:
+    """
+    Describe several scenes, packing up to batch_size scene grids into one
+    multi-image request. Results are in input order. A batch that errors or
+    returns unusable JSON falls back to one describe_scene_hf call per scene;
+    a scene that fails on its own gets a result with error set instead of
+    failing the others. on_batch(start, results) runs after each batch, so
+    callers can persist what is done so far.
+    """
+    batch_size = max(1, batch_size or default_batch_size())
+    token, model = _vlm_env() if batch_size > 1 else (None, None)
+    results: List[VLMResult] = []
+    for i in range(0, len(scenes_keyframes), batch_size):
+        batch = scenes_keyframes[i : i + batch_size]
+        if batch_size <= 1:
+            done = [await _describe_scene_or_error(paths) for paths in batch]
+        else:
+            try:
+                done = await _describe_batch_hf(batch, token, model)
+            except Exception:
+                logger.warning("vlm batch of %d scenes failed, falling back to single requests", len(batch), exc_info=True)
+                done = [await _describe_scene_or_error(paths) for paths in batch]
+        results.extend(done)
+        if on_batch is not None:
+            on_batch(i, done)
+
+    return results
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, replace
+
+MIN_TILE_W = 128
+MAX_TILE_W = 384
+QUALITY_STEPS = (90, 80, 70, 60, 50)
+
+
+@dataclass(frozen=True)
+class PayloadBudget:
+    """
+    Per-model limits for the image we send.
+    Tokens are estimated ViT-style: one token per patch_px x patch_px patch.
+    """
+    max_image_tokens: int = 1600
+    max_bytes: int = 400_000
+    patch_px: int = 28
+
+
+@dataclass(frozen=True)
+class GridPlan:
+    cols: int
+    rows: int
+    tile_w: int
+    quality: int
+    aspect: float  # frame height / width
+
+    def grid_size(self) -> tuple[int, int]:
+        return self.cols * self.tile_w, self.rows * max(1, int(self.tile_w * self.aspect))
+
+
+def budget_for_model(model: str | None) -> PayloadBudget:
+    """
+    Budget from env. A model-specific override wins over the global one, e.g.
+    HF_VLM_MAX_IMAGE_TOKENS__QWEN_QWEN2_5_VL_7B_INSTRUCT=1200
+    """
+    suffix = "__" + "".join(c if c.isalnum() else "_" for c in (model or "")).upper()
+
+    def _env_int(name: str, default: int) -> int:
+        raw = os.environ.get(name + suffix) or os.environ.get(name)
+        return int(raw) if raw else default
+
+    d = PayloadBudget()
+    return PayloadBudget(
+        max_image_tokens=_env_int("HF_VLM_MAX_IMAGE_TOKENS", d.max_image_tokens),
+        max_bytes=_env_int("HF_VLM_MAX_IMAGE_BYTES", d.max_bytes),
+        patch_px=_env_int("HF_VLM_PATCH_PX", d.patch_px),
+    )
+
+
+def estimate_image_tokens(width: int, height: int, patch_px: int) -> int:
+    return math.ceil(width / patch_px) * math.ceil(height / patch_px)
+
+
+def _grid_size(n: int, cols: int, tile_w: int, aspect: float) -> tuple[int, int]:
+    rows = (n + cols - 1) // cols
+    return cols * tile_w, rows * max(1, int(tile_w * aspect))
+
+
+def _pick_cols(n: int, aspect: float) -> int:
+    # the layout closest to a square grid wastes the fewest tokens on padding
+    best, best_score = 1, float("inf")
+    for cols in range(1, n + 1):
+        w, h = _grid_size(n, cols, 100, aspect)
+        empty = ((n + cols - 1) // cols) * cols - n
+        score = abs(math.log(w / h)) + 0.25 * empty
+        if score < best_score:
+            best, best_score = cols, score
+    return best
+
+
+def plan_grid(n: int, aspect: float, budget: PayloadBudget) -> GridPlan:
+    """
+    Choose layout and the largest tile width (multiple of 16, within
+    [MIN_TILE_W, MAX_TILE_W]) whose estimated image tokens fit the budget.
+    aspect is frame height / width. Quality starts at the top step; byte
+    fitting happens at encode time, see plan_steps().
+    """
+    n = max(1, n)
+    aspect = aspect if aspect > 0 else 9 / 16
+    cols = _pick_cols(n, aspect)
+    rows = (n + cols - 1) // cols
+
+    # tokens ~ cols * rows * tile_w^2 * aspect / patch^2
+    tile_w = budget.patch_px * math.sqrt(budget.max_image_tokens / (cols * rows * aspect))
+    tile_w = int(min(MAX_TILE_W, max(MIN_TILE_W, tile_w))) // 16 * 16
+
+    while tile_w > MIN_TILE_W:
+        w, h = _grid_size(n, cols, tile_w, aspect)
+        if estimate_image_tokens(w, h, budget.patch_px) <= budget.max_image_tokens:
+            break
+        tile_w -= 16
+
+    return GridPlan(cols=cols, rows=rows, tile_w=tile_w, quality=QUALITY_STEPS[0], aspect=aspect)
+
+
+def plan_steps(plan: GridPlan):
+    """
+    Fallback sequence for the byte budget: lower JPEG quality first,
+    then shrink tiles by ~15% and walk the qualities again.
+    """
+    tile_w = plan.tile_w
+    while True:
+        for q in QUALITY_STEPS:
+            yield replace(plan, tile_w=tile_w, quality=q)
+        if tile_w <= MIN_TILE_W:
+            return
+        tile_w = max(MIN_TILE_W, int(tile_w * 0.85) // 16 * 16)
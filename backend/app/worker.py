@@ -0,0 +1,197 @@
+"""
+Standalone pipeline worker: claims rows from the `task` table and runs them,
+so API processes and workers scale independently (API needs TASK_QUEUE=db).
+
+    cd backend && PYTHONPATH=. python -m app.worker --kinds extract,derive,narrative,pipeline --concurrency 2
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from app.api.routes.jobs import _run_derive_job, _run_extract_job, _run_pipeline_job
+from app.api.routes.narrative import _run_narrative_job
+from app.persistence.db import SessionLocal
+from app.persistence.tables import Narrative, Task, VideoJob
+from app.pipeline.queue import DEFAULT_LEASE_SEC, claim, complete, fail, heartbeat
+
+logger = logging.getLogger("app.worker")
+
+
+def _handle_extract(task: Task) -> None:
+    _run_extract_job(task.job_id)
+
+    # _run_extract_job records failures on the job instead of raising
+    db = SessionLocal()
+    try:
+        job = db.query(VideoJob).filter_by(job_id=task.job_id).first()
+        if job and job.status == "failed":
+            raise RuntimeError(job.error or "extraction failed")
+    finally:
+        db.close()
+
+
+def _handle_derive(task: Task) -> None:
+    _run_derive_job(task.job_id)
+
+    db = SessionLocal()
+    try:
+        job = db.query(VideoJob).filter_by(job_id=task.job_id).first()
+        if job and job.status == "failed":
+            raise RuntimeError(job.error or "snapshot derivation failed")
+    finally:
+        db.close()
+
+
+def _handle_narrative(task: Task) -> None:
+    _run_narrative_job(task.job_id, **(task.payload or {}))
+
+    db = SessionLocal()
+    try:
+        n = db.query(Narrative).filter_by(job_id=task.job_id).first()
+        if n and n.status == "failed":
+            raise RuntimeError(n.error or "narrative generation failed")
+    finally:
+        db.close()
+
+
+def _handle_pipeline(task: Task) -> None:
+    _run_pipeline_job(task.job_id)
+
+    db = SessionLocal()
+    try:
+        job = db.query(VideoJob).filter_by(job_id=task.job_id).first()
+        if job and job.status == "failed":
+            raise RuntimeError(job.error or "pipeline failed")
+    finally:
+        db.close()
+
+
+HANDLERS: Dict[str, Callable[[Task], None]] = {
+    "extract": _handle_extract,
+    "derive": _handle_derive,
+    "narrative": _handle_narrative,
+    "pipeline": _handle_pipeline,
+}
+
+
+def _keep_leased(task_id: str, worker_id: str, lease_sec: int, done: threading.Event, lost: threading.Event) -> None:
+    db = SessionLocal()
+    try:
+        while not done.wait(lease_sec / 3):
+            if not heartbeat(db, task_id, worker_id, lease_sec):
+                logger.warning("lost lease on task %s", task_id)
+                lost.set()
+                return
+    finally:
+        db.close()
+
+
+def run_once(worker_id: str, kinds: Optional[List[str]] = None, lease_sec: int = DEFAULT_LEASE_SEC) -> bool:
+    """
+    Claim and run one task. Returns False when nothing was runnable.
+    Once the lease is lost another worker owns the task, so the handler's
+    outcome is never recorded. Its thread can't be stopped, so it is still
+    waited for: it holds this worker's slot until it exits.
+    """
+    db = SessionLocal()
+    try:
+        task = claim(db, worker_id, kinds or list(HANDLERS), lease_sec)
+        if not task:
+            return False
+
+        logger.info("task %s: %s job=%s attempt=%d", task.task_id, task.kind, task.job_id, task.attempts)
+        done = threading.Event()
+        lost = threading.Event()
+        errors: List[Exception] = []
+
+        def _run() -> None:
+            try:
+                HANDLERS[task.kind](task)
+            except Exception as e:
+                logger.exception("task %s failed", task.task_id)
+                errors.append(e)
+            finally:
+                done.set()
+
+        beat = threading.Thread(
+            target=_keep_leased,
+            args=(task.task_id, worker_id, lease_sec, done, lost),
+            daemon=True,
+        )
+        beat.start()
+        handler = threading.Thread(target=_run, name=f"task-{task.task_id}", daemon=True)
+        handler.start()
+
+        while not done.wait(1.0):
+            if lost.is_set():
+                logger.warning("task %s: another worker reclaimed it, waiting for the abandoned handler", task.task_id)
+                handler.join()
+                break
+
+        beat.join()
+        if lost.is_set():
+            return True
+        settled = fail(db, task, str(errors[0])) if errors else complete(db, task)
+        if not settled:
+            logger.warning("task %s: lease lost before it finished, outcome dropped", task.task_id)
+        return True
+    finally:
+        db.close()
+
+
+def _loop(worker_id: str, kinds: List[str], lease_sec: int, poll_sec: float, stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            busy = run_once(worker_id, kinds, lease_sec)
+        except Exception:
+            logger.exception("worker %s: claim loop error", worker_id)
+            busy = False
+        if not busy:
+            stop.wait(poll_sec)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="video2story pipeline worker")
+    parser.add_argument("--kinds", default=",".join(HANDLERS), help="comma-separated task kinds")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "1")))
+    parser.add_argument("--lease-sec", type=int, default=DEFAULT_LEASE_SEC)
+    parser.add_argument("--poll-sec", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    kinds = [k for k in args.kinds.split(",") if k]
+    unknown = [k for k in kinds if k not in HANDLERS]
+    if unknown:
+        parser.error(f"unknown task kinds: {', '.join(unknown)}")
+
+    # finish the current task on SIGTERM/SIGINT, then exit
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    base_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    threads = [
+        threading.Thread(
+            target=_loop,
+            args=(f"{base_id}/{i}", kinds, args.lease_sec, args.poll_sec, stop),
+            name=f"worker-{i}",
+        )
+        for i in range(max(1, args.concurrency))
+    ]
+    for t in threads:
+        t.start()
+    logger.info("worker %s started: kinds=%s concurrency=%d", base_id, kinds, len(threads))
+    for t in threads:
+        t.join()
+
+
+if __name__ == "__main__":
+    main()
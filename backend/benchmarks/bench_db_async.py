@@ -0,0 +1,88 @@
+"""
+Load test: GET /jobs served by the sync session (threadpool) vs the async
+session (asyncpg), at increasing client concurrency.
+
+Both variants run the same keyset page query against DATABASE_URL, inside
+one ASGI app driven in-process by httpx, so the difference is the DB access
+path: a threadpool slot held per request vs awaiting on the event loop.
+Seed some jobs first (or point DATABASE_URL at a populated database).
+
+Usage (from backend/):
+    PYTHONPATH=. python benchmarks/bench_db_async.py --requests 2000 --concurrency 10,50,200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.orm import Session
+
+from app.api.routes.jobs import router as jobs_router
+from app.persistence.db import dispose_async_engine, get_db, pool_metrics
+from app.persistence.tables import VideoJob
+
+
+def _build_app() -> FastAPI:
+    bench = FastAPI()
+
+    # the real (async) route
+    bench.include_router(jobs_router, prefix="/async")
+
+    # the previous sync shape of the same query
+    @bench.get("/sync/jobs")
+    def sync_list_jobs(limit: int = 50, db: Session = Depends(get_db)):
+        rows = (
+            db.query(VideoJob.job_id, VideoJob.status, VideoJob.created_at, VideoJob.snapshot_count)
+            .order_by(VideoJob.created_at.desc(), VideoJob.job_id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        return {"jobs": [{"job_id": r.job_id, "status": r.status} for r in rows[:limit]]}
+
+    return bench
+
+
+async def _run(client: httpx.AsyncClient, path: str, total: int, concurrency: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    remaining = iter(range(total))
+
+    async def _worker():
+        for _ in remaining:
+            t0 = time.perf_counter()
+            r = await client.get(path)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    return time.perf_counter() - t0, latencies
+
+
+async def main(total: int, levels: list[int]) -> None:
+    transport = httpx.ASGITransport(app=_build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/sync/jobs", "/async/jobs"):
+            await _run(client, path, 20, 4)  # warm pools
+
+        print(f"{'variant':<8} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for conc in levels:
+            for label, path in (("sync", "/sync/jobs"), ("async", "/async/jobs")):
+                elapsed, lat = await _run(client, path, total, conc)
+                lat.sort()
+                p50 = statistics.median(lat) * 1000
+                p95 = lat[int(len(lat) * 0.95) - 1] * 1000
+                print(f"{label:<8} {conc:>5} {total / elapsed:>9.1f} {p50:>8.1f} {p95:>8.1f}")
+
+        print("pools:", pool_metrics())
+
+    await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", default="10,50,200")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, [int(c) for c in args.concurrency.split(",")]))
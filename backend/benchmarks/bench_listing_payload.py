@@ -0,0 +1,75 @@
+"""
+Payload size and serialization time of the snapshot listing for a large job.
+
+Builds the same response bodies list_snapshots does for N synthetic snapshots
+(no database needed) and reports, for rows vs ?format=columns:
+    - render time with the stdlib encoder (Starlette JSONResponse) and orjson
+    - raw, gzip and brotli (if installed) body sizes and compression time
+
+Usage (from backend/):
+    PYTHONPATH=. python benchmarks/bench_listing_payload.py --snapshots 50000
+"""
+import argparse
+import gzip
+import time
+import uuid
+
+from starlette.responses import JSONResponse
+
+from app.api.responses import BROTLI_QUALITY, GZIP_LEVEL, FastJSONResponse, brotli, orjson
+
+
+def _rows(n: int, job_id: str) -> list[dict]:
+    out = []
+    for i in range(n):
+        sid = str(uuid.uuid4())
+        out.append({
+            "snapshot_id": sid,
+            "timestamp_sec": i * 0.5,
+            "url": f"/storage/jobs/{job_id}/snapshots/{i + 1:06d}.jpg?v={sid}",
+            "width": 512,
+            "height": 288,
+        })
+    return out
+
+
+def _columns(rows: list[dict]) -> dict:
+    return {key: [r[key] for r in rows] for key in rows[0]}
+
+
+def _timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best * 1000
+
+
+def main(n: int, repeat: int) -> None:
+    job_id = str(uuid.uuid4())
+    rows = _rows(n, job_id)
+    bodies = {
+        "rows": {"job_id": job_id, "count": n, "format": "rows", "snapshots": rows},
+        "columns": {"job_id": job_id, "count": n, "format": "columns", "snapshots": _columns(rows)},
+    }
+
+    print(f"{n} snapshots, best of {repeat}; orjson={'yes' if orjson else 'no'} brotli={'yes' if brotli else 'no'}")
+    print(f"{'format':<8} {'encoder':<7} {'render ms':>10} {'raw KiB':>9} {'gzip KiB':>9} {'gzip ms':>8} {'br KiB':>8} {'br ms':>7}")
+    for fmt, body in bodies.items():
+        for label, cls in (("stdlib", JSONResponse), ("orjson", FastJSONResponse)):
+            raw, render_ms = _timed(lambda: cls(body).body, repeat)
+            gz, gz_ms = _timed(lambda: gzip.compress(raw, GZIP_LEVEL), repeat)
+            line = f"{fmt:<8} {label:<7} {render_ms:>10.1f} {len(raw) / 1024:>9.0f} {len(gz) / 1024:>9.0f} {gz_ms:>8.1f}"
+            if brotli is not None:
+                br, br_ms = _timed(lambda: brotli.compress(raw, quality=BROTLI_QUALITY), repeat)
+                line += f" {len(br) / 1024:>8.0f} {br_ms:>7.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snapshots", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.snapshots, args.repeat)
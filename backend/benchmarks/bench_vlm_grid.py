@@ -0,0 +1,89 @@
+"""
+Micro-benchmark for the VLM grid path: 8 keyframes at 4K (3840x2160 JPEG).
+
+Usage (from backend/):
+    PYTHONPATH=. python benchmarks/bench_vlm_grid.py
+"""
+import multiprocessing as mp
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.services.vlm import hf_client
+
+NUM_KEYFRAMES = 8
+WIDTH, HEIGHT = 3840, 2160
+
+
+def _make_keyframes(root: Path) -> list[Path]:
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(NUM_KEYFRAMES):
+        # smooth gradient + noise, closer to real footage than pure noise
+        x = np.linspace(0, 255, WIDTH, dtype=np.float32)
+        base = np.tile(x, (HEIGHT, 1))
+        noise = rng.normal(0, 12, (HEIGHT, WIDTH)).astype(np.float32)
+        ch = np.clip(base + noise + i * 10, 0, 255).astype(np.uint8)
+        img = np.stack([ch, ch[::-1], np.roll(ch, i * 100, axis=1)], axis=2)
+        p = root / f"{i + 1:06d}.jpg"
+        Image.fromarray(img).save(p, quality=90)
+        paths.append(p)
+    return paths
+
+
+def _naive_grid_url(paths: list[Path], cols: int = 4, tile_w: int = 384) -> str:
+    # the previous implementation: full decode + default resize filter
+    imgs = []
+    for p in paths:
+        im = Image.open(p).convert("RGB")
+        w, h = im.size
+        imgs.append(im.resize((tile_w, max(1, int(tile_w * (h / max(1, w)))))))
+    rows = (len(imgs) + cols - 1) // cols
+    tile_h = max(im.size[1] for im in imgs)
+    grid = Image.new("RGB", (cols * tile_w, rows * tile_h), (255, 255, 255))
+    for i, im in enumerate(imgs):
+        grid.paste(im, ((i % cols) * tile_w, (i // cols) * tile_h))
+    return hf_client.image_to_data_url_jpeg(grid)
+
+
+def _child(fn, warmup, queue) -> None:
+    if warmup:
+        fn()
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    queue.put((elapsed, peak))
+
+
+def _measure(label: str, fn, warmup: bool = False) -> None:
+    # fresh process per variant: PIL buffers live outside tracemalloc's view,
+    # so peak memory is the growth of the child's max RSS (KiB on Linux)
+    ctx = mp.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(fn, warmup, queue))
+    proc.start()
+    elapsed, peak = queue.get()
+    proc.join()
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms   peak +{peak / 1024:7.1f} MiB")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _make_keyframes(Path(tmp))
+
+        _measure("naive (full decode)", lambda: _naive_grid_url(paths))
+        _measure("draft decode, cold", lambda: hf_client.build_grid_data_url(paths))
+
+        # the cold run above left thumbs/ on disk
+        _measure("pre-sized thumbnails", lambda: hf_client.build_grid_data_url(paths))
+        _measure("cached data URL", lambda: hf_client.build_grid_data_url(paths), warmup=True)
+
+
+if __name__ == "__main__":
+    main()
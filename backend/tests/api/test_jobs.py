@@ -1,13 +1,7 @@
 from pathlib import Path
 
 
-def test_create_job(client, tmp_path, monkeypatch):
-    # override storage root to tmp
-    monkeypatch.setattr(
-        "app.api.routes.jobs.STORAGE_ROOT",
-        tmp_path,
-    )
-
+def test_create_job(client, storage, tmp_path):
     files = {
         "video": ("test.mp4", b"fake video content", "video/mp4"),
     }
@@ -59,12 +53,7 @@ def test_get_job(client, db_session, job):
     assert data["job_id"] == job.job_id
 
 
-def test_delete_job(client, db_session, job, tmp_path, monkeypatch):
-    monkeypatch.setattr(
-        "app.api.routes.jobs.STORAGE_ROOT",
-        tmp_path,
-    )
-
+def test_delete_job(client, db_session, job, storage, tmp_path):
     # create fake directory
     job_dir = tmp_path / "jobs" / job.job_id
     job_dir.mkdir(parents=True)
@@ -80,4 +69,366 @@ def test_delete_job(client, db_session, job, tmp_path, monkeypatch):
 def test_delete_job_not_found(client):
     response = client.delete("/jobs/nonexistent")
 
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_run_extract_enqueues_task_when_queue_enabled(client, db_session, job, monkeypatch):
+    from app.persistence.tables import Task
+
+    monkeypatch.setenv("TASK_QUEUE", "db")
+
+    response = client.post(f"/jobs/{job.job_id}/extract")
+
+    assert response.status_code == 200
+    task = db_session.query(Task).filter_by(job_id=job.job_id).one()
+    assert task.kind == "extract"
+    assert task.status == "queued"
+
+
+def test_create_job_full_pipeline_enqueues_pipeline_task(client, db_session, storage, tmp_path, monkeypatch):
+    from app.persistence.tables import Task
+
+    monkeypatch.setenv("TASK_QUEUE", "db")
+
+    files = {"video": ("test.mp4", b"fake video content", "video/mp4")}
+    response = client.post("/jobs?pipeline=full", files=files)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "processing"
+    assert body["pipeline"] == "full"
+
+    task = db_session.query(Task).filter_by(job_id=body["job_id"]).one()
+    assert task.kind == "pipeline"
+
+
+def test_create_job_rejects_unknown_pipeline(client, storage, tmp_path):
+
+    files = {"video": ("test.mp4", b"fake video content", "video/mp4")}
+    response = client.post("/jobs?pipeline=bogus", files=files)
+
+    assert response.status_code == 400
+
+
+def _add_snapshots(db_session, job_id, root, n):
+    from app.persistence.tables import Snapshot
+
+    for i in range(n):
+        db_session.add(Snapshot(
+            job_id=job_id,
+            timestamp_sec=i * 0.5,
+            uri=str(root / "jobs" / job_id / "snapshots" / f"{i + 1:06d}.jpg"),
+            width=4,
+            height=4,
+        ))
+    _count_snapshots(db_session, job_id, n)
+    db_session.flush()
+
+
+def _count_snapshots(db_session, job_id, n):
+    # extraction keeps the job's counter in step with its rows
+    from app.persistence.tables import VideoJob
+
+    db_session.query(VideoJob).filter(VideoJob.job_id == job_id).update(
+        {VideoJob.snapshot_count: VideoJob.snapshot_count + n}
+    )
+
+
+def test_list_snapshots_keyset_pagination(client, db_session, job, storage, tmp_path):
+    _add_snapshots(db_session, job.job_id, tmp_path, 5)
+
+    first = client.get(f"/jobs/{job.job_id}/snapshots?limit=2").json()
+    assert first["total"] == 5
+    assert [s["timestamp_sec"] for s in first["snapshots"]] == [0.0, 0.5]
+    url, _, version = first["snapshots"][0]["url"].partition("?v=")
+    assert url == f"/storage/jobs/{job.job_id}/snapshots/000001.jpg"
+    assert version == first["snapshots"][0]["snapshot_id"]
+
+    seen = first["snapshots"]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get(f"/jobs/{job.job_id}/snapshots", params={"limit": 2, "cursor": cursor}).json()
+        seen += page["snapshots"]
+        cursor = page["next_cursor"]
+
+    assert [s["timestamp_sec"] for s in seen] == [0.0, 0.5, 1.0, 1.5, 2.0]
+
+
+def test_list_snapshots_reports_density_levels(client, db_session, job, storage, tmp_path):
+    from app.persistence.tables import Snapshot, SnapshotConfig
+
+    db_session.add(SnapshotConfig(job_id=job.job_id, sampling_fps=2.0, preview_fps=0.5))
+    job.snapshot_level = 0
+    _add_snapshots(db_session, job.job_id, tmp_path, 6)
+    for s in db_session.query(Snapshot).filter_by(job_id=job.job_id):
+        s.level = 0 if s.timestamp_sec in (0.0, 2.0) else 1
+    db_session.flush()
+
+    body = client.get(f"/jobs/{job.job_id}/snapshots").json()
+    assert body["total"] == 6
+    assert body["levels"] == [
+        {"level": 0, "fps": 0.5, "complete": True},
+        {"level": 1, "fps": 2.0, "complete": False},
+    ]
+
+    coarse = client.get(f"/jobs/{job.job_id}/snapshots?level=0").json()
+    assert coarse["total"] == 2
+    assert [s["timestamp_sec"] for s in coarse["snapshots"]] == [0.0, 2.0]
+
+    # finishing the next level must invalidate cached pages
+    etag = client.get(f"/jobs/{job.job_id}/snapshots").headers["etag"]
+    job.snapshot_level = 1
+    db_session.flush()
+    res = client.get(f"/jobs/{job.job_id}/snapshots", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert all(lvl["complete"] for lvl in res.json()["levels"])
+
+
+def test_list_snapshots_columns_format(client, db_session, job, storage, tmp_path):
+    _add_snapshots(db_session, job.job_id, tmp_path, 3)
+
+    rows = client.get(f"/jobs/{job.job_id}/snapshots").json()
+    cols = client.get(f"/jobs/{job.job_id}/snapshots?format=columns").json()
+
+    assert cols["format"] == "columns"
+    assert cols["count"] == 3
+    assert cols["snapshots"]["timestamp_sec"] == [0.0, 0.5, 1.0]
+    assert cols["snapshots"]["url"] == [s["url"] for s in rows["snapshots"]]
+
+    # formats must not share a cached page
+    etag = client.get(f"/jobs/{job.job_id}/snapshots").headers["etag"]
+    res = client.get(f"/jobs/{job.job_id}/snapshots?format=columns", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+
+
+def test_list_snapshots_is_compressed(client, db_session, job, storage, tmp_path):
+    _add_snapshots(db_session, job.job_id, tmp_path, 50)
+
+    res = client.get(f"/jobs/{job.job_id}/snapshots", headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.json()["count"] == 50
+
+
+def test_packed_snapshots_are_served_from_the_pack(client, db_session, job, storage):
+    from app.persistence.tables import Snapshot
+    from app.services.storage.pack import FramePackWriter
+
+    jpeg = b"\xff\xd8\xff" + b"frame-1"
+    with FramePackWriter(storage.local_path(f"jobs/{job.job_id}/snapshots/frames.pack")) as w:
+        w.append(b"\xff\xd8\xff" + b"frame-0")
+        w.append(jpeg)
+    db_session.add(Snapshot(job_id=job.job_id, timestamp_sec=0.5, uri=f"jobs/{job.job_id}/snapshots/frames.pack#1"))
+    db_session.flush()
+
+    url = client.get(f"/jobs/{job.job_id}/snapshots").json()["snapshots"][0]["url"]
+    assert url.startswith(f"/jobs/{job.job_id}/frames/1?v=")
+
+    res = client.get(url)
+    assert res.status_code == 200
+    assert res.content == jpeg
+    assert res.headers["content-type"] == "image/jpeg"
+    assert "immutable" in res.headers["cache-control"]
+
+    assert client.get(url, headers={"If-None-Match": res.headers["etag"]}).status_code == 304
+    assert client.get(f"/jobs/{job.job_id}/frames/5").status_code == 404
+
+
+def test_list_snapshots_restores_evicted_snapshots_first(client, db_session, job, storage, tmp_path, monkeypatch):
+    from datetime import datetime, timezone
+
+    from app.persistence.tables import JobArtifact
+    from app.services.storage import artifacts
+
+    _add_snapshots(db_session, job.job_id, tmp_path, 2)
+    db_session.add(JobArtifact(job_id=job.job_id, kind="snapshots", evicted_at=datetime.now(timezone.utc)))
+    db_session.flush()
+    artifacts.forget_touches()
+
+    restored = []
+    monkeypatch.setattr("app.api.routes.jobs.restore_snapshots", restored.append)
+
+    assert client.get(f"/jobs/{job.job_id}/snapshots").json()["count"] == 2
+    assert restored == [job.job_id]
+
+
+def test_derive_snapshots_updates_config_and_queues_the_pass(client, db_session, job, snapshot_config, monkeypatch):
+    started = []
+    monkeypatch.setattr("app.api.routes.jobs._run_derive_job", started.append)
+
+    res = client.post(f"/jobs/{job.job_id}/snapshots/derive", data={"resize_width": "128", "grayscale": "true"})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["status"] == "derive_started"
+    assert body["config"]["resize_width"] == 128
+    assert body["config"]["grayscale"] is True
+    assert body["config"]["image_format"] == "jpg"  # not given, unchanged
+    assert started == [job.job_id]
+
+
+def test_derive_snapshots_refuses_busy_jobs(client, db_session, job, snapshot_config):
+    job.status = "processing"
+    db_session.flush()
+
+    assert client.post(f"/jobs/{job.job_id}/snapshots/derive", data={"grayscale": "true"}).status_code == 409
+    assert client.post("/jobs/nope/snapshots/derive", data={"grayscale": "true"}).status_code == 404
+
+
+def test_derive_snapshots_rejects_unknown_image_format(client, db_session, job, snapshot_config, mocker):
+    run = mocker.patch("app.api.routes.jobs._run_derive_job")
+
+    res = client.post(f"/jobs/{job.job_id}/snapshots/derive", data={"image_format": "tiff"})
+
+    assert res.status_code == 400
+    assert snapshot_config.image_format == "jpg"
+    run.assert_not_called()
+
+
+def test_derive_snapshots_claims_the_job(client, db_session, job, snapshot_config, mocker):
+    mocker.patch("app.api.routes.jobs._run_derive_job")
+
+    assert client.post(f"/jobs/{job.job_id}/snapshots/derive", data={"grayscale": "true"}).status_code == 200
+    # a second request before the first derive runs finds the job busy
+    assert client.post(f"/jobs/{job.job_id}/snapshots/derive", data={"grayscale": "true"}).status_code == 409
+
+
+def test_derive_snapshots_without_config_is_not_found(client, db_session, job, mocker):
+    from sqlalchemy import select
+
+    from app.persistence.tables import VideoJob
+
+    run = mocker.patch("app.api.routes.jobs._run_derive_job")
+    status = job.status
+
+    assert client.post(f"/jobs/{job.job_id}/snapshots/derive", data={"grayscale": "true"}).status_code == 404
+    assert db_session.scalar(select(VideoJob.status).where(VideoJob.job_id == job.job_id)) == status
+    run.assert_not_called()
+
+
+def test_list_snapshots_rejects_bad_cursor(client, job):
+    response = client.get(f"/jobs/{job.job_id}/snapshots?cursor=nope")
+    assert response.status_code == 400
+
+
+def test_list_snapshots_etag_revalidation(client, db_session, job, storage, tmp_path):
+    _add_snapshots(db_session, job.job_id, tmp_path, 3)
+
+    response = client.get(f"/jobs/{job.job_id}/snapshots")
+    etag = response.headers["etag"]
+
+    cached = client.get(f"/jobs/{job.job_id}/snapshots", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # a new snapshot invalidates the page
+    from app.persistence.tables import Snapshot
+    db_session.add(Snapshot(job_id=job.job_id, timestamp_sec=9.0, uri=str(tmp_path / "x.jpg")))
+    _count_snapshots(db_session, job.job_id, 1)
+    db_session.flush()
+
+    changed = client.get(f"/jobs/{job.job_id}/snapshots", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["total"] == 4
+
+
+def test_list_jobs_keyset_pagination(client, db_session):
+    from datetime import datetime, timedelta, timezone
+    from app.persistence.tables import VideoJob
+
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(5):
+        db_session.add(VideoJob(job_id=f"job-{i}", status="completed", created_at=base + timedelta(minutes=i), snapshot_count=i))
+    db_session.flush()
+
+    first = client.get("/jobs?limit=2").json()
+    assert [j["job_id"] for j in first["jobs"]] == ["job-4", "job-3"]
+    assert first["jobs"][0]["snapshot_count"] == 4
+
+    seen = first["jobs"]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = client.get("/jobs", params={"limit": 2, "cursor": cursor}).json()
+        seen += page["jobs"]
+        cursor = page["next_cursor"]
+
+    assert [j["job_id"] for j in seen] == ["job-4", "job-3", "job-2", "job-1", "job-0"]
+
+
+def test_stream_upload_non_streamable_saves_then_extracts(client, db_session, storage, tmp_path, mocker):
+    from app.persistence.tables import VideoAsset
+
+    run = mocker.patch("app.api.routes.jobs._run_extract_job")
+    streaming = mocker.patch("app.api.routes.jobs.StreamingExtraction")
+
+    # ftyp then mdat: the index is at the end, ffmpeg can't read it from a pipe
+    body = (16).to_bytes(4, "big") + b"ftypisom\0\0\0\0" + (24).to_bytes(4, "big") + b"mdat" + b"x" * 16
+    response = client.post("/jobs/stream?filename=clip.mp4", content=body)
+
+    assert response.status_code == 200
+    out = response.json()
+    assert out["streamed"] is False
+    assert out["status"] == "processing"
+    streaming.assert_not_called()
+    run.assert_called_once_with(out["job_id"])
+
+    asset = db_session.query(VideoAsset).filter_by(job_id=out["job_id"]).one()
+    assert asset.uri == f"jobs/{out['job_id']}/video/original.mp4"
+    with storage.fetch(asset.uri).open("rb") as f:
+        assert f.read() == body
+
+
+def test_stream_upload_tees_streamable_body_into_extraction(client, db_session, storage, tmp_path, mocker):
+    run = mocker.patch("app.api.routes.jobs._run_extract_job")
+
+    fed = []
+    fake = mocker.Mock()
+    fake.feed.side_effect = lambda data: fed.append(data) or True
+    fake.finish.return_value = False
+    mocker.patch("app.api.routes.jobs.StreamingExtraction", return_value=fake)
+
+    body = b"\x1a\x45\xdf\xa3" + b"m" * 5000
+    response = client.post("/jobs/stream?filename=clip.mkv", content=body)
+
+    assert response.status_code == 200
+    assert response.json()["streamed"] is True
+    assert b"".join(fed) == body
+    fake.finish.assert_called_once()
+    run.assert_not_called()
+
+
+def test_stream_upload_disconnect_before_probe_leaves_nothing(client, db_session, storage, tmp_path, mocker):
+    from starlette.requests import ClientDisconnect, Request
+
+    from app.persistence.tables import VideoJob
+
+    async def _dropped(self):
+        yield b"\x00\x00"  # too little to tell the container apart
+        raise ClientDisconnect()
+
+    mocker.patch.object(Request, "stream", _dropped)
+
+    response = client.post("/jobs/stream?filename=clip.mp4", content=b"\x00\x00")
+
+    assert response.status_code == 400
+    assert db_session.query(VideoJob).count() == 0
+    assert not (tmp_path / "jobs").exists()
+
+
+def test_stream_upload_fallback_is_a_queued_task(client, db_session, storage, monkeypatch, mocker):
+    monkeypatch.setenv("TASK_QUEUE", "db")
+    run = mocker.patch("app.api.routes.jobs._run_extract_job")
+    enqueue = mocker.patch("app.api.routes.jobs.enqueue")
+    fake = mocker.Mock()
+    fake.feed.return_value = True
+    fake.finish.return_value = False
+    streaming = mocker.patch("app.api.routes.jobs.StreamingExtraction", return_value=fake)
+
+    response = client.post("/jobs/stream?filename=clip.mkv", content=b"\x1a\x45\xdf\xa3" + b"m" * 100)
+    job_id = response.json()["job_id"]
+
+    # the extraction thread's disk fallback after a failed decode
+    session = mocker.Mock()
+    mocker.patch("app.api.routes.jobs.SessionLocal", return_value=session)
+    fallback = streaming.call_args.args[3]
+    fallback(job_id)
+
+    enqueue.assert_called_once_with(session, "extract", job_id)
+    session.close.assert_called_once()
+    run.assert_not_called()
@@ -1,5 +1,8 @@
+import threading
+import time
+
 import pytest
-from app.persistence.tables import Scene
+from app.persistence.tables import Narrative, Scene
 
 
 def test_get_narrative_not_exists(client, job):
@@ -47,4 +50,205 @@ def test_generate_narrative(client, db_session, job, mocker):
 def test_generate_narrative_no_scenes(client, job):
     res = client.post(f"/jobs/{job.job_id}/narrative/generate")
 
-    assert res.status_code == 400
\ No newline at end of file
+    assert res.status_code == 400
+
+def test_generate_narrative_stream(client, db_session, job, mocker):
+    scene = Scene(
+        job_id=job.job_id,
+        start_sec=0,
+        end_sec=5,
+        short_description="Person enters room",
+    )
+    db_session.add(scene)
+    db_session.commit()
+
+    mocker.patch(
+        "app.api.routes.narrative.stream_narrative_from_scenes",
+        return_value=iter(['{"narrative": "Full story", ', '"summary": "Short", "structured": {}}']),
+    )
+
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate/stream")
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert "event: delta" in res.text
+    assert "event: done" in res.text
+
+    saved = client.get(f"/jobs/{job.job_id}/narrative").json()
+    assert saved["narrative"]["full_story"] == "Full story"
+
+
+
+def test_generate_narrative_stream_replays_result_of_concurrent_generate(client, db_session, job, mocker):
+    from app.api.routes.narrative import _narrative_flight
+
+    db_session.add(Scene(job_id=job.job_id, start_sec=0, end_sec=5, short_description="Person enters room"))
+    db_session.commit()
+    stream = mocker.patch("app.api.routes.narrative.stream_narrative_from_scenes")
+
+    entered = threading.Event()
+
+    def other_request():
+        # another request generates meanwhile and commits its narrative
+        with _narrative_flight.lead(f"narrative:{job.job_id}") as call:
+            entered.set()
+            time.sleep(0.1)
+            db_session.add(Narrative(job_id=job.job_id, short_summary="Short", full_story="Full story"))
+            db_session.commit()
+            call.result = {}
+
+    leader = threading.Thread(target=other_request)
+    leader.start()
+    entered.wait()
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate/stream")
+    leader.join()
+
+    assert res.status_code == 200
+    assert '"delta": "Full story"' in res.text
+    assert "event: done" in res.text
+    stream.assert_not_called()
+
+def test_generate_narrative_invalid_mode(client, db_session, job):
+    db_session.add(Scene(job_id=job.job_id, start_sec=0, end_sec=5, short_description="x"))
+    db_session.commit()
+
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate?mode=bogus")
+
+    assert res.status_code == 400
+
+
+def test_generate_narrative_hierarchical_reuses_unchanged_windows(client, db_session, job, mocker, monkeypatch):
+    monkeypatch.setenv("HF_LLM_WINDOW_SIZE", "2")
+    monkeypatch.setenv("HF_LLM_FAN_IN", "2")
+
+    scenes = [
+        Scene(job_id=job.job_id, start_sec=i * 5, end_sec=(i + 1) * 5, short_description=f"scene {i}")
+        for i in range(4)
+    ]
+    db_session.add_all(scenes)
+    db_session.commit()
+
+    summarize = mocker.patch(
+        "app.api.routes.narrative.summarize_window",
+        side_effect=lambda lines: f"summary of {len(lines)}",
+    )
+    mocker.patch(
+        "app.services.llm.hf_text_client.generate_narrative_from_scenes",
+        return_value=type(
+            "Result",
+            (),
+            {"narrative": "Full story", "summary": "Short", "structured": {}},
+        )(),
+    )
+
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate?mode=hierarchical")
+    assert res.status_code == 200
+    assert res.json()["windows"] == {"cached": 0, "summarized": 2}
+
+    # edit one scene: only its window is summarized again
+    scenes[3].short_description = "scene 3, edited"
+    db_session.commit()
+    summarize.reset_mock()
+
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate?mode=hierarchical")
+    assert res.json()["windows"] == {"cached": 1, "summarized": 1}
+    assert summarize.call_count == 1
+
+
+def test_generate_narrative_in_background(client, db_session, job, mocker):
+    db_session.add(Scene(job_id=job.job_id, start_sec=0, end_sec=5, short_description="x"))
+    db_session.commit()
+
+    run = mocker.patch("app.api.routes.narrative._run_narrative_job")
+
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate?run_in_background=true")
+
+    assert res.status_code == 200
+    assert res.json()["status"] == "queued"
+    run.assert_called_once_with(job.job_id, mode="auto")
+
+    status = client.get(f"/jobs/{job.job_id}/narrative/status").json()
+    assert status["status"] == "queued"
+
+    # a queued placeholder is not a narrative yet
+    assert client.get(f"/jobs/{job.job_id}/narrative").json()["exists"] is False
+
+
+
+def test_generate_narrative_in_background_requeues_only_stale_runs(client, db_session, job, mocker):
+    from datetime import datetime, timedelta, timezone
+
+    db_session.add(Scene(job_id=job.job_id, start_sec=0, end_sec=5, short_description="x"))
+    db_session.commit()
+    run = mocker.patch("app.api.routes.narrative._run_narrative_job")
+
+    client.post(f"/jobs/{job.job_id}/narrative/generate?run_in_background=true")
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate?run_in_background=true")
+    assert res.json()["status"] == "queued"
+    assert run.call_count == 1
+
+    # the run that queued it died long ago
+    n = db_session.query(Narrative).filter_by(job_id=job.job_id).one()
+    n.status = "running"
+    n.updated_at = datetime.now(timezone.utc) - timedelta(hours=2)
+    db_session.commit()
+
+    res = client.post(f"/jobs/{job.job_id}/narrative/generate?run_in_background=true")
+    assert res.json()["status"] == "queued"
+    assert run.call_count == 2
+
+
+def test_stream_narrative_status_closes_once_generated(client, db_session, job):
+    db_session.add(Narrative(job_id=job.job_id, short_summary="s", full_story="story", status="generated"))
+    db_session.commit()
+
+    res = client.get(f"/jobs/{job.job_id}/narrative/status/stream")
+
+    assert res.status_code == 200
+    assert res.text.count("event: status") == 1
+    assert '"status": "generated"' in res.text
+
+def test_run_narrative_job_marks_generated(db_session, job, mocker):
+    from app.api.routes import narrative as narrative_routes
+    from app.persistence.tables import Narrative
+
+    job_id = job.job_id  # the runner closes the session, detaching fixtures
+    db_session.add(Scene(job_id=job_id, start_sec=0, end_sec=5, short_description="x"))
+    db_session.commit()
+
+    mocker.patch.object(narrative_routes, "SessionLocal", return_value=db_session)
+    mocker.patch(
+        "app.api.routes.narrative.generate_narrative_from_scenes",
+        return_value=type(
+            "Result",
+            (),
+            {"narrative": "Full story", "summary": "Short", "structured": {}},
+        )(),
+    )
+
+    narrative_routes._run_narrative_job(job_id)
+
+    n = db_session.query(Narrative).filter_by(job_id=job_id).one()
+    assert n.status == "generated"
+    assert n.full_story == "Full story"
+
+
+def test_run_narrative_job_records_failure(db_session, job, mocker):
+    from app.api.routes import narrative as narrative_routes
+    from app.persistence.tables import Narrative
+
+    job_id = job.job_id  # the runner closes the session, detaching fixtures
+    db_session.add(Scene(job_id=job_id, start_sec=0, end_sec=5, short_description="x"))
+    db_session.commit()
+
+    mocker.patch.object(narrative_routes, "SessionLocal", return_value=db_session)
+    mocker.patch(
+        "app.api.routes.narrative.generate_narrative_from_scenes",
+        side_effect=RuntimeError("LLM down"),
+    )
+
+    narrative_routes._run_narrative_job(job_id)
+
+    n = db_session.query(Narrative).filter_by(job_id=job_id).one()
+    assert n.status == "failed"
+    assert n.error == "LLM down"
@@ -75,4 +75,202 @@ def test_describe_scene(client, db_session, job, mocker):
     res = client.post(f"/jobs/{job.job_id}/scenes/{scene.scene_id}/describe")
 
     assert res.status_code == 200
-    assert res.json()["short_description"] == "A person walking"
\ No newline at end of file
+    assert res.json()["short_description"] == "A person walking"
+
+def test_describe_all_scenes(client, db_session, job, mocker):
+    from app.persistence.tables import Scene, SceneSnapshot, Snapshot
+    from app.services.vlm.hf_client import VLMResult
+
+    scenes = []
+    for i in range(3):
+        snap = Snapshot(job_id=job.job_id, timestamp_sec=i * 5, uri=f"/tmp/{i}.jpg")
+        scene = Scene(
+            job_id=job.job_id,
+            start_sec=i * 5,
+            end_sec=(i + 1) * 5,
+            short_description="(pending)",
+        )
+        db_session.add_all([snap, scene])
+        db_session.flush()
+        db_session.add(SceneSnapshot(scene_id=scene.scene_id, snapshot_id=snap.snapshot_id))
+        scenes.append(scene)
+    db_session.commit()
+
+    mock = mocker.patch(
+        "app.api.routes.scenes.describe_scenes_hf",
+        return_value=[VLMResult(text=f"scene {i}") for i in range(3)],
+    )
+
+    res = client.post(f"/jobs/{job.job_id}/scenes/describe?batch_size=3")
+
+    assert res.status_code == 200
+    assert res.json()["scenes_described"] == 3
+    assert mock.call_args[0][1] == 3
+
+    db_session.refresh(scenes[1])
+    assert scenes[1].short_description == "scene 1"
+
+
+def test_describe_all_scenes_keeps_results_when_one_scene_fails(client, db_session, job, mocker):
+    from app.persistence.tables import Scene, SceneSnapshot, Snapshot
+    from app.services.vlm.hf_client import VLMResult
+
+    scenes = []
+    for i in range(2):
+        snap = Snapshot(job_id=job.job_id, timestamp_sec=i * 5, uri=f"/tmp/{i}.jpg")
+        scene = Scene(job_id=job.job_id, start_sec=i * 5, end_sec=(i + 1) * 5, short_description="(pending)")
+        db_session.add_all([snap, scene])
+        db_session.flush()
+        db_session.add(SceneSnapshot(scene_id=scene.scene_id, snapshot_id=snap.snapshot_id))
+        scenes.append(scene)
+    db_session.commit()
+
+    mocker.patch(
+        "app.api.routes.scenes.describe_scenes_hf",
+        return_value=[VLMResult(text="first"), VLMResult(text="", error="timeout")],
+    )
+
+    res = client.post(f"/jobs/{job.job_id}/scenes/describe?reuse_similar=false")
+
+    assert res.status_code == 200
+    assert res.json()["scenes_described"] == 1
+    assert res.json()["scenes_failed"] == [{"scene_id": scenes[1].scene_id, "detail": "timeout"}]
+    db_session.refresh(scenes[0])
+    db_session.refresh(scenes[1])
+    assert scenes[0].short_description == "first"
+    assert scenes[1].short_description == "(pending)"
+
+
+def test_describe_all_scenes_reuses_repeated_shots(client, db_session, job, tmp_path, mocker):
+    import cv2
+    import numpy as np
+
+    from app.persistence.tables import Scene, SceneSnapshot, Snapshot
+    from app.services.vlm.hf_client import VLMResult
+
+    row = np.linspace(0, 255, 320, dtype=np.uint8)
+    intro = np.stack([np.tile(row, (180, 1))] * 3, axis=2)
+    frames = [intro, intro[:, ::-1], intro]  # intro, something else, intro again
+
+    scenes = []
+    for i, img in enumerate(frames):
+        path = tmp_path / f"{i}.jpg"
+        cv2.imwrite(str(path), img)
+        snap = Snapshot(job_id=job.job_id, timestamp_sec=i * 5, uri=str(path))
+        scene = Scene(
+            job_id=job.job_id,
+            start_sec=i * 5,
+            end_sec=(i + 1) * 5,
+            short_description="(pending)",
+        )
+        db_session.add_all([snap, scene])
+        db_session.flush()
+        db_session.add(SceneSnapshot(scene_id=scene.scene_id, snapshot_id=snap.snapshot_id))
+        scenes.append(scene)
+    db_session.commit()
+
+    mock = mocker.patch(
+        "app.api.routes.scenes.describe_scenes_hf",
+        return_value=[VLMResult(text="intro"), VLMResult(text="other")],
+    )
+
+    res = client.post(f"/jobs/{job.job_id}/scenes/describe")
+
+    assert res.status_code == 200
+    assert res.json()["scenes_described"] == 2
+    assert res.json()["scenes_reused"] == 1
+    assert len(mock.call_args[0][0]) == 2
+
+    db_session.refresh(scenes[2])
+    assert scenes[2].short_description == "intro"
+    assert scenes[2].description_reused is True
+    assert scenes[2].reused_from_scene_id == scenes[0].scene_id
+
+
+def test_get_scene_seeks_keyframes_of_lazy_job(client, db_session, job, storage, tmp_path, mocker):
+    from pathlib import Path
+
+    from app.persistence.tables import Scene, VideoAsset
+    from app.pipeline.lazy import ensure_scene_keyframes
+
+    (tmp_path / "video.mp4").touch()
+    db_session.add(VideoAsset(job_id=job.job_id, uri="video.mp4", duration_sec=12.0))
+    db_session.add(SnapshotConfig(job_id=job.job_id, sampling_fps=1.0, chunk_length_sec=5, image_format="jpg", lazy=True))
+    db_session.flush()
+
+    res = client.post(f"/jobs/{job.job_id}/scenes/build")
+    assert res.json()["scenes_created"] == 3
+
+    seeks = []
+
+    def fake_seek(video_path, timestamp_sec, out_path):
+        seeks.append(timestamp_sec)
+        Path(out_path).write_bytes(b"frame")
+        return True
+
+    mocker.patch("app.pipeline.lazy._seek_frame", side_effect=fake_seek)
+    mocker.patch("app.pipeline.lazy._process_frame", return_value=(256, 144))
+    # the route runs it in a worker thread with its own session
+    mocker.patch(
+        "app.api.routes.scenes.ensure_scene_keyframes",
+        side_effect=lambda job_id, scene_id, k: ensure_scene_keyframes(job_id, scene_id, k, db_session, storage),
+    )
+
+    scene = db_session.query(Scene).filter_by(job_id=job.job_id, start_sec=5).one()
+    body = client.get(f"/jobs/{job.job_id}/scenes/{scene.scene_id}?keyframes=3").json()
+
+    assert sorted(seeks) == [5.0, 7.0, 9.0]
+    assert [k["timestamp_sec"] for k in body["keyframes"]] == [5.0, 7.0, 9.0]
+    assert body["keyframes"][0]["url"].startswith(f"/storage/jobs/{job.job_id}/snapshots/000006.jpg?v=")
+
+
+def test_keyframes_out_of_range_is_rejected(client, job):
+    from app.api.routes.scenes import MAX_KEYFRAMES
+
+    base = f"/jobs/{job.job_id}/scenes"
+    for k in (0, MAX_KEYFRAMES + 1):
+        assert client.get(f"{base}/missing?keyframes={k}").status_code == 422
+        assert client.post(f"{base}/missing/describe?keyframes={k}").status_code == 422
+        assert client.post(f"{base}/missing/describe/stream?keyframes={k}").status_code == 422
+        assert client.post(f"{base}/describe?keyframes={k}").status_code == 422
+
+
+def test_describe_all_scenes_coalesces_only_identical_requests(client, db_session, job, mocker):
+    from app.api.routes import scenes as scenes_module
+
+    do = mocker.patch.object(scenes_module._describe_flight, "do", return_value={"status": "scenes_described"})
+    base = f"/jobs/{job.job_id}/scenes/describe"
+
+    client.post(f"{base}?keyframes=4")
+    client.post(f"{base}?keyframes=4")
+    client.post(f"{base}?keyframes=4&only_pending=false")
+    client.post(f"{base}?keyframes=4&reuse_similar=false")
+    client.post(f"{base}?keyframes=6")
+
+    keys = [c.args[0] for c in do.call_args_list]
+    assert keys[0] == keys[1]
+    assert len(set(keys)) == 4
+
+
+def test_describe_all_scenes_without_reuse_loads_only_targets(client, db_session, job, mocker):
+    from app.api.routes import scenes as scenes_module
+    from app.persistence.tables import Scene, SceneSnapshot, Snapshot
+    from app.services.vlm.hf_client import VLMResult
+
+    scenes = []
+    for i, desc in enumerate(["described", "(pending)"]):
+        snap = Snapshot(job_id=job.job_id, timestamp_sec=i * 5, uri=f"/tmp/{i}.jpg")
+        scene = Scene(job_id=job.job_id, start_sec=i * 5, end_sec=(i + 1) * 5, short_description=desc)
+        db_session.add_all([snap, scene])
+        db_session.flush()
+        db_session.add(SceneSnapshot(scene_id=scene.scene_id, snapshot_id=snap.snapshot_id))
+        scenes.append(scene)
+    db_session.commit()
+
+    mocker.patch("app.api.routes.scenes.describe_scenes_hf", return_value=[VLMResult(text="new")])
+    loaded = mocker.spy(scenes_module, "_snapshots_by_scene")
+
+    res = client.post(f"/jobs/{job.job_id}/scenes/describe?reuse_similar=false")
+
+    assert res.json()["scenes_described"] == 1
+    assert loaded.call_args.args[1] == [scenes[1].scene_id]
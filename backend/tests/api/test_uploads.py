@@ -0,0 +1,130 @@
+import base64
+import hashlib
+
+from app.persistence.tables import VideoAsset, VideoJob
+
+
+def _checksum(data: bytes) -> str:
+    return "sha256 " + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+def _create(client, length, filename="clip.mkv"):
+    res = client.post("/uploads", headers={"Upload-Length": str(length), "Upload-Filename": filename})
+    assert res.status_code == 201
+    return res.json()["upload_id"]
+
+
+def test_chunked_upload_then_finalize(client, db_session, storage, tmp_path):
+    data = b"0123456789" * 100
+    upload_id = _create(client, len(data))
+
+    for off in range(0, len(data), 300):
+        chunk = data[off:off + 300]
+        res = client.patch(
+            f"/uploads/{upload_id}",
+            content=chunk,
+            headers={"Upload-Offset": str(off), "Upload-Checksum": _checksum(chunk)},
+        )
+        assert res.status_code == 204
+        assert res.headers["upload-offset"] == str(off + len(chunk))
+
+    res = client.post(f"/uploads/{upload_id}/finalize", data={"run_extract": "false"})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["content_sha256"] == hashlib.sha256(data).hexdigest()
+
+    job = db_session.query(VideoJob).filter_by(job_id=body["job_id"]).one()
+    asset = db_session.query(VideoAsset).filter_by(job_id=job.job_id).one()
+    assert asset.content_sha256 == body["content_sha256"]
+    assert asset.uri == f"jobs/{job.job_id}/video/original.mkv"
+    with storage.fetch(asset.uri).open("rb") as f:
+        assert f.read() == data
+
+
+def test_resume_reports_offset_and_rejects_wrong_offset(client, storage, tmp_path):
+    upload_id = _create(client, 10)
+
+    client.patch(f"/uploads/{upload_id}", content=b"abcd", headers={"Upload-Offset": "0"})
+
+    head = client.head(f"/uploads/{upload_id}")
+    assert head.headers["upload-offset"] == "4"
+    assert head.headers["upload-length"] == "10"
+
+    res = client.patch(f"/uploads/{upload_id}", content=b"xx", headers={"Upload-Offset": "0"})
+    assert res.status_code == 409
+    assert res.json()["offset"] == 4
+
+
+def test_checksum_mismatch_discards_chunk(client, storage, tmp_path):
+    upload_id = _create(client, 8)
+
+    res = client.patch(
+        f"/uploads/{upload_id}",
+        content=b"abcd",
+        headers={"Upload-Offset": "0", "Upload-Checksum": _checksum(b"nope")},
+    )
+    assert res.status_code == 460
+    assert client.head(f"/uploads/{upload_id}").headers["upload-offset"] == "0"
+
+
+def test_finalize_requires_complete_upload(client, storage, tmp_path):
+    upload_id = _create(client, 8)
+    client.patch(f"/uploads/{upload_id}", content=b"abcd", headers={"Upload-Offset": "0"})
+
+    res = client.post(f"/uploads/{upload_id}/finalize", data={"run_extract": "false"})
+    assert res.status_code == 409
+
+
+def test_failed_finalize_moves_the_file_back(client, storage, tmp_path, mocker):
+    import pytest
+
+    from app.api.routes.uploads import _part_path
+
+    data = b"0123456789"
+    upload_id = _create(client, len(data))
+    client.patch(f"/uploads/{upload_id}", content=data, headers={"Upload-Offset": "0"})
+
+    mocker.patch("app.api.routes.jobs.probe_duration_sec", side_effect=RuntimeError("db down"))
+    with pytest.raises(RuntimeError):
+        client.post(f"/uploads/{upload_id}/finalize", data={"run_extract": "false"})
+
+    assert _part_path(upload_id).read_bytes() == data
+    assert not (tmp_path / "jobs").exists() or not any((tmp_path / "jobs").iterdir())
+
+
+def test_idle_upload_caches_are_evicted(client, storage, tmp_path, monkeypatch):
+    from app.api.routes import uploads
+
+    upload_id = _create(client, 10)
+    client.patch(f"/uploads/{upload_id}", content=b"abcd", headers={"Upload-Offset": "0"})
+    assert upload_id in uploads._hashers and upload_id in uploads._patch_locks
+
+    monkeypatch.setattr(uploads, "_next_eviction", 0.0)
+    uploads._evict_idle(uploads._last_patch[upload_id] + uploads.UPLOAD_IDLE_SEC + 1)
+
+    assert upload_id not in uploads._hashers
+    assert upload_id not in uploads._patch_locks
+
+    # the client resumes as usual; finalize hashes the part file
+    client.patch(f"/uploads/{upload_id}", content=b"efghij", headers={"Upload-Offset": "4"})
+    res = client.post(f"/uploads/{upload_id}/finalize", data={"run_extract": "false"})
+    assert res.json()["content_sha256"] == hashlib.sha256(b"abcdefghij").hexdigest()
+
+
+def test_chunks_on_another_process_are_hashed_once_at_finalize(client, storage, tmp_path, mocker):
+    from app.api.routes import uploads
+
+    data = b"0123456789" * 10
+    upload_id = _create(client, len(data))
+    client.patch(f"/uploads/{upload_id}", content=data[:20], headers={"Upload-Offset": "0"})
+    hash_file = mocker.spy(uploads, "_hash_prefix")
+
+    for off in range(20, len(data), 20):
+        uploads._hashers.clear()  # each chunk lands on a process without the running hash
+        res = client.patch(f"/uploads/{upload_id}", content=data[off:off + 20], headers={"Upload-Offset": str(off)})
+        assert res.status_code == 204
+    hash_file.assert_not_called()
+
+    res = client.post(f"/uploads/{upload_id}/finalize", data={"run_extract": "false"})
+    assert res.json()["content_sha256"] == hashlib.sha256(data).hexdigest()
+    hash_file.assert_called_once()
@@ -8,10 +8,11 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from app.main import app
-from app.persistence.db import get_db
+from app.persistence.db import get_async_db, get_db
 
 from app.persistence.base import Base
 from app.persistence.tables import VideoJob, VideoAsset, SnapshotConfig
+from app.services.storage import LocalStorage, set_storage
 
 
 load_dotenv()
@@ -88,14 +89,57 @@ def snapshot_config(db_session, job):
     db_session.flush()
     return cfg
 
+class _AsyncSessionOverTestSession:
+    """
+    Async-session facade over the test session, so async routes see rows the
+    test added inside its (never committed) outer transaction.
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    async def execute(self, *args, **kwargs):
+        return self._session.execute(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return self._session.scalar(*args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return self._session.scalars(*args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return self._session.get(*args, **kwargs)
+
+    def add(self, obj):
+        self._session.add(obj)
+
+    async def commit(self):
+        self._session.commit()
+
+    async def rollback(self):
+        self._session.rollback()
+
+
 @pytest.fixture
 def client(db_session):
     def override_get_db():
         yield db_session
 
+    async def override_get_async_db():
+        yield _AsyncSessionOverTestSession(db_session)
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
     with TestClient(app) as c:
         yield c
 
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def storage(tmp_path):
+    """Local storage rooted at tmp_path for the duration of a test."""
+    local = LocalStorage(tmp_path)
+    set_storage(local)
+    yield local
+    set_storage(None)
@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.persistence import db as db_module
+from app.persistence.tables import Narrative, VideoJob
+
+
+@pytest.fixture
+def async_test_db(engine, monkeypatch):
+    """Point the real get_async_db at the test database, through the same URL mapping the app uses."""
+    monkeypatch.setattr(db_module, "ASYNC_DATABASE_URL", db_module._async_url(engine.url.render_as_string(hide_password=False)))
+    monkeypatch.setattr(db_module, "_async_engine", None)
+    monkeypatch.setattr(db_module, "_async_sessionmaker", None)
+
+    # the async engine has its own connections, so rows must really be committed
+    with engine.begin() as conn:
+        conn.execute(VideoJob.__table__.insert().values(job_id="async-job", status="completed"))
+        conn.execute(
+            Narrative.__table__.insert().values(
+                job_id="async-job", short_summary="Short", full_story="Full story", status="generated"
+            )
+        )
+    try:
+        yield
+    finally:
+        with engine.begin() as conn:
+            conn.execute(Narrative.__table__.delete().where(Narrative.job_id == "async-job"))
+            conn.execute(VideoJob.__table__.delete().where(VideoJob.job_id == "async-job"))
+
+
+def test_async_routes_read_through_get_async_db(async_test_db):
+    # no dependency override: the lifespan also disposes the async engine on exit
+    with TestClient(app) as client:
+        narrative = client.get("/jobs/async-job/narrative").json()
+        status = client.get("/jobs/async-job/narrative/status").json()
+        missing = client.get("/jobs/nope/narrative")
+
+    assert narrative["exists"] is True
+    assert narrative["narrative"]["full_story"] == "Full story"
+    assert status["status"] == "generated"
+    assert missing.status_code == 404
+    assert db_module.pool_metrics()["async"] is not None
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.persistence.tables import Snapshot, VideoJob
+from app.pipeline.derive import derive_snapshots
+from app.pipeline.master import MasterFrameWriter, master_key
+from app.services.storage import LocalStorage
+from app.services.storage.pack import open_pack
+
+
+def _extracted_job(db_session, job, tmp_path, n=3):
+    storage = LocalStorage(tmp_path)
+    with MasterFrameWriter(storage.local_path(master_key(job.job_id))) as w:
+        for i in range(n):
+            w.append(np.full((120, 320, 3), 40 * i, dtype=np.uint8))
+    for i in range(n):
+        db_session.add(Snapshot(
+            job_id=job.job_id,
+            timestamp_sec=i / 2.0,
+            uri=f"jobs/{job.job_id}/snapshots/{i + 1:06d}.jpg",
+            width=256,
+            height=96,
+        ))
+    db_session.flush()
+    old = tmp_path / "jobs" / job.job_id / "snapshots"
+    old.mkdir(parents=True)
+    (old / "000001.jpg").write_bytes(b"old")
+    return storage
+
+
+def test_derive_rebuilds_snapshots_from_master_frames(db_session, job, snapshot_config, tmp_path, mocker):
+    storage = _extracted_job(db_session, job, tmp_path)
+    old_ids = {s.snapshot_id for s in db_session.query(Snapshot).filter_by(job_id=job.job_id)}
+    extract = mocker.patch("app.pipeline.derive.extract_preprocess_persist_snapshots")
+
+    snapshot_config.resize_width = 160
+    snapshot_config.grayscale = True
+    snapshot_config.image_format = "png"
+    db_session.flush()
+
+    assert derive_snapshots(job.job_id, db_session, storage) == 3
+    extract.assert_not_called()
+
+    rows = db_session.query(Snapshot).filter_by(job_id=job.job_id).order_by(Snapshot.timestamp_sec).all()
+    assert [r.timestamp_sec for r in rows] == [0.0, 0.5, 1.0]
+    # a fresh prefix, so the old snapshots stayed readable until the swap
+    set_key = rows[0].uri.rsplit("/", 1)[0]
+    assert set_key.startswith(f"jobs/{job.job_id}/snapshots/derived-")
+    assert [r.uri for r in rows] == [f"{set_key}/{i:06d}.png" for i in (1, 2, 3)]
+    assert (rows[0].width, rows[0].height) == (160, 60)
+    assert not {r.snapshot_id for r in rows} & old_ids  # new ids, so versioned URLs change
+
+    snapshots_dir = tmp_path / "jobs" / job.job_id / "snapshots"
+    # the replaced files are gone once the new rows are committed
+    assert [p.name for p in snapshots_dir.iterdir()] == [set_key.rsplit("/", 1)[1]]
+    assert sorted(p.name for p in (tmp_path / set_key).iterdir()) == ["000001.png", "000002.png", "000003.png"]
+    img = Image.open(tmp_path / set_key / "000003.png")
+    assert img.mode == "L" and img.size == (160, 60)
+    assert db_session.get(VideoJob, job.job_id).snapshot_count == 3
+
+
+def test_derive_into_pack(db_session, job, snapshot_config, tmp_path):
+    storage = _extracted_job(db_session, job, tmp_path)
+    snapshot_config.packed = True
+    db_session.flush()
+
+    derive_snapshots(job.job_id, db_session, storage)
+
+    rows = db_session.query(Snapshot).filter_by(job_id=job.job_id).order_by(Snapshot.timestamp_sec).all()
+    pack_key = rows[0].uri.split("#")[0]
+    assert pack_key.startswith(f"jobs/{job.job_id}/snapshots/derived-") and pack_key.endswith("/frames.pack")
+    assert [r.uri for r in rows] == [f"{pack_key}#{i}" for i in range(3)]
+    pack = open_pack(tmp_path / pack_key)
+    assert pack.count == 3
+    assert bytes(pack.frame(0)[:3]) == b"\xff\xd8\xff"
+
+
+def test_derive_without_complete_master_extracts_from_the_video(db_session, job, snapshot_config, tmp_path, mocker):
+    storage = _extracted_job(db_session, job, tmp_path, n=2)
+    db_session.add(Snapshot(job_id=job.job_id, timestamp_sec=5.0, uri="extra"))
+    db_session.flush()
+    extract = mocker.patch("app.pipeline.derive.extract_preprocess_persist_snapshots")
+    extract.return_value.files = [1, 2, 3]
+
+    assert derive_snapshots(job.job_id, db_session, storage) == 3
+    extract.assert_called_once_with(job.job_id, db_session, storage)
+
+
+def test_failed_derive_keeps_the_old_snapshots(db_session, job, snapshot_config, tmp_path, mocker):
+    storage = _extracted_job(db_session, job, tmp_path)
+    mocker.patch("app.pipeline.derive.cv2.imencode", return_value=(False, None))
+    rollback = mocker.spy(db_session, "rollback")
+
+    with pytest.raises(RuntimeError):
+        derive_snapshots(job.job_id, db_session, storage)
+
+    # the rows were never touched, and the half-written set is gone
+    rollback.assert_called_once()
+    snapshots_dir = tmp_path / "jobs" / job.job_id / "snapshots"
+    assert [p.name for p in snapshots_dir.iterdir()] == ["000001.jpg"]
+
+
+def test_derive_wider_than_the_master_extracts_from_the_video(db_session, job, snapshot_config, tmp_path, mocker):
+    storage = _extracted_job(db_session, job, tmp_path)
+    mocker.patch("app.pipeline.derive.MASTER_MAX_WIDTH", 320)
+    extract = mocker.patch("app.pipeline.derive.extract_preprocess_persist_snapshots")
+    extract.return_value.files = [1, 2, 3]
+    snapshot_config.resize_width = 640
+    db_session.flush()
+
+    assert derive_snapshots(job.job_id, db_session, storage) == 3
+    extract.assert_called_once_with(job.job_id, db_session, storage)
@@ -1,6 +1,7 @@
 from pathlib import Path
 
 from app.pipeline.extract import extract_preprocess_persist_snapshots
+from app.services.storage import LocalStorage
 
 def test_extract_creates_snapshot_files(
     db_session,
@@ -28,10 +29,146 @@ def test_extract_creates_snapshot_files(
     result = extract_preprocess_persist_snapshots(
         job_id=job.job_id,
         db=db_session,
-        storage_root=tmp_path,
+        storage=LocalStorage(tmp_path),
     )
 
     for f in result.files:
         assert f.exists()
 
-    assert len(list(snapshots_dir.glob("*.jpg"))) == 3
\ No newline at end of file
+    assert len(list(snapshots_dir.glob("*.jpg"))) == 3
+
+def test_extract_packed_appends_frames_to_one_file(
+    db_session,
+    job,
+    video_asset,
+    snapshot_config,
+    tmp_path,
+    mocker,
+):
+    from app.persistence.tables import Snapshot
+    from app.services.storage.pack import open_pack
+
+    snapshot_config.packed = True
+    db_session.flush()
+    storage = LocalStorage(tmp_path)
+
+    def fake_frames(video_path, out_pattern, fps):
+        for i in range(3):
+            f = Path(str(out_pattern) % (i + 1))
+            f.write_bytes(b"\xff\xd8\xff" + bytes([i]) * 10)
+            yield f
+
+    mocker.patch("app.pipeline.extract._iter_ffmpeg_frames", side_effect=fake_frames)
+    mocker.patch("app.pipeline.extract._process_frame", return_value=(256, 128))
+
+    extract_preprocess_persist_snapshots(job_id=job.job_id, db=db_session, storage=storage)
+
+    snapshots_dir = tmp_path / "jobs" / job.job_id / "snapshots"
+    assert list(snapshots_dir.rglob("*.jpg")) == []
+
+    rows = db_session.query(Snapshot).filter_by(job_id=job.job_id).order_by(Snapshot.timestamp_sec).all()
+    assert [r.uri for r in rows] == [f"jobs/{job.job_id}/snapshots/frames.pack#{i}" for i in range(3)]
+    assert bytes(open_pack(snapshots_dir / "frames.pack").frame(2)) == b"\xff\xd8\xff" + bytes([2]) * 10
+
+    # keyframe consumers get a real file back
+    assert storage.fetch(rows[1].uri).read_bytes() == b"\xff\xd8\xff" + bytes([1]) * 10
+
+def test_extract_preview_then_refine(
+    db_session,
+    job,
+    video_asset,
+    snapshot_config,
+    tmp_path,
+    mocker,
+):
+    from app.persistence.tables import Snapshot, VideoJob
+
+    snapshot_config.sampling_fps = 1.0
+    snapshot_config.preview_fps = 0.25  # every 4th full-rate timestamp
+    db_session.flush()
+    storage = LocalStorage(tmp_path)
+    preview_dir = tmp_path / "jobs" / job.job_id / "snapshots" / "preview"
+
+    def fake_preview(video_path, out_pattern, fps):
+        assert fps == 0.25
+        for i in range(4):  # 0, 4, 8 and 12, past the end of the full-rate pass
+            Path(str(out_pattern) % (i + 1)).write_bytes(b"preview")
+
+    seen = []
+
+    def fake_frames(video_path, out_pattern, fps):
+        for i in range(10):
+            db_session.expire_all()
+            rows = db_session.query(Snapshot).filter_by(job_id=job.job_id).order_by(Snapshot.timestamp_sec).all()
+            seen.append((db_session.get(VideoJob, job.job_id).snapshot_level, [r.timestamp_sec for r in rows]))
+            f = Path(str(out_pattern) % (i + 1))
+            f.write_bytes(b"exact")
+            yield f
+
+    mocker.patch("app.pipeline.extract._run_ffmpeg_preview", side_effect=fake_preview)
+    mocker.patch("app.pipeline.extract._iter_ffmpeg_frames", side_effect=fake_frames)
+    mocker.patch("app.pipeline.extract._process_frame", return_value=(256, 128))
+
+    extract_preprocess_persist_snapshots(job_id=job.job_id, db=db_session, storage=storage)
+
+    # the coarse timeline was complete before the first full-rate frame
+    assert seen[0] == (0, [0.0, 4.0, 8.0, 12.0])
+
+    rows = db_session.query(Snapshot).filter_by(job_id=job.job_id).order_by(Snapshot.timestamp_sec).all()
+    assert [r.timestamp_sec for r in rows] == [float(i) for i in range(10)]
+    assert [r.level for r in rows] == [0, 1, 1, 1, 0, 1, 1, 1, 0, 1]
+    assert all("/preview/" not in r.uri for r in rows)
+    assert not preview_dir.exists()
+
+    db_session.expire_all()
+    j = db_session.get(VideoJob, job.job_id)
+    assert (j.snapshot_level, j.snapshot_count) == (1, 10)
+
+def test_extract_refine_keeps_scene_links_to_preview_rows(
+    db_session,
+    job,
+    video_asset,
+    snapshot_config,
+    tmp_path,
+    mocker,
+):
+    from app.persistence.tables import SceneSnapshot, Snapshot
+    from app.pipeline.scenes import build_scene
+
+    snapshot_config.sampling_fps = 1.0
+    snapshot_config.preview_fps = 0.25
+    db_session.flush()
+    storage = LocalStorage(tmp_path)
+
+    def fake_preview(video_path, out_pattern, fps):
+        for i in range(2):  # 0 and 4
+            Path(str(out_pattern) % (i + 1)).write_bytes(b"preview")
+
+    linked = {}
+
+    def fake_frames(video_path, out_pattern, fps):
+        for i in range(6):
+            if i == 0:
+                # a scene built off the preview timeline before the full pass lands
+                scene = build_scene(db_session, job.job_id, 0, 6)
+                db_session.flush()
+                linked.update({s.snapshot_id: s.snapshot.timestamp_sec for s in scene.snapshot_links})
+            f = Path(str(out_pattern) % (i + 1))
+            f.write_bytes(b"exact")
+            yield f
+
+    mocker.patch("app.pipeline.extract._run_ffmpeg_preview", side_effect=fake_preview)
+    mocker.patch("app.pipeline.extract._iter_ffmpeg_frames", side_effect=fake_frames)
+    mocker.patch("app.pipeline.extract._process_frame", return_value=(256, 128))
+
+    extract_preprocess_persist_snapshots(job_id=job.job_id, db=db_session, storage=storage)
+
+    db_session.expire_all()
+    assert sorted(linked.values()) == [0.0, 4.0]
+    links = db_session.query(SceneSnapshot).filter(SceneSnapshot.snapshot_id.in_(list(linked))).all()
+    assert len(links) == 2
+    for link in links:
+        row = db_session.get(Snapshot, link.snapshot_id)
+        assert row.timestamp_sec == linked[link.snapshot_id]
+        assert "/preview/" not in row.uri
+        assert (row.width, row.height, row.level) == (256, 128, 0)
@@ -2,6 +2,7 @@ from pathlib import Path
 import pytest
 
 from app.pipeline.extract import extract_preprocess_persist_snapshots
+from app.services.storage import LocalStorage
 from app.persistence.tables import Snapshot, VideoAsset
 
 
@@ -35,7 +36,7 @@ def test_extract_pipeline_happy_path(
     result = extract_preprocess_persist_snapshots(
         job_id=job.job_id,
         db=db_session,
-        storage_root=tmp_path,
+        storage=LocalStorage(tmp_path),
     )
 
     saved = (
@@ -56,8 +57,12 @@ def test_extract_pipeline_happy_path(
     assert saved[2].timestamp_sec == 1.0
 
     assert saved[0].width == 256
+    assert saved[0].uri == f"jobs/{job.job_id}/snapshots/000001.jpg"
     assert saved[0].height == 128
 
+    db_session.refresh(job)
+    assert job.snapshot_count == 3
+
 
 def test_extract_raises_if_video_missing(
     db_session,
@@ -76,7 +81,7 @@ def test_extract_raises_if_video_missing(
         extract_preprocess_persist_snapshots(
             job_id=job.job_id,
             db=db_session,
-            storage_root=tmp_path,
+            storage=LocalStorage(tmp_path),
         )
 
 
@@ -107,7 +112,7 @@ def test_extract_handles_failed_frame_processing(
     extract_preprocess_persist_snapshots(
         job_id=job.job_id,
         db=db_session,
-        storage_root=tmp_path,
+        storage=LocalStorage(tmp_path),
     )
 
     saved = db_session.query(Snapshot).filter_by(job_id=job.job_id).one()
@@ -144,7 +149,7 @@ def test_extract_handles_no_frames(
         extract_preprocess_persist_snapshots(
             job_id=job.job_id,
             db=db_session,
-            storage_root=tmp_path,
+            storage=LocalStorage(tmp_path),
         )
 
     # Ensure nothing was written to DB
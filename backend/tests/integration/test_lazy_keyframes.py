@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from app.persistence.tables import Scene, SceneSnapshot, Snapshot, VideoJob
+from app.pipeline.derive import derive_snapshots
+from app.pipeline.lazy import ensure_scene_keyframes, plan_lazy_job
+from app.services.storage import LocalStorage
+
+
+def _lazy_job(db_session, video_asset, snapshot_config, duration=25.0):
+    snapshot_config.lazy = True
+    snapshot_config.sampling_fps = 1.0
+    video_asset.duration_sec = duration
+    db_session.flush()
+
+
+def _fake_seek(seeks):
+    def seek(video_path, timestamp_sec, out_path):
+        seeks.append(timestamp_sec)
+        Path(out_path).write_bytes(b"frame")
+        return True
+    return seek
+
+
+def test_plan_lays_out_scenes_without_decoding(db_session, job, video_asset, snapshot_config, tmp_path, mocker):
+    _lazy_job(db_session, video_asset, snapshot_config)
+    seek = mocker.patch("app.pipeline.lazy._seek_frame")
+
+    scene_ids = plan_lazy_job(job.job_id, db_session, LocalStorage(tmp_path))
+
+    scenes = db_session.query(Scene).filter_by(job_id=job.job_id).order_by(Scene.start_sec).all()
+    assert [s.scene_id for s in scenes] == scene_ids
+    assert [(s.start_sec, s.end_sec, s.snapshot_count) for s in scenes] == [(0, 10, 0), (10, 20, 0), (20, 30, 0)]
+    assert db_session.query(Snapshot).filter_by(job_id=job.job_id).count() == 0
+    seek.assert_not_called()
+
+
+def test_scene_keyframes_are_seeked_once(db_session, job, video_asset, snapshot_config, tmp_path, mocker):
+    _lazy_job(db_session, video_asset, snapshot_config)
+    storage = LocalStorage(tmp_path)
+    seeks = []
+    mocker.patch("app.pipeline.lazy._seek_frame", side_effect=_fake_seek(seeks))
+    mocker.patch("app.pipeline.lazy._process_frame", return_value=(256, 144))
+    _, _, last = plan_lazy_job(job.job_id, db_session, storage)
+
+    assert ensure_scene_keyframes(job.job_id, last, 3, db_session, storage) == 3
+    assert sorted(seeks) == [20.0, 22.0, 24.0]  # the video ends at 25 s
+
+    rows = db_session.query(Snapshot).filter_by(job_id=job.job_id).order_by(Snapshot.timestamp_sec).all()
+    assert [r.uri for r in rows] == [f"jobs/{job.job_id}/snapshots/{i:06d}.jpg" for i in (21, 23, 25)]
+    linked = {l.snapshot_id for l in db_session.query(SceneSnapshot).filter_by(scene_id=last)}
+    assert linked == {r.snapshot_id for r in rows}
+
+    db_session.expire_all()
+    assert db_session.get(Scene, last).snapshot_count == 3
+    assert db_session.get(VideoJob, job.job_id).snapshot_count == 3
+
+    # already there; a larger request only decodes the difference
+    assert ensure_scene_keyframes(job.job_id, last, 3, db_session, storage) == 0
+    assert ensure_scene_keyframes(job.job_id, last, 5, db_session, storage) == 2
+    assert sorted(seeks) == [20.0, 21.0, 22.0, 23.0, 24.0]
+
+
+def test_derive_drops_lazy_keyframes(db_session, job, video_asset, snapshot_config, tmp_path, mocker):
+    _lazy_job(db_session, video_asset, snapshot_config)
+    storage = LocalStorage(tmp_path)
+    mocker.patch("app.pipeline.lazy._seek_frame", side_effect=_fake_seek([]))
+    mocker.patch("app.pipeline.lazy._process_frame", return_value=(256, 144))
+    first, _, _ = plan_lazy_job(job.job_id, db_session, storage)
+    ensure_scene_keyframes(job.job_id, first, 2, db_session, storage)
+
+    assert derive_snapshots(job.job_id, db_session, storage) == 0
+
+    assert db_session.query(Snapshot).filter_by(job_id=job.job_id).count() == 0
+    assert db_session.query(Scene).filter_by(job_id=job.job_id).count() == 3
+    assert not (tmp_path / "jobs" / job.job_id / "snapshots").exists()
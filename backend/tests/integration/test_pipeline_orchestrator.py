@@ -0,0 +1,90 @@
+from app.persistence.tables import Narrative, Scene, Snapshot, VideoJob
+from app.pipeline import orchestrator
+
+
+def _fake_extract(db_session, timestamps, described_during_extract):
+    """Persist one snapshot per timestamp, reporting progress after each like the progressive extractor."""
+    def _extract(job_id, db, storage, on_progress=None):
+        for ts in timestamps:
+            db.add(Snapshot(job_id=job_id, timestamp_sec=ts, uri=f"/tmp/{ts}.jpg", width=4, height=4))
+            db.commit()
+            on_progress(ts)
+            described_during_extract.append(ts)
+    return _extract
+
+
+def test_full_pipeline_describes_scenes_while_extracting(db_session, job, snapshot_config, mocker):
+    job_id = job.job_id  # the orchestrator closes the session, detaching fixtures
+    progress = []
+    described = []
+
+    mocker.patch.object(orchestrator, "SessionLocal", return_value=db_session)
+    mocker.patch.object(
+        orchestrator,
+        "extract_preprocess_persist_snapshots",
+        side_effect=_fake_extract(db_session, [0, 5, 10, 15, 20, 25], progress),
+    )
+
+    def _describe(scene_id, keyframes=orchestrator.PIPELINE_KEYFRAMES):
+        described.append((scene_id, len(progress)))
+
+    def _narrate(jid, mode="auto"):
+        db_session.add(Narrative(job_id=jid, short_summary="s", full_story="story", status="generated"))
+        db_session.commit()
+
+    mocker.patch.object(orchestrator, "_describe_scene_job", side_effect=_describe)
+    mocker.patch.object(orchestrator, "_run_narrative_job", side_effect=_narrate)
+
+    orchestrator.run_full_pipeline(job_id)
+
+    saved = db_session.query(VideoJob).filter_by(job_id=job_id).one()
+    assert saved.status == "completed", saved.error
+    assert db_session.query(Scene).filter_by(job_id=job_id).count() == 3
+
+    # the first scene ([0, 10)) was handed off once the 10s frame existed, before extraction ended
+    assert len(described) == 3
+    assert described[0][1] < 6
+
+    for stage in ("pipeline", "extract", "describe", "narrative"):
+        assert saved.stage_timings[stage]["seconds"] >= 0
+
+
+def test_full_pipeline_marks_job_failed_when_describe_fails(db_session, job, snapshot_config, mocker):
+    job_id = job.job_id
+
+    mocker.patch.object(orchestrator, "SessionLocal", return_value=db_session)
+    mocker.patch.object(
+        orchestrator,
+        "extract_preprocess_persist_snapshots",
+        side_effect=_fake_extract(db_session, [0, 5], []),
+    )
+    mocker.patch.object(orchestrator, "_describe_scene_job", side_effect=RuntimeError("router down"))
+    narrate = mocker.patch.object(orchestrator, "_run_narrative_job")
+
+    orchestrator.run_full_pipeline(job_id)
+
+    saved = db_session.query(VideoJob).filter_by(job_id=job_id).one()
+    assert saved.status == "failed"
+    assert "router down" in saved.error
+    assert "finished_at" in saved.stage_timings["pipeline"]
+    narrate.assert_not_called()
+
+
+def test_scene_build_maintains_counts(db_session, job):
+    from app.pipeline.scenes import build_fixed_scenes
+
+    for ts in (0, 5, 10, 25):
+        db_session.add(Snapshot(job_id=job.job_id, timestamp_sec=ts, uri=f"/tmp/{ts}.jpg"))
+    db_session.flush()
+
+    assert build_fixed_scenes(db_session, job.job_id, 10, 25) == 3
+
+    db_session.refresh(job)
+    assert job.scene_count == 3
+    counts = [s.snapshot_count for s in db_session.query(Scene).filter_by(job_id=job.job_id).order_by(Scene.start_sec)]
+    assert counts == [2, 1, 1]
+
+    # rebuilding resets rather than accumulates
+    build_fixed_scenes(db_session, job.job_id, 10, 25)
+    db_session.refresh(job)
+    assert job.scene_count == 3
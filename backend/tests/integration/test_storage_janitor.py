@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.janitor import sweep
+from app.persistence.tables import JobArtifact, Snapshot, VideoAsset, VideoJob
+from app.pipeline.regenerate import regenerate_snapshots, restore_snapshots
+from app.services.storage import LocalStorage, artifacts
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+def _job_files(db_session, tmp_path, job_id, *, snapshots=0, thumbs=0, video=100, accessed=None, status="completed"):
+    db_session.add(VideoJob(job_id=job_id, status=status))
+    root = tmp_path / "jobs" / job_id
+    (root / "video").mkdir(parents=True)
+    (root / "video" / "original.mp4").write_bytes(b"v" * video)
+    if snapshots:
+        (root / "snapshots").mkdir()
+        (root / "snapshots" / "000001.jpg").write_bytes(b"s" * snapshots)
+    if thumbs:
+        (root / "snapshots" / "thumbs" / "256").mkdir(parents=True)
+        (root / "snapshots" / "thumbs" / "256" / "000001.jpg").write_bytes(b"t" * thumbs)
+    db_session.flush()
+    if accessed is not None:
+        for kind in ("video", "snapshots", "thumbs"):
+            db_session.add(JobArtifact(job_id=job_id, kind=kind, last_accessed_at=accessed))
+        db_session.flush()
+    return root
+
+
+def _artifact(db_session, job_id, kind):
+    return db_session.query(JobArtifact).filter_by(job_id=job_id, kind=kind).one()
+
+
+def test_sweep_records_usage_without_limits(db_session, tmp_path):
+    _job_files(db_session, tmp_path, "j1", snapshots=40, thumbs=5)
+
+    result = sweep(db_session, LocalStorage(tmp_path), quota_bytes=0, retention_days=0, now=NOW)
+
+    assert result.used_bytes == 145
+    assert result.evicted == [] and result.deleted_jobs == []
+    assert _artifact(db_session, "j1", "snapshots").bytes == 40
+    assert _artifact(db_session, "j1", "thumbs").bytes == 5
+
+
+def test_sweep_evicts_least_recently_used_derived_files(db_session, tmp_path):
+    old = _job_files(db_session, tmp_path, "old", snapshots=400, thumbs=50, accessed=NOW - timedelta(days=3))
+    _job_files(db_session, tmp_path, "newer", snapshots=400, thumbs=50, accessed=NOW - timedelta(days=2))
+    _job_files(db_session, tmp_path, "recent", snapshots=400, accessed=NOW - timedelta(minutes=5))
+    _job_files(db_session, tmp_path, "running", snapshots=400, status="processing", accessed=NOW - timedelta(days=9))
+
+    # 4 videos (400) + 1600 snapshots + 100 thumbs = 2100; evict down to 90% of 1800
+    result = sweep(db_session, LocalStorage(tmp_path), quota_bytes=1800, now=NOW)
+
+    # least recently used job first, thumbs before snapshots; never the video,
+    # recently used or running jobs
+    assert result.evicted == [("old", "thumbs", 50), ("old", "snapshots", 400), ("newer", "thumbs", 50)]
+    assert result.used_bytes == 1600
+    assert not (old / "snapshots").exists()
+    assert (old / "video" / "original.mp4").exists()
+
+    snaps = _artifact(db_session, "old", "snapshots")
+    assert snaps.bytes == 0 and snaps.evicted_at is not None
+    # thumbs come back on their own, so they stay evictable
+    assert _artifact(db_session, "old", "thumbs").evicted_at is None
+    assert _artifact(db_session, "newer", "snapshots").evicted_at is None
+
+
+def test_sweep_deletes_jobs_past_retention(db_session, tmp_path):
+    stale = _job_files(db_session, tmp_path, "stale", snapshots=10, accessed=NOW - timedelta(days=40))
+    _job_files(db_session, tmp_path, "fresh", snapshots=10, accessed=NOW - timedelta(days=1))
+
+    result = sweep(db_session, LocalStorage(tmp_path), retention_days=30, now=NOW)
+
+    assert result.deleted_jobs == ["stale"]
+    assert not stale.exists()
+    assert db_session.query(VideoJob).filter_by(job_id="stale").first() is None
+    assert db_session.query(VideoJob).filter_by(job_id="fresh").first() is not None
+
+
+def _evicted_job(db_session, job, snapshot_config, tmp_path):
+    db_session.add(VideoAsset(job_id=job.job_id, uri=f"jobs/{job.job_id}/video/original.mp4"))
+    (tmp_path / "jobs" / job.job_id / "video").mkdir(parents=True)
+    (tmp_path / "jobs" / job.job_id / "video" / "original.mp4").write_bytes(b"video")
+    for i in range(3):
+        db_session.add(Snapshot(job_id=job.job_id, timestamp_sec=i / 2.0, uri=f"jobs/{job.job_id}/snapshots/{i + 1:06d}.jpg"))
+    db_session.add(JobArtifact(job_id=job.job_id, kind="snapshots", last_accessed_at=NOW, evicted_at=NOW))
+    db_session.flush()
+
+
+def _fake_frames(video_path, out_pattern, fps):
+    for i in range(3):
+        f = Path(str(out_pattern) % (i + 1))
+        f.write_bytes(b"\xff\xd8\xff" + bytes([i]) * 10)
+        yield f
+
+
+def test_touch_reports_evicted_snapshots_and_restore_regenerates_them(
+    db_session, job, snapshot_config, tmp_path, storage, mocker
+):
+    _evicted_job(db_session, job, snapshot_config, tmp_path)
+    ids = [s.snapshot_id for s in db_session.query(Snapshot).filter_by(job_id=job.job_id)]
+    mocker.patch("app.pipeline.regenerate._iter_ffmpeg_frames", side_effect=_fake_frames)
+    mocker.patch("app.pipeline.regenerate._process_frame", return_value=(256, 128))
+    artifacts.forget_touches()
+
+    assert artifacts.touch(db_session, job.job_id) == ["snapshots"]
+    assert restore_snapshots(job.job_id, db_session) is True
+
+    snapshots_dir = tmp_path / "jobs" / job.job_id / "snapshots"
+    assert sorted(p.name for p in snapshots_dir.glob("*.jpg")) == ["000001.jpg", "000002.jpg", "000003.jpg"]
+    # rows untouched, so scene links and URLs stay valid
+    assert sorted(s.snapshot_id for s in db_session.query(Snapshot).filter_by(job_id=job.job_id)) == sorted(ids)
+    assert not artifacts.is_evicted(db_session, job.job_id)
+    assert restore_snapshots(job.job_id, db_session) is False
+    assert artifacts.touch(db_session, job.job_id) == []
+
+
+def test_regenerate_rebuilds_the_pack(db_session, job, snapshot_config, tmp_path, mocker):
+    from app.services.storage.pack import open_pack
+
+    snapshot_config.packed = True
+    _evicted_job(db_session, job, snapshot_config, tmp_path)
+    for i, s in enumerate(db_session.query(Snapshot).filter_by(job_id=job.job_id).order_by(Snapshot.timestamp_sec)):
+        s.uri = f"jobs/{job.job_id}/snapshots/frames.pack#{i}"
+    db_session.flush()
+    mocker.patch("app.pipeline.regenerate._iter_ffmpeg_frames", side_effect=_fake_frames)
+    mocker.patch("app.pipeline.regenerate._process_frame", return_value=(256, 128))
+
+    assert regenerate_snapshots(job.job_id, db_session, LocalStorage(tmp_path)) == 3
+
+    snapshots_dir = tmp_path / "jobs" / job.job_id / "snapshots"
+    assert bytes(open_pack(snapshots_dir / "frames.pack").frame(1)) == b"\xff\xd8\xff" + bytes([1]) * 10
+    assert list(snapshots_dir.rglob("*.jpg")) == []
+
+
+def test_sweep_never_evicts_within_the_touch_interval(db_session, tmp_path):
+    _job_files(db_session, tmp_path, "reading", snapshots=400, accessed=NOW - timedelta(seconds=10))
+
+    result = sweep(db_session, LocalStorage(tmp_path), quota_bytes=100, min_idle_sec=0, now=NOW)
+
+    assert result.evicted == []
+
+
+def test_missing_file_of_a_job_that_is_not_evicted_skips_the_restore(db_session, tmp_path, mocker):
+    from app.pipeline import regenerate
+
+    session = mocker.patch.object(regenerate, "SessionLocal", return_value=db_session)
+    restore = mocker.patch.object(regenerate, "restore_snapshots")
+    mocker.patch.dict(regenerate._not_evicted, clear=True)
+
+    assert regenerate.restore_missing_file("jobs/nope/snapshots/000001.jpg") is False
+    assert regenerate.restore_missing_file("jobs/nope/snapshots/000002.jpg") is False
+
+    restore.assert_not_called()
+    # the second miss is answered from the throttle, without a session
+    assert session.call_count == 1
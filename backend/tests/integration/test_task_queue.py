@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.persistence.tables import Task
+from app.pipeline.queue import claim, complete, enqueue, fail, heartbeat
+
+
+def test_claim_marks_running_with_lease(db_session, job):
+    task = enqueue(db_session, "extract", job.job_id)
+
+    claimed = claim(db_session, "w1")
+
+    assert claimed.task_id == task.task_id
+    assert claimed.status == "running"
+    assert claimed.attempts == 1
+    assert claimed.worker_id == "w1"
+    assert claimed.lease_expires_at is not None
+
+    # nothing else is runnable
+    assert claim(db_session, "w2") is None
+
+
+def test_claim_filters_by_kind(db_session, job):
+    enqueue(db_session, "narrative", job.job_id)
+
+    assert claim(db_session, "w1", kinds=["extract"]) is None
+    assert claim(db_session, "w1", kinds=["narrative"]).kind == "narrative"
+
+
+def test_fail_requeues_with_backoff_then_gives_up(db_session, job):
+    enqueue(db_session, "extract", job.job_id, max_attempts=2)
+
+    task = claim(db_session, "w1")
+    fail(db_session, task, "boom")
+
+    assert task.status == "queued"
+    assert task.last_error == "boom"
+    # backoff: not runnable yet
+    assert claim(db_session, "w1") is None
+
+    task.run_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+    task = claim(db_session, "w1")
+    assert task.attempts == 2
+    fail(db_session, task, "boom again")
+
+    assert task.status == "failed"
+    assert task.finished_at is not None
+
+
+def test_expired_lease_is_reclaimed(db_session, job):
+    enqueue(db_session, "extract", job.job_id)
+    task = claim(db_session, "dead-worker")
+
+    task.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+    reclaimed = claim(db_session, "w2")
+
+    assert reclaimed.task_id == task.task_id
+    assert reclaimed.worker_id == "w2"
+    assert reclaimed.attempts == 2
+    assert heartbeat(db_session, task.task_id, "dead-worker") is False
+    assert heartbeat(db_session, task.task_id, "w2") is True
+
+
+def test_expired_lease_on_last_attempt_fails_the_task(db_session, job):
+    enqueue(db_session, "extract", job.job_id, max_attempts=1)
+    task = claim(db_session, "dead-worker")
+
+    task.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+    assert claim(db_session, "w2") is None
+    saved = db_session.query(Task).filter_by(task_id=task.task_id).one()
+    assert saved.status == "failed"
+    assert saved.attempts == 1
+    assert saved.finished_at is not None
+
+
+def test_reclaimed_task_ignores_the_old_workers_outcome(db_session, job):
+    enqueue(db_session, "extract", job.job_id)
+    task = claim(db_session, "dead-worker")
+    # what the dead worker still holds in memory
+    stale = SimpleNamespace(task_id=task.task_id, worker_id="dead-worker", attempts=1, max_attempts=3)
+
+    task.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+    claim(db_session, "w2")
+
+    assert complete(db_session, stale) is False
+    assert fail(db_session, stale, "late") is False
+
+    saved = db_session.query(Task).filter_by(task_id=stale.task_id).one()
+    assert saved.status == "running"
+    assert saved.worker_id == "w2"
+    assert saved.last_error is None
+
+
+def test_complete(db_session, job):
+    enqueue(db_session, "extract", job.job_id)
+    task = claim(db_session, "w1")
+
+    complete(db_session, task)
+
+    saved = db_session.query(Task).filter_by(task_id=task.task_id).one()
+    assert saved.status == "done"
+    assert saved.finished_at is not None
+
+
+def test_run_once_requeues_failed_task(db_session, job, mocker):
+    from app import worker
+
+    job_id = job.job_id  # run_once closes the session, detaching fixtures
+    task_id = enqueue(db_session, "extract", job_id).task_id
+
+    mocker.patch.object(worker, "SessionLocal", return_value=db_session)
+    mocker.patch.object(worker, "_keep_leased")  # would share (and close) the test session
+    mocker.patch.dict(worker.HANDLERS, {"extract": mocker.Mock(side_effect=RuntimeError("ffmpeg"))})
+
+    assert worker.run_once("w1") is True
+
+    saved = db_session.query(Task).filter_by(task_id=task_id).one()
+    assert saved.status == "queued"
+    assert saved.last_error == "ffmpeg"
+    assert worker.run_once("w1") is False
+
+
+def test_run_once_abandons_handler_after_losing_lease(db_session, job, mocker):
+    import threading
+
+    from app import worker
+
+    job_id = job.job_id
+    task_id = enqueue(db_session, "extract", job_id).task_id
+    finished = threading.Event()
+
+    mocker.patch.object(worker, "SessionLocal", return_value=db_session)
+    mocker.patch.object(worker, "_keep_leased", side_effect=lambda *args: args[-1].set())
+    mocker.patch.dict(worker.HANDLERS, {"extract": mocker.Mock(side_effect=lambda task: finished.wait(1.2) or finished.set())})
+
+    assert worker.run_once("w1") is True
+    # the abandoned handler held the slot until it exited
+    assert finished.is_set()
+
+    # neither completed nor failed: whoever reclaims the lease records the outcome
+    saved = db_session.query(Task).filter_by(task_id=task_id).one()
+    assert saved.status == "running"
+
+
+def _job_with_duration(db_session, job_id, duration_sec, tenant=None, priority="normal"):
+    from app.persistence.tables import SnapshotConfig, VideoAsset, VideoJob
+
+    db_session.add(VideoJob(job_id=job_id, status="uploaded", tenant=tenant, priority=priority))
+    db_session.add(VideoAsset(job_id=job_id, uri=f"/tmp/{job_id}.mp4", duration_sec=duration_sec))
+    db_session.add(SnapshotConfig(job_id=job_id, sampling_fps=1.0, chunk_length_sec=10))
+    db_session.flush()
+    return job_id
+
+
+def test_claim_prefers_shortest_job(db_session):
+    long_id = _job_with_duration(db_session, "long", 3 * 3600)
+    short_id = _job_with_duration(db_session, "short", 30)
+
+    enqueue(db_session, "extract", long_id)
+    enqueue(db_session, "extract", short_id)
+
+    assert claim(db_session, "w1").job_id == short_id
+    assert claim(db_session, "w1").job_id == long_id
+
+
+def test_aging_lets_a_long_waiting_job_run_first(db_session):
+    long_id = _job_with_duration(db_session, "long", 3 * 3600)
+    short_id = _job_with_duration(db_session, "short", 30)
+
+    old = enqueue(db_session, "extract", long_id)
+    enqueue(db_session, "extract", short_id)
+
+    # pretend the long job has waited long enough to have aged past the short one
+    old.sched_key -= 3 * 3600
+    db_session.commit()
+
+    assert claim(db_session, "w1").job_id == long_id
+
+
+def test_claim_respects_priority_class(db_session):
+    batch_id = _job_with_duration(db_session, "batch", 30, priority="batch")
+    interactive_id = _job_with_duration(db_session, "interactive", 600, priority="interactive")
+
+    enqueue(db_session, "extract", batch_id)
+    enqueue(db_session, "extract", interactive_id)
+
+    assert claim(db_session, "w1").job_id == interactive_id
+
+
+def test_claim_shares_workers_between_tenants(db_session):
+    a1 = _job_with_duration(db_session, "a1", 30, tenant="a")
+    a2 = _job_with_duration(db_session, "a2", 30, tenant="a")
+    b1 = _job_with_duration(db_session, "b1", 60, tenant="b")
+
+    for job_id in (a1, a2, b1):
+        enqueue(db_session, "extract", job_id)
+
+    assert claim(db_session, "w1").job_id == a1
+    # tenant a already has a task running, so b's slightly larger job goes next
+    assert claim(db_session, "w2").job_id == b1
+    assert claim(db_session, "w3").job_id == a2
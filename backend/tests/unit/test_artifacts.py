@@ -0,0 +1,53 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.static import CachedStaticFiles
+from app.services.storage import LocalStorage, artifacts
+
+
+def test_classify_job_files():
+    assert artifacts.classify("video/original.mp4") == artifacts.VIDEO
+    assert artifacts.classify("snapshots/000001.jpg") == artifacts.SNAPSHOTS
+    assert artifacts.classify("snapshots/frames.pack") == artifacts.SNAPSHOTS
+    assert artifacts.classify("snapshots/frames.pack.idx") == artifacts.SNAPSHOTS
+    assert artifacts.classify("snapshots/frames.pack.d/000003.jpg") == artifacts.FRAMES
+    assert artifacts.classify("snapshots/thumbs/256/000001.jpg") == artifacts.THUMBS
+    assert artifacts.classify("snapshots/frames.pack.d/thumbs/256/000003.jpg") == artifacts.THUMBS
+    assert artifacts.classify("master/frames.pack") == artifacts.MASTER
+    assert artifacts.classify("notes.txt") == artifacts.OTHER
+
+
+def test_scan_sums_bytes_per_kind(tmp_path):
+    root = tmp_path / "jobs" / "j1"
+    (root / "video").mkdir(parents=True)
+    (root / "video" / "original.mp4").write_bytes(b"v" * 100)
+    (root / "snapshots" / "thumbs" / "256").mkdir(parents=True)
+    (root / "snapshots" / "000001.jpg").write_bytes(b"s" * 10)
+    (root / "snapshots" / "000002.jpg").write_bytes(b"s" * 10)
+    (root / "snapshots" / "thumbs" / "256" / "000001.jpg").write_bytes(b"t" * 3)
+
+    assert artifacts.scan(LocalStorage(tmp_path), "j1") == {"video": 100, "snapshots": 20, "thumbs": 3}
+    assert artifacts.scan(LocalStorage(tmp_path), "missing") == {}
+
+
+def test_static_miss_is_retried_after_on_missing_recreates_the_file(tmp_path):
+    calls = []
+
+    def on_missing(path):
+        calls.append(path)
+        if path == "jobs/j1/snapshots/000001.jpg":
+            (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / path).write_bytes(b"regenerated")
+            return True
+        return False
+
+    app = FastAPI()
+    app.mount("/storage", CachedStaticFiles(directory=str(tmp_path), on_missing=on_missing), name="storage")
+    client = TestClient(app)
+
+    res = client.get("/storage/jobs/j1/snapshots/000001.jpg?v=1")
+    assert res.status_code == 200
+    assert res.content == b"regenerated"
+
+    assert client.get("/storage/jobs/j1/snapshots/000002.jpg").status_code == 404
+    assert calls == ["jobs/j1/snapshots/000001.jpg", "jobs/j1/snapshots/000002.jpg"]
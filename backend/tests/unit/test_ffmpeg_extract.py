@@ -11,4 +11,29 @@ def test_ffmpeg_called(mocker):
 
     assert "ffmpeg" in args
     assert "-vf" in args
-    assert "fps=2.0" in args
\ No newline at end of file
+    assert "fps=2.0" in args
+
+def test_preview_decodes_keyframes_only(mocker):
+    from app.pipeline.extract import _run_ffmpeg_preview
+
+    mock_run = mocker.patch("subprocess.run")
+
+    _run_ffmpeg_preview(Path("in.mp4"), Path("out_%06d.jpg"), 0.1)
+
+    args = mock_run.call_args[0][0]
+    assert args.index("-skip_frame") < args.index("-i")
+    assert args[args.index("-skip_frame") + 1] == "nokey"
+    assert "fps=0.1" in args
+
+
+def test_preview_grid_is_a_subset_of_the_full_rate_grid():
+    from app.persistence.tables import SnapshotConfig
+    from app.pipeline.extract import density_levels, preview_every
+
+    assert preview_every(SnapshotConfig(sampling_fps=1.0, preview_fps=0.1)) == 10
+    assert preview_every(SnapshotConfig(sampling_fps=0.3, preview_fps=0.1)) == 3
+    assert preview_every(SnapshotConfig(sampling_fps=0.15, preview_fps=0.1)) == 2
+    assert preview_every(SnapshotConfig(sampling_fps=0.1, preview_fps=0.1)) == 0
+    assert preview_every(SnapshotConfig(sampling_fps=1.0, preview_fps=None)) == 0
+    assert density_levels(SnapshotConfig(sampling_fps=2.0, preview_fps=0.5)) == [0.5, 2.0]
+    assert density_levels(SnapshotConfig(sampling_fps=2.0, preview_fps=0)) == [2.0]
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+
+from app.pipeline.fingerprint import dhash, find_similar, fingerprint_distance, scene_fingerprint
+
+
+def _write(path, img):
+    cv2.imwrite(str(path), img)
+    return path
+
+
+def _gradient(w=320, h=180, flip=False):
+    row = np.linspace(0, 255, w, dtype=np.uint8)
+    img = np.tile(row, (h, 1))
+    if flip:
+        img = img[:, ::-1]
+    return np.stack([img] * 3, axis=2)
+
+
+def test_dhash_stable_under_reencoding(tmp_path):
+    a = _write(tmp_path / "a.jpg", _gradient())
+    b = tmp_path / "b.jpg"
+    cv2.imwrite(str(b), _gradient(), [cv2.IMWRITE_JPEG_QUALITY, 40])
+
+    assert (dhash(a) ^ dhash(b)).bit_count() <= 2
+
+
+def test_dhash_unreadable_file(tmp_path):
+    p = tmp_path / "broken.jpg"
+    p.write_bytes(b"not an image")
+
+    assert dhash(p) is None
+
+
+def test_find_similar_matches_repeated_shot(tmp_path):
+    same = scene_fingerprint([_write(tmp_path / "1.jpg", _gradient())])
+    repeat = scene_fingerprint([_write(tmp_path / "2.jpg", _gradient())])
+    other = scene_fingerprint([_write(tmp_path / "3.jpg", _gradient(flip=True))])
+
+    assert fingerprint_distance(same, repeat) == 0
+    assert find_similar(repeat, {"intro": same, "other": other}) == "intro"
+    assert find_similar(other, {"intro": same}) is None
+
+
+def test_fingerprint_distance_empty_is_infinite():
+    assert fingerprint_distance([], [1]) == float("inf")
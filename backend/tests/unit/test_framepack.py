@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.storage.pack import (
+    FramePackReader,
+    FramePackWriter,
+    frame_uri,
+    image_type,
+    open_pack,
+    split_frame_uri,
+)
+
+JPEG = b"\xff\xd8\xff\xe0" + b"jpeg-body"
+PNG = b"\x89PNG\r\n\x1a\n" + b"png-body"
+
+
+def test_roundtrip(tmp_path):
+    path = tmp_path / "frames.pack"
+    with FramePackWriter(path) as w:
+        assert w.append(JPEG) == 0
+        assert w.append(PNG) == 1
+
+    r = FramePackReader(path)
+    assert r.count == 2
+    assert bytes(r.frame(0)) == JPEG
+    assert bytes(r.frame(1)) == PNG
+    assert r.entry(1) == (len(JPEG), len(PNG))
+    with pytest.raises(IndexError):
+        r.frame(2)
+
+
+def test_reader_sees_frames_appended_while_open(tmp_path):
+    path = tmp_path / "frames.pack"
+    w = FramePackWriter(path)
+    w.append(JPEG)
+    w.flush()
+    assert open_pack(path).count == 1
+
+    w.append(PNG)
+    w.flush()
+    assert bytes(open_pack(path).frame(1)) == PNG
+    w.close()
+
+
+def test_rewrite_changes_pack_id(tmp_path):
+    path = tmp_path / "frames.pack"
+    with FramePackWriter(path) as w:
+        w.append(JPEG)
+    first = open_pack(path).pack_id
+
+    with FramePackWriter(path) as w:
+        w.append(PNG)
+    reader = open_pack(path)
+    assert reader.pack_id != first
+    assert bytes(reader.frame(0)) == PNG
+
+
+def test_uris_and_types():
+    uri = frame_uri("jobs/j1/snapshots/frames.pack", 7)
+    assert split_frame_uri(uri) == ("jobs/j1/snapshots/frames.pack", 7)
+    assert split_frame_uri("jobs/j1/snapshots/000001.jpg") is None
+    assert image_type(JPEG) == (".jpg", "image/jpeg")
+    assert image_type(PNG) == (".png", "image/png")
@@ -0,0 +1,41 @@
+import pytest
+
+from app.services.llm.hf_text_client import HierarchyConfig, condense_scene_lines, parse_narrative_response
+
+
+def test_parse_narrative_salvages_json_block():
+    raw = 'Here you go:\n{"narrative": " Story ", "summary": ["- a", "- b"], "structured": {"setting": "room"}}'
+
+    result = parse_narrative_response(raw)
+
+    assert result.narrative == "Story"
+    assert result.summary == "- a - b"
+    assert result.structured == {"setting": "room"}
+
+
+def test_parse_narrative_rejects_non_json():
+    with pytest.raises(RuntimeError):
+        parse_narrative_response("no json here")
+
+
+def test_condense_scene_lines_map_reduce():
+    lines = [f"{i * 10}-{(i + 1) * 10}s: scene {i}" for i in range(100)]
+    calls = []
+
+    def fake_summarize(window):
+        calls.append(len(window))
+        return f"summary of {len(window)}"
+
+    out = condense_scene_lines(lines, HierarchyConfig(window_size=10, fan_in=4), fake_summarize)
+
+    # 100 lines -> 10 windows -> 3 groups of <= 4 partials
+    assert calls.count(10) == 10
+    assert len(out) == 3
+    assert out[0].startswith("0-400s: ")
+    assert out[-1].startswith("800-1000s: ")
+
+
+def test_condense_scene_lines_short_input_untouched():
+    lines = ["0-10s: a", "10-20s: b"]
+
+    assert condense_scene_lines(lines, HierarchyConfig(window_size=10, fan_in=4), lambda w: "x") == lines
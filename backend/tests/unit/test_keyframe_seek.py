@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from app.pipeline.lazy import _seek_frame, keyframe_indices
+
+
+def test_keyframe_indices_stay_on_the_sampling_grid():
+    # [10, 20) at 2 fps holds full-rate frames 20..39
+    assert keyframe_indices(10, 20, 2.0, 100.0, 3) == [20, 30, 39]
+    assert keyframe_indices(10, 20, 2.0, 100.0, 50) == list(range(20, 40))
+
+
+def test_keyframe_indices_stop_at_the_end_of_the_video():
+    assert keyframe_indices(20, 30, 1.0, 24.5, 10) == [20, 21, 22, 23, 24]
+    assert keyframe_indices(20, 30, 1.0, 20.0, 4) == []
+
+
+def test_seek_runs_before_the_input(mocker, tmp_path):
+    out = tmp_path / "000021.jpg"
+    mock_run = mocker.patch("subprocess.run", side_effect=lambda *a, **k: out.write_bytes(b"x"))
+
+    assert _seek_frame(Path("in.mp4"), 20.0, out)
+
+    args = mock_run.call_args[0][0]
+    assert args.index("-ss") < args.index("-i")
+    assert args[args.index("-ss") + 1] == "20.000000"
+    assert args[args.index("-frames:v") + 1] == "1"
@@ -0,0 +1,30 @@
+import numpy as np
+
+from app.pipeline import master as master_mod
+from app.pipeline.master import MasterFrameWriter, decode_master
+from app.services.storage.pack import open_pack
+
+
+def test_master_frames_are_capped_and_decoded_at_reduced_scale(tmp_path, monkeypatch):
+    monkeypatch.setattr(master_mod, "MASTER_MAX_WIDTH", 800)
+    frame = np.zeros((900, 1600, 3), dtype=np.uint8)
+    frame[:, 800:] = 200
+
+    with MasterFrameWriter(tmp_path / "frames.pack") as w:
+        w.append(frame)
+        w.append(frame[:, :400])
+    reader = open_pack(tmp_path / "frames.pack")
+    assert reader.count == 2
+
+    full = decode_master(reader.frame(0), 0, None)
+    assert full.shape == (450, 800, 3)
+
+    # 800 / 4 = 200 still covers a 160 wide target, 800 / 8 doesn't
+    reduced = decode_master(reader.frame(0), 800, 160)
+    assert reduced.shape == (113, 200, 3)
+
+    gray = decode_master(reader.frame(0), 800, 90, grayscale=True)
+    assert gray.shape == (57, 100)
+
+    # narrower than the cap: stored as is
+    assert decode_master(reader.frame(1), 0, None).shape == (900, 400, 3)
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.responses import CompressionMiddleware, FastJSONResponse, _accepts
+
+
+def _client(minimum_size=100):
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+
+    @app.get("/items")
+    def items(n: int = 100):
+        return {"items": [{"id": i, "name": f"item-{i}"} for i in range(n)]}
+
+    return TestClient(app)
+
+
+def test_fast_json_response_renders_like_json():
+    body = FastJSONResponse({"a": 1.5, "b": [None, True], "when": datetime(2024, 1, 2, tzinfo=timezone.utc)}).body
+    assert body.startswith(b'{"a":1.5,"b":[null,true],"when":"2024-01-02T00:00:00')
+
+
+def test_accepts():
+    assert _accepts("gzip, deflate, br", "br")
+    assert _accepts("br;q=0.5", "br")
+    assert not _accepts("br;q=0, gzip", "br")
+    assert not _accepts("gzip", "br")
+
+
+def test_gzip_above_threshold_only():
+    client = _client()
+
+    res = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["vary"] == "Accept-Encoding"
+    assert len(res.json()["items"]) == 100
+
+    res = client.get("/items?n=1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+
+
+def test_brotli_preferred_when_accepted():
+    pytest.importorskip("brotli")
+    client = _client()
+
+    res = client.get("/items", headers={"Accept-Encoding": "gzip, br"})
+    assert res.headers["content-encoding"] == "br"
@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta, timezone
+
+from app.pipeline.scheduling import AGING_RATE, schedule_key
+
+
+def test_schedule_key_prefers_cheaper_jobs():
+    now = datetime.now(timezone.utc)
+    assert schedule_key(now, 30, "normal") < schedule_key(now, 10_800, "normal")
+
+
+def test_schedule_key_ages_waiting_jobs():
+    now = datetime.now(timezone.utc)
+    waited = timedelta(seconds=(10_800 - 30) / AGING_RATE + 1)
+
+    assert schedule_key(now - waited, 10_800, "normal") < schedule_key(now, 30, "normal")
+
+
+def test_schedule_key_priority_classes():
+    now = datetime.now(timezone.utc)
+    assert schedule_key(now, 100, "interactive") < schedule_key(now, 100, "normal") < schedule_key(now, 100, "batch")
+    # unknown classes fall back to normal
+    assert schedule_key(now, 100, "bogus") == schedule_key(now, 100, "normal")
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["result"] * 5
+
+
+def test_singleflight_runs_again_after_completion():
+    flight = SingleFlight()
+    calls = []
+
+    flight.do("key", lambda: calls.append(1))
+    flight.do("key", lambda: calls.append(1))
+
+    assert len(calls) == 2
+
+
+def test_singleflight_propagates_errors():
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", boom)
+
+
+def test_singleflight_lead_shares_result_with_do_callers():
+    flight = SingleFlight()
+    calls = []
+    results = []
+    entered = threading.Event()
+
+    def lead():
+        with flight.lead("key") as call:
+            entered.set()
+            time.sleep(0.1)
+            call.result = "streamed"
+
+    def follow_lead():
+        with flight.lead("key") as call:
+            results.append(call)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    entered.wait()
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("key", lambda: calls.append(1)))),
+        threading.Thread(target=follow_lead),
+    ]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert calls == []
+    assert sorted(results, key=str) == [None, "streamed"]
+
+
+def test_singleflight_do_runs_fn_when_leader_leaves_without_result():
+    flight = SingleFlight()
+    entered = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def lead():
+        with flight.lead("key"):
+            entered.set()
+            release.wait()
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    entered.wait()
+    follower = threading.Thread(target=lambda: results.append(flight.do("key", lambda: "own")))
+    follower.start()
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == ["own"]
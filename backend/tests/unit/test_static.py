@@ -0,0 +1,52 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.static import IMMUTABLE_CACHE, CachedStaticFiles, versioned_url
+
+
+def _client(tmp_path):
+    (tmp_path / "clip.bin").write_bytes(bytes(range(256)) * 4)
+    app = FastAPI()
+    app.mount("/storage", CachedStaticFiles(directory=str(tmp_path)), name="storage")
+    return TestClient(app)
+
+
+def test_versioned_url():
+    assert versioned_url("/storage/a.jpg", "abc") == "/storage/a.jpg?v=abc"
+    assert versioned_url("/storage/a.jpg", None) == "/storage/a.jpg"
+
+
+def test_versioned_request_is_immutable(tmp_path):
+    client = _client(tmp_path)
+
+    res = client.get("/storage/clip.bin?v=1")
+    assert res.status_code == 200
+    assert res.headers["cache-control"] == IMMUTABLE_CACHE
+    assert res.headers["accept-ranges"] == "bytes"
+
+    res = client.get("/storage/clip.bin")
+    assert res.headers["cache-control"] == "no-cache"
+
+
+def test_strong_etag_revalidates(tmp_path):
+    client = _client(tmp_path)
+
+    etag = client.get("/storage/clip.bin").headers["etag"]
+    assert not etag.startswith("W/")
+
+    res = client.get("/storage/clip.bin", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    (tmp_path / "clip.bin").write_bytes(b"rewritten")
+    res = client.get("/storage/clip.bin", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.content == b"rewritten"
+
+
+def test_range_request(tmp_path):
+    client = _client(tmp_path)
+
+    res = client.get("/storage/clip.bin?v=1", headers={"Range": "bytes=256-511"})
+    assert res.status_code == 206
+    assert res.headers["content-range"] == "bytes 256-511/1024"
+    assert res.content == bytes(range(256))
@@ -0,0 +1,137 @@
+import pytest
+
+from app.services.storage import LocalStorage, job_key
+
+
+def test_local_keys_and_urls(tmp_path):
+    storage = LocalStorage(tmp_path)
+    key = job_key("j1", "snapshots", "000001.jpg")
+
+    assert key == "jobs/j1/snapshots/000001.jpg"
+    assert storage.local_path(key) == tmp_path / key
+    assert storage.url(key, "v1") == "/storage/jobs/j1/snapshots/000001.jpg?v=v1"
+    # rows written before keys were relative
+    assert storage.key(str(tmp_path / key)) == key
+    assert storage.url(str(tmp_path / key)) == "/storage/jobs/j1/snapshots/000001.jpg"
+    with pytest.raises(ValueError):
+        storage.url("/elsewhere/1.jpg")
+    assert str(storage.fetch("/elsewhere/1.jpg")) == "/elsewhere/1.jpg"
+
+
+def test_local_delete_prefix(tmp_path):
+    storage = LocalStorage(tmp_path)
+    path = storage.local_path(job_key("j1", "video", "original.mp4"))
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"x")
+
+    storage.delete_prefix(job_key("j1"))
+    assert not (tmp_path / "jobs" / "j1").exists()
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    from app.services.storage.s3 import S3Storage
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="frames")
+        yield S3Storage("frames", tmp_path / "cache", prefix="v2s", client=client)
+
+
+def test_s3_put_fetch_roundtrip(s3):
+    keys = [job_key("j1", "snapshots", f"{i:06d}.jpg") for i in range(1, 21)]
+    for i, key in enumerate(keys):
+        path = s3.local_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes([i]) * 100)
+
+    s3.put(keys)
+    listed = s3.client.list_objects_v2(Bucket="frames", Prefix="v2s/jobs/j1/")
+    assert listed["KeyCount"] == 20
+    assert s3.client.head_object(Bucket="frames", Key=f"v2s/{keys[0]}")["ContentType"] == "image/jpeg"
+
+    # another node: empty cache, files come from the bucket
+    for key in keys:
+        s3.local_path(key).unlink()
+    paths = s3.fetch_many(keys)
+    assert [p.read_bytes() for p in paths] == [bytes([i]) * 100 for i in range(20)]
+
+    assert s3.exists(keys[0])
+    assert not s3.fetch(job_key("j1", "snapshots", "missing.jpg")).exists()
+
+
+def test_s3_fetch_refreshes_a_cached_copy_rewritten_elsewhere(s3, tmp_path, monkeypatch):
+    import os
+
+    from app.services.storage import s3 as s3_module
+    from app.services.storage.s3 import S3Storage
+
+    monkeypatch.setattr(s3_module, "CACHE_REVALIDATE_SEC", 0)
+    other = S3Storage("frames", tmp_path / "other-cache", prefix="v2s", client=s3.client)
+    key = job_key("j1", "snapshots", "000001.jpg")
+
+    other.local_path(key).parent.mkdir(parents=True, exist_ok=True)
+    other.local_path(key).write_bytes(b"old")
+    other.put([key])
+    cached = s3.fetch(key)
+    assert cached.read_bytes() == b"old"
+    # our copy predates the rewrite below
+    os.utime(cached, (cached.stat().st_atime - 60, cached.stat().st_mtime - 60))
+
+    other.local_path(key).write_bytes(b"new")
+    other.put([key])
+    assert s3.fetch(key).read_bytes() == b"new"
+
+    other.delete_prefix(job_key("j1"))
+    assert not s3.fetch(key).exists()
+
+
+def test_s3_fetch_after_put_keeps_the_uploaded_copy(s3, monkeypatch, mocker):
+    import os
+
+    from app.services.storage import s3 as s3_module
+
+    key = job_key("j1", "videos", "source.mp4")
+    path = s3.local_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"video")
+    # written well before its upload finished, as a large file is
+    os.utime(path, (path.stat().st_atime - 60, path.stat().st_mtime - 60))
+    s3.put([key])
+
+    # past the revalidation window: the HEAD finds the object we uploaded
+    monkeypatch.setattr(s3_module, "CACHE_REVALIDATE_SEC", 0)
+    download = mocker.spy(s3.client, "download_file")
+
+    assert s3.fetch(key).read_bytes() == b"video"
+    download.assert_not_called()
+
+
+def test_s3_presigned_and_public_urls(s3):
+    url = s3.url(job_key("j1", "snapshots", "000001.jpg"))
+    assert "v2s/jobs/j1/snapshots/000001.jpg" in url
+    assert "Signature" in url or "X-Amz-Signature" in url
+
+    s3.public_base_url = "https://cdn.example.com"
+    assert s3.url(job_key("j1", "snapshots", "000001.jpg"), "abc") == (
+        "https://cdn.example.com/v2s/jobs/j1/snapshots/000001.jpg?v=abc"
+    )
+
+
+def test_s3_delete_prefix(s3):
+    keys = [job_key("j1", "video", "original.mp4"), job_key("j2", "video", "original.mp4")]
+    for key in keys:
+        s3.local_path(key).parent.mkdir(parents=True, exist_ok=True)
+        s3.local_path(key).write_bytes(b"v")
+    s3.put(keys)
+
+    s3.delete_prefix(job_key("j1"))
+
+    assert not s3.exists(keys[0])
+    assert s3.exists(keys[1])
+    assert not s3.local_path(keys[0]).exists()
@@ -0,0 +1,35 @@
+from app.pipeline.stream_extract import HEAD_PROBE_MAX, stream_decodable
+
+
+def _box(kind: bytes, payload: bytes = b"") -> bytes:
+    return (8 + len(payload)).to_bytes(4, "big") + kind + payload
+
+
+def test_matroska_and_ts_are_streamable():
+    assert stream_decodable("mkv", b"") is True
+    assert stream_decodable("TS", b"") is True
+
+
+def test_unknown_containers_are_not_streamed():
+    assert stream_decodable("avi", b"RIFF") is False
+
+
+def test_faststart_mp4_is_streamable():
+    head = _box(b"ftyp", b"isom" * 4) + _box(b"moov", b"\0" * 32)
+    assert stream_decodable("mp4", head) is True
+
+
+def test_fragmented_mp4_is_streamable():
+    head = _box(b"ftyp", b"iso6") + _box(b"free") + _box(b"moof", b"\0" * 16)
+    assert stream_decodable("mp4", head) is True
+
+
+def test_mp4_with_trailing_index_is_not_streamable():
+    head = _box(b"ftyp", b"isom") + (1 << 20).to_bytes(4, "big") + b"mdat"
+    assert stream_decodable("mp4", head) is False
+
+
+def test_mp4_needs_more_bytes_until_a_decision():
+    partial = _box(b"ftyp", b"isom")[:6]
+    assert stream_decodable("mp4", partial) is None
+    assert stream_decodable("mp4", b"\0" * 4 + b"ftyp" + b"\xff" * (HEAD_PROBE_MAX - 8)) is False
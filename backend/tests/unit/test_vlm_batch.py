@@ -0,0 +1,51 @@
+import anyio
+import pytest
+
+from app.services.vlm import hf_client
+
+
+def test_parse_batch_response_orders_by_scene():
+    raw = 'Sure! {"scenes": [{"scene": 2, "description": "B"}, {"scene": 1, "description": "A"}]}'
+
+    results = hf_client._parse_batch_response(raw, 2)
+
+    assert [r.text for r in results] == ["A", "B"]
+
+
+def test_parse_batch_response_missing_scene_raises():
+    with pytest.raises(ValueError):
+        hf_client._parse_batch_response('{"scenes": [{"scene": 1, "description": "A"}]}', 2)
+
+
+def test_describe_scenes_falls_back_to_single_requests(mocker, monkeypatch):
+    monkeypatch.setenv("HF_TOKEN", "t")
+    monkeypatch.setenv("HF_VLM_MODEL", "m")
+    mocker.patch.object(hf_client, "_describe_batch_hf", side_effect=ValueError("bad json"))
+    single = mocker.patch.object(
+        hf_client,
+        "describe_scene_hf",
+        return_value=hf_client.VLMResult(text="single"),
+    )
+
+    results = anyio.run(hf_client.describe_scenes_hf, [[], [], []], 2)
+
+    assert [r.text for r in results] == ["single"] * 3
+    assert single.call_count == 3
+
+
+def test_describe_scenes_reports_single_failures_per_scene(mocker, monkeypatch):
+    monkeypatch.setenv("HF_TOKEN", "t")
+    monkeypatch.setenv("HF_VLM_MODEL", "m")
+    mocker.patch.object(hf_client, "_describe_batch_hf", side_effect=ValueError("bad json"))
+    mocker.patch.object(
+        hf_client,
+        "describe_scene_hf",
+        side_effect=[hf_client.VLMResult(text="a"), RuntimeError("rate limited"), hf_client.VLMResult(text="c")],
+    )
+    seen = []
+
+    results = anyio.run(hf_client.describe_scenes_hf, [[], [], []], 3, lambda start, done: seen.append(start))
+
+    assert [r.text for r in results] == ["a", "", "c"]
+    assert [r.error for r in results] == [None, "rate limited", None]
+    assert seen == [0]
@@ -0,0 +1,60 @@
+from PIL import Image
+
+from app.services.vlm import hf_client
+
+
+def _make_frames(tmp_path, n=3, size=(1600, 900)):
+    paths = []
+    for i in range(n):
+        p = tmp_path / f"{i + 1:06d}.jpg"
+        Image.new("RGB", size, (i * 40, 100, 200)).save(p)
+        paths.append(p)
+    return paths
+
+
+def test_build_grid_image_size_and_thumbnails(tmp_path):
+    paths = _make_frames(tmp_path)
+
+    grid = hf_client.build_grid_image(paths, cols=4, tile_w=384)
+
+    assert grid.size == (4 * 384, 216)
+    for p in paths:
+        assert hf_client._thumbnail_path(p, 384).exists()
+
+
+def test_build_grid_data_url_is_cached(tmp_path, mocker):
+    paths = _make_frames(tmp_path)
+    hf_client._grid_cache.clear()
+    spy = mocker.spy(hf_client, "build_grid_image")
+
+    first = hf_client.build_grid_data_url(paths)
+    second = hf_client.build_grid_data_url(paths)
+
+    assert first.startswith("data:image/jpeg;base64,")
+    assert first == second
+    assert spy.call_count == 1
+
+
+def test_budgeted_grid_respects_byte_budget(tmp_path):
+    paths = _make_frames(tmp_path, n=8)
+    budget = hf_client.PayloadBudget(max_image_tokens=1600, max_bytes=20_000)
+
+    url, plan = hf_client.build_budgeted_grid_data_url(paths, budget)
+
+    assert len(url) <= budget.max_bytes
+    assert plan.cols * plan.rows >= 8
+
+
+def test_budgeted_grid_caches_only_the_chosen_plan(tmp_path, mocker):
+    paths = _make_frames(tmp_path, n=8)
+    budget = hf_client.PayloadBudget(max_image_tokens=1600, max_bytes=8_000)
+    hf_client._grid_cache.clear()
+    attempts = mocker.spy(hf_client, "build_grid_image")
+
+    url, plan = hf_client.build_budgeted_grid_data_url(paths, budget)
+    assert attempts.call_count > 1  # over-budget attempts came first
+    assert len(hf_client._grid_cache) == 1
+    attempts.reset_mock()
+
+    assert hf_client.build_budgeted_grid_data_url(paths, budget) == (url, plan)
+    attempts.assert_not_called()
@@ -0,0 +1,44 @@
+from app.services.vlm.payload import (
+    PayloadBudget,
+    budget_for_model,
+    estimate_image_tokens,
+    plan_grid,
+    plan_steps,
+)
+
+
+def test_plan_grid_fits_token_budget():
+    budget = PayloadBudget(max_image_tokens=1000, patch_px=28)
+
+    plan = plan_grid(8, 9 / 16, budget)
+
+    w, h = plan.grid_size()
+    assert estimate_image_tokens(w, h, budget.patch_px) <= budget.max_image_tokens
+    assert plan.cols * plan.rows >= 8
+    assert plan.tile_w % 16 == 0
+
+
+def test_plan_grid_single_frame_uses_one_column():
+    plan = plan_grid(1, 9 / 16, PayloadBudget())
+
+    assert (plan.cols, plan.rows) == (1, 1)
+    assert plan.tile_w == 384
+
+
+def test_plan_steps_lower_quality_then_tile_size():
+    plan = plan_grid(4, 9 / 16, PayloadBudget())
+    steps = list(plan_steps(plan))
+
+    assert steps[0] == plan
+    assert steps[1].quality < steps[0].quality
+    assert steps[-1].tile_w < plan.tile_w
+
+
+def test_budget_for_model_env_override(monkeypatch):
+    monkeypatch.setenv("HF_VLM_MAX_IMAGE_BYTES", "1234")
+    monkeypatch.setenv("HF_VLM_MAX_IMAGE_TOKENS__ORG_MODEL_7B", "500")
+
+    budget = budget_for_model("org/model-7b")
+
+    assert budget.max_bytes == 1234
+    assert budget.max_image_tokens == 500
@@ -23,4 +23,48 @@ export function toAbsUrl(url) {
   return `${API_BASE}${url}`;
 }
 
-export { API_BASE };
\ No newline at end of file
+export { API_BASE };
+// POST + read a text/event-stream body, calling onEvent(event, data) per frame
+export async function apiStream(path, onEvent, options = {}) {
+  const res = await fetch(`${API_BASE}${path}`, { method: "POST", ...options });
+
+  if (!res.ok) {
+    let data;
+    try {
+      data = await res.json();
+    } catch {
+      data = null;
+    }
+    throw { response: { data } };
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  let last = null;
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buf.indexOf("\n\n")) !== -1) {
+      const frame = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      const parsed = data ? JSON.parse(data) : null;
+      if (event === "error") throw { response: { data: parsed } };
+      if (event === "done") last = parsed;
+      onEvent?.(event, parsed);
+    }
+  }
+
+  return last;
+}
@@ -1,17 +1,25 @@
 import { apiFetch } from "./client";
 
-export async function listJobs() {
-  return await apiFetch("/jobs");
+// newest first; pass the previous response's next_cursor as cursor for older jobs
+export async function listJobs({ limit, cursor } = {}) {
+  const qs = new URLSearchParams();
+  if (limit != null) qs.set("limit", String(limit));
+  if (cursor) qs.set("cursor", cursor);
+  const suffix = qs.toString() ? `?${qs.toString()}` : "";
+
+  return await apiFetch(`/jobs${suffix}`);
 }
 
 export async function getJob(jobId) {
   return await apiFetch(`/jobs/${jobId}`);
 }
 
-export async function listSnapshots(jobId, { limit, offset } = {}) {
+// pages are keyset-based: pass the previous response's next_cursor as cursor
+export async function listSnapshots(jobId, { limit, offset, cursor } = {}) {
   const qs = new URLSearchParams();
   if (limit != null) qs.set("limit", String(limit));
-  if (offset != null) qs.set("offset", String(offset));
+  if (cursor) qs.set("cursor", cursor);
+  else if (offset != null) qs.set("offset", String(offset));
   const suffix = qs.toString() ? `?${qs.toString()}` : "";
 
   return await apiFetch(`/jobs/${jobId}/snapshots${suffix}`);
@@ -21,8 +29,25 @@ export async function runExtract(jobId) {
   return await apiFetch(`/jobs/${jobId}/extract`, { method: "POST" });
 }
 
-export async function createJob(formData) {
-  return await apiFetch("/jobs", { method: "POST", body: formData });
+export async function createJob(formData, { pipeline } = {}) {
+  const qs = pipeline ? `?pipeline=${encodeURIComponent(pipeline)}` : "";
+  return await apiFetch(`/jobs${qs}`, { method: "POST", body: formData });
+}
+
+// raw-body upload; the server extracts snapshots while the bytes arrive
+// (for streamable containers: mkv/webm/ts, fragmented or faststart mp4)
+export async function createJobStreaming(file, params = {}) {
+  const qs = new URLSearchParams({ filename: file.name });
+  for (const [k, v] of Object.entries(params)) qs.set(k, String(v));
+  return await apiFetch(`/jobs/stream?${qs.toString()}`, {
+    method: "POST",
+    headers: { "Content-Type": file.type || "application/octet-stream" },
+    body: file,
+  });
+}
+
+export async function runPipeline(jobId) {
+  return await apiFetch(`/jobs/${jobId}/pipeline`, { method: "POST" });
 }
 
 export async function deleteJob(jobId) {
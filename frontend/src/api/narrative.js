@@ -1,4 +1,4 @@
-import { apiFetch } from "./client";
+import { apiFetch, apiStream } from "./client";
 
 export async function generateNarrative(jobId) {
   return await apiFetch(`/jobs/${jobId}/narrative/generate`, {
@@ -8,4 +8,21 @@ export async function generateNarrative(jobId) {
 
 export async function getNarrative(jobId) {
   return await apiFetch(`/jobs/${jobId}/narrative`);
-}
\ No newline at end of file
+}
+export async function generateNarrativeStream(jobId, onDelta) {
+  return await apiStream(
+    `/jobs/${jobId}/narrative/generate/stream`,
+    (event, data) => event === "delta" && onDelta?.(data.delta)
+  );
+}
+
+export async function generateNarrativeInBackground(jobId, mode = "auto") {
+  return await apiFetch(
+    `/jobs/${jobId}/narrative/generate?run_in_background=true&mode=${mode}`,
+    { method: "POST" }
+  );
+}
+
+export async function getNarrativeStatus(jobId) {
+  return await apiFetch(`/jobs/${jobId}/narrative/status`);
+}
@@ -1,4 +1,4 @@
-import { apiFetch } from "./client";
+import { apiFetch, apiStream } from "./client";
 
 export async function buildScenes(jobId) {
   return await apiFetch(`/jobs/${jobId}/scenes/build`, { method: "POST" });
@@ -19,4 +19,19 @@ export async function describeScene(jobId, sceneId, keyframes = 8) {
     `/jobs/${jobId}/scenes/${sceneId}/describe?keyframes=${keyframes}`,
     { method: "POST" }
   );
-}
\ No newline at end of file
+}
+export async function describeAllScenes(jobId, { keyframes = 8, batchSize } = {}) {
+  const qs = new URLSearchParams({ keyframes: String(keyframes) });
+  if (batchSize != null) qs.set("batch_size", String(batchSize));
+
+  return await apiFetch(`/jobs/${jobId}/scenes/describe?${qs.toString()}`, {
+    method: "POST",
+  });
+}
+
+export async function describeSceneStream(jobId, sceneId, onDelta, keyframes = 8) {
+  return await apiStream(
+    `/jobs/${jobId}/scenes/${sceneId}/describe/stream?keyframes=${keyframes}`,
+    (event, data) => event === "delta" && onDelta?.(data.delta)
+  );
+}
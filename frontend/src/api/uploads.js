@@ -0,0 +1,57 @@
+import { API_BASE, apiFetch } from "./client";
+
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const MAX_RETRIES = 5;
+
+async function sha256Header(buf) {
+  const digest = await crypto.subtle.digest("SHA-256", buf);
+  const bytes = String.fromCharCode(...new Uint8Array(digest));
+  return `sha256 ${btoa(bytes)}`;
+}
+
+async function serverOffset(uploadId) {
+  const res = await fetch(`${API_BASE}/uploads/${uploadId}`, { method: "HEAD" });
+  if (!res.ok) throw { response: { data: { detail: "Upload not found" } } };
+  return Number(res.headers.get("Upload-Offset"));
+}
+
+// Resumable upload: create, PATCH checksummed chunks (resuming from the
+// server's offset after a failure), then finalize into a job with formData.
+// Pass a previous uploadId to continue an interrupted upload.
+export async function uploadVideoResumable(file, formData, { uploadId, onProgress, query = "" } = {}) {
+  if (!uploadId) {
+    const res = await fetch(`${API_BASE}/uploads`, {
+      method: "POST",
+      headers: { "Upload-Length": String(file.size), "Upload-Filename": file.name },
+    });
+    if (!res.ok) throw { response: { data: await res.json().catch(() => null) } };
+    uploadId = (await res.json()).upload_id;
+  }
+
+  let offset = await serverOffset(uploadId);
+  let retries = 0;
+
+  while (offset < file.size) {
+    const buf = await file.slice(offset, offset + CHUNK_SIZE).arrayBuffer();
+    try {
+      const res = await fetch(`${API_BASE}/uploads/${uploadId}`, {
+        method: "PATCH",
+        headers: {
+          "Content-Type": "application/offset+octet-stream",
+          "Upload-Offset": String(offset),
+          "Upload-Checksum": await sha256Header(buf),
+        },
+        body: buf,
+      });
+      if (!res.ok) throw new Error(`chunk rejected (${res.status})`);
+      offset = Number(res.headers.get("Upload-Offset"));
+      retries = 0;
+      onProgress?.(offset / file.size, uploadId);
+    } catch (e) {
+      if (++retries > MAX_RETRIES) throw e;
+      offset = await serverOffset(uploadId);
+    }
+  }
+
+  return await apiFetch(`/uploads/${uploadId}/finalize${query}`, { method: "POST", body: formData });
+}
@@ -16,6 +16,7 @@ export default function JobsSidebar({
   onRefresh,
   loading,
   onDeleteJob,
+  onLoadMore,
 }) {
   return (
     <aside
@@ -125,6 +126,24 @@ export default function JobsSidebar({
           );
         })}
       </div>
+
+      {onLoadMore && (
+        <button
+          onClick={onLoadMore}
+          disabled={loading}
+          style={{
+            marginTop: 10,
+            width: "100%",
+            padding: "6px 10px",
+            borderRadius: 8,
+            border: "1px solid #ddd",
+            background: "white",
+            color: "#666",
+          }}
+        >
+          Older jobs
+        </button>
+      )}
     </aside>
   );
 }
\ No newline at end of file
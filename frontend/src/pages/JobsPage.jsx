@@ -7,10 +7,12 @@ import { getNarrative, generateNarrative } from "../api/narrative";
 
 export default function JobsPage() {
   const [jobs, setJobs] = useState([]);
+  const [jobsCursor, setJobsCursor] = useState(null);
   const [selectedJobId, setSelectedJobId] = useState("");
 
   const [detail, setDetail] = useState(null);
   const [snapshots, setSnapshots] = useState([]);
+  const [snapshotsCursor, setSnapshotsCursor] = useState(null);
 
   const [loadingJobs, setLoadingJobs] = useState(false);
   const [error, setError] = useState("");
@@ -27,6 +29,7 @@ export default function JobsPage() {
       const data = await listJobs();
       const list = data.jobs ?? [];
       setJobs(list);
+      setJobsCursor(data.next_cursor ?? null);
 
       if (!selectedJobId && list.length) {
         setSelectedJobId(list[0].job_id);
@@ -43,12 +46,45 @@ export default function JobsPage() {
     }
   }
 
+  async function loadMoreJobs() {
+    if (!jobsCursor) return;
+    try {
+      const data = await listJobs({ cursor: jobsCursor });
+      setJobs((prev) => [...prev, ...(data.jobs ?? [])]);
+      setJobsCursor(data.next_cursor ?? null);
+    } catch (e) {
+      const msg =
+        e?.response?.data?.detail ||
+        e?.message ||
+        "Something went wrong";
+
+      setError(msg);
+    }
+  }
+
   async function loadDetailAndSnapshots(jobId) {
     if (!jobId) return;
     try {
       const [d, s] = await Promise.all([getJob(jobId), listSnapshots(jobId)]);
       setDetail(d);
       setSnapshots(s.snapshots ?? []);
+      setSnapshotsCursor(s.next_cursor ?? null);
+    } catch (e) {
+      const msg =
+        e?.response?.data?.detail ||
+        e?.message ||
+        "Something went wrong";
+
+      setError(msg);
+    }
+  }
+
+  async function loadMoreSnapshots() {
+    if (!selectedJobId || !snapshotsCursor) return;
+    try {
+      const s = await listSnapshots(selectedJobId, { cursor: snapshotsCursor });
+      setSnapshots((prev) => [...prev, ...(s.snapshots ?? [])]);
+      setSnapshotsCursor(s.next_cursor ?? null);
     } catch (e) {
       const msg =
         e?.response?.data?.detail ||
@@ -107,12 +143,14 @@ export default function JobsPage() {
       const data = await listJobs();
       const list = data.jobs ?? [];
       setJobs(list);
+      setJobsCursor(data.next_cursor ?? null);
 
       const nextId = list.length ? list[0].job_id : "";
       setSelectedJobId(nextId);
 
       setDetail(null);
       setSnapshots([]);
+      setSnapshotsCursor(null);
       setNarr(null);
       setTab("snapshots");
 
@@ -140,6 +178,7 @@ export default function JobsPage() {
     setTab("snapshots");
     setDetail(null);
     setSnapshots([]);
+    setSnapshotsCursor(null);
     setNarr(null);
     loadDetailAndSnapshots(selectedJobId);
     // eslint-disable-next-line react-hooks/exhaustive-deps
@@ -149,6 +188,7 @@ export default function JobsPage() {
     <div style={{ display: "grid", gridTemplateColumns: "320px 1fr", height: "100vh" }}>
       <JobsSidebar
         jobs={jobs}
+        onLoadMore={jobsCursor ? loadMoreJobs : null}
         selectedJobId={selectedJobId}
         onSelect={setSelectedJobId}
         onRefresh={refreshJobs}
@@ -266,7 +306,27 @@ export default function JobsPage() {
               </button>
             </div>
 
-            {tab === "snapshots" && <SnapshotsGrid snapshots={snapshots} />}
+            {tab === "snapshots" && (
+              <>
+                <SnapshotsGrid snapshots={snapshots} />
+                {snapshotsCursor && (
+                  <button
+                    onClick={loadMoreSnapshots}
+                    style={{
+                      marginTop: 12,
+                      padding: "6px 10px",
+                      borderRadius: 10,
+                      border: "1px solid #ddd",
+                      background: "white",
+                      cursor: "pointer",
+                      color: "#666",
+                    }}
+                  >
+                    Load more snapshots
+                  </button>
+                )}
+              </>
+            )}
 
             {tab === "scenes" && <ScenesPage jobId={selectedJobId} />}
 
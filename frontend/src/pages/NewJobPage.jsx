@@ -1,6 +1,12 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { createJob } from "../api/jobs";
+import { createJob, createJobStreaming } from "../api/jobs";
+import { uploadVideoResumable } from "../api/uploads";
+
+// above this, upload in resumable checksummed chunks
+const RESUMABLE_MIN_BYTES = 64 * 1024 * 1024;
+// containers the server can decode while they upload
+const STREAMABLE_EXT = /\.(mkv|webm|ts|m2ts|mts|flv)$/i;
 
 export default function NewJobPage() {
   const [file, setFile] = useState(null);
@@ -10,9 +16,11 @@ export default function NewJobPage() {
   const [blackWhite, setBlackWhite] = useState(false);
   const [imageFormat, setImageFormat] = useState("jpg");
   const [runExtract, setRunExtract] = useState(true);
+  const [packed, setPacked] = useState(false);
   const navigate = useNavigate();
 
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState(null);
   const [result, setResult] = useState(null);
   const [error, setError] = useState("");
 
@@ -26,21 +34,30 @@ export default function NewJobPage() {
 
     try {
       const fd = new FormData();
-      fd.append("video", file);
       fd.append("sampling_fps", String(samplingFps));
       fd.append("resize_width", String(resizeWidth));
       fd.append("grayscale", String(grayscale));
       fd.append("black_white", String(blackWhite));
       fd.append("image_format", imageFormat);
+      fd.append("packed", String(packed));
       fd.append("run_extract", String(runExtract));
 
-      const data = await createJob(fd);
+      let data;
+      if (file.size >= RESUMABLE_MIN_BYTES) {
+        data = await uploadVideoResumable(file, fd, { onProgress: (p) => setProgress(p) });
+      } else if (runExtract && STREAMABLE_EXT.test(file.name)) {
+        data = await createJobStreaming(file, Object.fromEntries(fd.entries()));
+      } else {
+        fd.append("video", file);
+        data = await createJob(fd);
+      }
       setResult(data);
       navigate(`/jobs?job=${data.job_id}`);
     } catch (e2) {
       setError(String(e2.message || e2));
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   }
 
@@ -100,6 +117,11 @@ export default function NewJobPage() {
             Grayscale
           </label>
 
+          <label>
+            <input type="checkbox" checked={packed} onChange={(e) => setPacked(e.target.checked)} />{" "}
+            Pack snapshots into one file
+          </label>
+
           <label>
             <input type="checkbox" checked={runExtract} onChange={(e) => setRunExtract(e.target.checked)} />{" "}
             Run extraction immediately
@@ -111,7 +133,7 @@ export default function NewJobPage() {
           disabled={!file || loading}
           style={{ padding: "10px 12px", borderRadius: 10, border: "1px solid #ddd", background: "green" }}
         >
-          {loading ? "Creating…" : "Create job"}
+          {loading ? (progress != null ? `Uploading… ${Math.round(progress * 100)}%` : "Creating…") : "Create job"}
         </button>
 
         {error && <div style={{ color: "crimson" }}>{error}</div>}